@@ -1,11 +1,32 @@
 # main.py - Entry point for the Thesis Management System CLI
+import argparse
 import os
+import sys
 import getpass
+import time
+from itertools import islice
+from src import auth
+from src import client
+from src import dashboard
+from src import instrument
 from src import models
 
+# Archive search results shown per page, and the fields the listing needs
+ARCHIVE_PAGE_SIZE = 5
+# Values shown per facet above the results
+FACET_TOP_VALUES = 3
+ARCHIVE_LIST_FIELDS = (
+    "title", "author", "year", "supervisor", "reviewers", "keywords",
+    "abstract", "download_link", "final_grade_letter", "final_grade_score",
+)
+
 # Global variable to hold the logged-in user object
 current_user = None
 
+# Where users and archive searches come from: the models module, or a
+# client.connect() stand-in for it when the CLI runs against a server
+backend = models
+
 def clear_screen():
     """Clears the console screen."""
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -25,12 +46,10 @@ def handle_list_available_courses(student):
     else:
         print(f"{'ID':<10} {'عنوان':<30} {'استاد':<20} {'ظرفیت باقی‌مانده'}")
         print("-" * 80)
-        professors = models.data_manager.get_users()
-        proposals = models.data_manager.get_proposals()
-
         for course in courses:
-            prof_name = next((p['name'] for p in professors if p['id'] == course['professor_id']), 'N/A')
-            approved_count = sum(1 for p in proposals if p['course_id'] == course['id'] and p['status'] == 'approved')
+            professor = backend.get_user(course['professor_id'])
+            prof_name = professor['name'] if professor else 'N/A'
+            approved_count = backend.course_approved_count(course['id'])
             remaining_capacity = course['capacity'] - approved_count
             print(f"{course['id']:<10} {course['title']:<30} {prof_name:<20} {remaining_capacity}")
     input("\nبرای بازگشت به منو، Enter را فشار دهید...")
@@ -108,6 +127,8 @@ def handle_request_defense(student):
 def student_dashboard(student):
     """Displays the student's main menu and handles their actions."""
     global current_user
+    # Recomputed only when the student's data changes, not on every redraw
+    state = dashboard.DashboardState(student, backend)
     while True:
         clear_screen()
         print_header(f"داشبورد دانشجو - {student.name} خوش آمدید")
@@ -116,13 +137,7 @@ def student_dashboard(student):
         print("3. مشاهده وضعیت درخواست")
 
         # Check if student is eligible for defense request
-        is_eligible_for_defense = False
-        result, status_type = student.view_my_thesis_status()
-        if status_type == 'proposal_status' and result['proposal']['status'] == 'approved':
-             approval_date = models.datetime.strptime(result['proposal']['approval_date'], '%Y-%m-%d')
-             if models.datetime.now() >= approval_date + models.timedelta(days=90):
-                 is_eligible_for_defense = True
-
+        is_eligible_for_defense = state.is_eligible_for_defense()
         if is_eligible_for_defense:
             print("4. ثبت درخواست دفاع")
         print("5. جستجو در آرشیو پایان‌نامه‌ها")
@@ -142,6 +157,8 @@ def student_dashboard(student):
             handle_search_archive()
         elif choice == '6':
             current_user = None
+            auth.forget_session()
+            state.close()
             print("با موفقیت خارج شدید.")
             break
         else:
@@ -177,6 +194,7 @@ def handle_manage_proposals(professor):
 
     decision = input("تصمیم خود را وارد کنید (approve / reject): ").strip().lower()
     if decision in ['approve', 'reject']:
+        decision = 'approved' if decision == 'approve' else 'rejected'
         success, message = professor.decide_on_proposal(proposal_id, decision)
         print(message)
     else:
@@ -205,7 +223,7 @@ def handle_manage_defense_requests(professor):
     if decision == 'approve':
         date = input("تاریخ دفاع (YYYY-MM-DD): ")
 
-        all_profs = [u for u in models.data_manager.get_users() if u['role'] == 'professor' and u['id'] != professor.user_id]
+        all_profs = [u for u in backend.list_professors() if u['id'] != professor.user_id]
         print("\nاساتید موجود برای داوری:")
         for p in all_profs: print(f"  - ID: {p['id']}, نام: {p['name']}")
 
@@ -270,6 +288,93 @@ def handle_performance_report(professor):
 
     input("\nبرای بازگشت، Enter را فشار دهید...")
 
+def print_facets(facets):
+    """Prints the most common values of each facet of a result set."""
+    labels = {"year": "سال", "semester": "نیمسال", "supervisor": "استاد راهنما", "reviewer": "داور", "letter": "نمره"}
+    for facet, counts in facets.items():
+        if not counts:
+            continue
+        names = []
+        for value, count in list(counts.items())[:FACET_TOP_VALUES]:
+            if facet in ("supervisor", "reviewer"):
+                user = backend.get_user(value)
+                value = user['name'] if user else value
+            names.append(f"{value} ({count})")
+        print(f"{labels[facet]}: {'، '.join(names)}")
+    print("-" * 40)
+
+def ask_with_facets(message, facets):
+    """Asks for input; while the answer is 'f', prints the facet counts returned by facets() and asks again."""
+    while True:
+        answer = input(message).strip().lower()
+        if answer != 'f':
+            return answer
+        print_facets(facets())
+
+def print_archive_results(query, results, facets=None):
+    """
+    Prints archive search results one page at a time. facets() returns the
+    facet counts of the whole result set; they are counted only if the user
+    asks for them, so the first page comes without scanning the results.
+    """
+    clear_screen()
+    print_header(f"نتایج جستجو برای '{query}'")
+    shown = 0
+    while True:
+        page = list(islice(results, ARCHIVE_PAGE_SIZE))
+        if not page:
+            print("هیچ نتیجه‌ای یافت نشد." if shown == 0 else "نتیجه دیگری وجود ندارد.")
+            break
+        for res in page:
+            shown += 1
+            print(f"--- نتیجه {shown} ---")
+            print(f"عنوان: {res['title']}")
+            print(f"نویسنده: {res['author']} | سال: {res['year']}")
+            print(f"استاد راهنما: {res['supervisor']}")
+            print(f"داوران: {', '.join(res['reviewers'])}")
+            print(f"کلمات کلیدی: {res['keywords']}")
+            print(f"چکیده: {res['abstract'][:100]}...")
+            print(f"لینک دانلود: {res['download_link']}")
+            print(f"نمره نهایی: {res['final_grade_letter']} ({res['final_grade_score']})")
+            print("-" * 20)
+        if len(page) < ARCHIVE_PAGE_SIZE:
+            break
+        if facets:
+            answer = ask_with_facets("برای صفحه بعد Enter، برای آمار نتایج f و برای بازگشت q را وارد کنید: ", facets)
+        else:
+            answer = input("برای صفحه بعد Enter و برای بازگشت q را وارد کنید: ").strip().lower()
+        if answer == 'q':
+            return
+
+    if facets and shown:
+        ask_with_facets("\nبرای بازگشت Enter و برای آمار نتایج f را وارد کنید: ", facets)
+    else:
+        input("\nبرای بازگشت، Enter را فشار دهید...")
+
+def handle_combined_search():
+    """Handles a multi-field archive query, optionally showing its plan."""
+    print("نمونه: year=1404 AND supervisor=prof101 AND keyword~\"شبکه\" AND grade>=17")
+    print("فیلدها: year, semester, supervisor, reviewer, letter (=)، grade (<, <=, =, >=, >)")
+    print("        title, keyword, author, supervisor, reviewer (~ جستجوی زیررشته‌ای)")
+    print("برای دیدن نقشه اجرای پرس‌وجو، آن را با explain شروع کنید.")
+    query = input("پرس‌وجو: ").strip()
+    explain = query.lower().startswith("explain ")
+    if explain:
+        query = query[len("explain "):]
+
+    try:
+        results = backend.query_archive(query, fields=ARCHIVE_LIST_FIELDS)
+        plan = backend.explain_archive_query(query) if explain else []
+    except ValueError as e:
+        print(f"پرس‌وجوی نامعتبر: {e}"); input("\nEnter..."); return
+
+    if explain:
+        print(f"{'شرط':<30} {'روش دسترسی':<15} {'تخمین':>8} {'واقعی':>8}")
+        for step in plan:
+            print(f"{step['predicate']:<30} {step['access']:<15} {step['estimated']:>8} {step['actual']:>8}")
+        input("\nبرای دیدن نتایج Enter را فشار دهید...")
+    print_archive_results(query, results, lambda: backend.archive_facets(query))
+
 def handle_search_archive():
     """Handles searching the thesis archive."""
     print_header("جستجو در آرشیو پایان‌نامه‌ها")
@@ -279,48 +384,41 @@ def handle_search_archive():
     print("3. نویسنده (author)")
     print("4. استاد راهنما (supervisor)")
     print("5. سال (year)")
+    print("6. جستجوی متنی در عنوان، چکیده و کلمات کلیدی (text)")
+    print("7. جستجوی ترکیبی چند شرطی")
 
     choice = input("گزینه مورد نظر را انتخاب کنید: ")
-    search_by_map = {'1': 'title', '2': 'keyword', '3': 'author', '4': 'supervisor', '5': 'year'}
+    search_by_map = {'1': 'title', '2': 'keyword', '3': 'author', '4': 'supervisor', '5': 'year', '6': 'text'}
 
+    if choice == '7':
+        handle_combined_search(); return
     if choice not in search_by_map:
         print("گزینه نامعتبر."); input("\nEnter..."); return
 
     search_by = search_by_map[choice]
     query = input(f"عبارت مورد نظر برای جستجو در '{search_by}' را وارد کنید: ").strip()
 
-    results = models.search_theses_archive(query, search_by)
-
-    clear_screen()
-    print_header(f"نتایج جستجو برای '{query}'")
-    if not results:
-        print("هیچ نتیجه‌ای یافت نشد.")
-    else:
-        for i, res in enumerate(results, 1):
-            print(f"--- نتیجه {i} ---")
-            print(f"عنوان: {res['title']}")
-            print(f"نویسنده: {res['author']} | سال: {res['year']}")
-            print(f"استاد راهنما: {res['supervisor']}")
-            print(f"داوران: {', '.join(res['reviewers'])}")
-            print(f"کلمات کلیدی: {res['keywords']}")
-            print(f"چکیده: {res['abstract'][:100]}...")
-            print(f"لینک دانلود: {res['download_link']}")
-            print(f"نمره نهایی: {res['final_grade_letter']} ({res['final_grade_score']})")
-            print("-" * 20)
-
-    input("\nبرای بازگشت، Enter را فشار دهید...")
+    # Results are fetched lazily and shown one page at a time.
+    print_archive_results(
+        query,
+        backend.iter_theses_archive(query, search_by, fields=ARCHIVE_LIST_FIELDS),
+        lambda: backend.archive_facets(query, search_by),
+    )
 
 def professor_dashboard(professor):
     """Displays the professor's main menu and handles their actions."""
     global current_user
+    # Recomputed only when the professor's data changes, not on every redraw
+    state = dashboard.DashboardState(professor, backend)
     while True:
         clear_screen()
-        load = professor.get_load()
+        facts = state.facts()
+        load = facts['load']
         print_header(f"داشبورد استاد - {professor.name} خوش آمدید")
         print(f"ظرفیت راهنمایی: {load['supervision']}/{professor.supervision_limit} | ظرفیت داوری: {load['review']}/{professor.review_limit}")
-        print("1. مدیریت درخواست‌های اخذ پایان‌نامه")
-        print("2. مدیریت درخواست‌های دفاع")
-        print("3. ثبت نمره به عنوان داور")
+        print(f"1. مدیریت درخواست‌های اخذ پایان‌نامه ({facts['pending_proposals']} در انتظار)")
+        print(f"2. مدیریت درخواست‌های دفاع ({facts['pending_defenses']} در انتظار)")
+        print(f"3. ثبت نمره به عنوان داور ({facts['to_review']} در انتظار)")
         print("4. جستجو در آرشیو پایان‌نامه‌ها")
         print("5. مشاهده گزارش عملکرد")
         print("6. خروج (Logout)")
@@ -339,6 +437,8 @@ def professor_dashboard(professor):
             handle_performance_report(professor)
         elif choice == '6':
             current_user = None
+            auth.forget_session()
+            state.close()
             print("با موفقیت خارج شدید.")
             break
         else:
@@ -351,6 +451,12 @@ def main():
     Handles user login and navigation.
     """
     global current_user
+    # Resume the session of an earlier run, if it has not expired
+    token = auth.load_session()
+    if token:
+        current_user = backend.User.resume(token)
+        if current_user is None:
+            auth.forget_session()
     while True:
         clear_screen()
         print_header("سیستم مدیریت پایان‌نامه‌ها")
@@ -362,9 +468,10 @@ def main():
 
             password = getpass.getpass("رمز عبور: ")
 
-            user = models.User.login(user_id, password)
+            user = backend.User.login(user_id, password)
             if user:
                 current_user = user
+                auth.save_session(user.session_token())
                 print("ورود موفقیت‌آمیز بود!")
                 input("برای ادامه Enter را فشار دهید...")
             else:
@@ -377,5 +484,79 @@ def main():
             elif current_user.role == 'professor':
                 professor_dashboard(current_user)
 
+def print_batch_report(report, elapsed):
+    """Prints the outcome of every row of a batch and a summary. Returns True if all rows succeeded."""
+    for number, key, success, message in report:
+        print(f"{number:>6}  {key or '-':<24} {'موفق' if success else 'ناموفق':<7} {message or ''}")
+    succeeded = sum(1 for row in report if row[2])
+    rate = f"، {len(report) / elapsed:.0f} سطر در ثانیه" if elapsed > 0 else ""
+    print(f"{succeeded} از {len(report)} سطر با موفقیت اعمال شد ({elapsed:.2f} ثانیه{rate}).", file=sys.stderr)
+    return succeeded == len(report)
+
+def run_command(args):
+    """Runs a non-interactive subcommand. Returns the exit status."""
+    from src import batch
+    start = time.perf_counter()
+    if args.command == "archive":
+        output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            count = batch.export_archive(output, args.format)
+        finally:
+            if args.output:
+                output.close()
+        print(f"{count} پایان‌نامه در {time.perf_counter() - start:.2f} ثانیه خروجی گرفته شد.", file=sys.stderr)
+        return 0
+    try:
+        if args.command == "proposals":
+            with open(args.ids_file, encoding='utf-8') as f:
+                ids = batch.read_ids(f)
+            decision = 'approved' if args.action == 'approve' else 'rejected'
+            report = batch.decide_proposals(ids, decision, args.as_professor)
+        else:
+            with open(args.file, encoding='utf-8', newline='') as f:
+                if args.command == "grades":
+                    report = batch.import_grades(f)
+                else:
+                    report = batch.approve_defenses(f)
+    except (OSError, ValueError) as e:
+        print(f"خطا: {e}", file=sys.stderr)
+        return 2
+    return 0 if print_batch_report(report, time.perf_counter() - start) else 1
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="سیستم مدیریت پایان‌نامه‌ها")
+    parser.add_argument("--serve", nargs="?", const=client.DEFAULT_ADDRESS, metavar="ADDRESS",
+                        help=f"run the shared server on HOST:PORT or unix:PATH (default {client.DEFAULT_ADDRESS})")
+    parser.add_argument("--connect", nargs="?", const=client.DEFAULT_ADDRESS, metavar="ADDRESS",
+                        default=os.environ.get('THESIS_SERVER'),
+                        help="use a running server instead of reading the data directly (or set THESIS_SERVER)")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND",
+                                     help="run a batch operation instead of the interactive menu")
+    proposals = commands.add_parser("proposals", help="approve or reject proposals listed in a file")
+    proposals.add_argument("action", choices=("approve", "reject"))
+    proposals.add_argument("--ids-file", required=True, help="one proposal id per line")
+    proposals.add_argument("--as", dest="as_professor", metavar="PROFESSOR_ID",
+                           help="act as this professor (default: each proposal's supervisor)")
+    grades = commands.add_parser("grades", help="import grades from a CSV file")
+    grades.add_argument("action", choices=("import",))
+    grades.add_argument("file", help="CSV with columns thesis_id, professor_id, grade")
+    defenses = commands.add_parser("defenses", help="approve defenses and assign their reviewers from a CSV file")
+    defenses.add_argument("action", choices=("approve",))
+    defenses.add_argument("file", help="CSV with columns thesis_id, defense_date, reviewers (ids separated by ';')")
+    export = commands.add_parser("archive", help="export the whole thesis archive")
+    export.add_argument("action", choices=("export",))
+    export.add_argument("--format", choices=("json", "csv"), default="json")
+    export.add_argument("--output", help="file to write (default: standard output)")
+    args = parser.parse_args()
+
+    if instrument.ENABLED:
+        instrument.install(sys.modules[__name__])
+    if args.command:
+        sys.exit(run_command(args))
+    if args.serve:
+        from src import server
+        server.serve(args.serve)
+    else:
+        if args.connect:
+            backend = client.connect(args.connect)
+        main()
@@ -0,0 +1,220 @@
+# scripts/benchmark.py
+# Latency benchmark of the model operations over synthetic datasets of
+# several sizes (see seed_data.Dataset).
+#
+# Every operation is timed --repeat times with warm caches, as in a running
+# session, and once more right after the caches were dropped. For each one
+# the median and p95 latency, the cold latency and the collections read and
+# bytes parsed per call are reported. Operations that change data use a
+# different target on every call (a student without an active proposal, a
+# pending proposal, a missing grade), so they may run fewer times on small
+# datasets.
+#
+#   python3 scripts/benchmark.py --sizes 1000 10000 --save baseline.json
+#   python3 scripts/benchmark.py --sizes 1000 10000 --compare baseline.json --threshold 0.25
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import data_manager
+from src import models
+from seed_data import Dataset, generate
+
+# Fixed so that every run benchmarks the same data
+TODAY = date(2026, 10, 17)
+SEED = 1
+
+# Latency differences below this many milliseconds are timer noise, not regressions
+MIN_DELTA_MS = 0.5
+
+def _targets(dataset):
+    """Picks the users and records the operations run against."""
+    users = data_manager.get_users(frozen=True)
+    proposals = data_manager.get_proposals(frozen=True)
+    theses = data_manager.get_theses(frozen=True)
+    courses = {c['id']: c for c in data_manager.get_courses(frozen=True)}
+    active = {p['student_id'] for p in proposals if p['status'] in ('pending', 'approved')}
+
+    supervisor_of = {p['proposal_id']: courses[p['course_id']]['professor_id'] for p in proposals}
+    pending = [(supervisor_of[p['proposal_id']], p['proposal_id']) for p in proposals if p['status'] == 'pending']
+    reviewers = [r for t in theses if t['status'] == 'defense_approved' for r in t['reviewers']]
+    ungraded = [
+        (grader, t['thesis_id']) for t in theses
+        if t['status'] == 'defense_approved' and date.fromisoformat(t['defense_date']) <= date.today()
+        for grader in list(t['reviewers']) + [supervisor_of[t['proposal_id']]] if grader not in t['grades']
+    ]
+    supervisors = Counter(supervisor_of[p['proposal_id']] for p in proposals if p['status'] == 'approved')
+    archived = [t for t in theses if t['status'] == 'graded']
+    return {
+        "student": next(u['id'] for u in users if u['role'] == 'student'),
+        "free_students": [u['id'] for u in users if u['role'] == 'student' and u['id'] not in active],
+        "course": next(iter(courses)),
+        "pending": pending,
+        "supervisor": supervisors.most_common(1)[0][0] if supervisors else dataset.professor_id(0),
+        "reviewer": reviewers[0] if reviewers else dataset.professor_id(0),
+        "ungraded": ungraded,
+        "title_word": archived[0]['title'].split()[-1] if archived else "شبکه",
+        "author": models.search_theses_archive('', 'title')[0]['author'].split()[-1] if archived else "رضایی",
+        "year": str(dataset.years[len(dataset.years) // 2]),
+    }
+
+def operations(dataset):
+    """Returns {name: callable(i)} for the operations to benchmark, run against the current data."""
+    t = _targets(dataset)
+    login = lambda user_id: models.User.login(user_id, user_id)
+    student, supervisor, reviewer = login(t['student']), login(t['supervisor']), login(t['reviewer'])
+
+    def submit_thesis_request(i):
+        return login(t['free_students'][i]).submit_thesis_request(t['course'])
+
+    def decide_on_proposal(i):
+        professor_id, proposal_id = t['pending'][i]
+        return login(professor_id).decide_on_proposal(proposal_id, 'rejected')
+
+    def submit_grade(i):
+        grader_id, thesis_id = t['ungraded'][i]
+        return login(grader_id).submit_grade(thesis_id, 17)
+
+    return {
+        "User.login": (lambda i: login(t['student']), None),
+        "get_available_courses": (lambda i: student.get_available_courses(), None),
+        "submit_thesis_request": (submit_thesis_request, len(t['free_students'])),
+        "get_load": (lambda i: supervisor.get_load(), None),
+        "get_pending_proposals": (lambda i: supervisor.get_pending_proposals(), None),
+        "decide_on_proposal": (decide_on_proposal, len(t['pending'])),
+        "get_theses_to_review": (lambda i: reviewer.get_theses_to_review(), None),
+        "submit_grade": (submit_grade, len(t['ungraded'])),
+        "generate_performance_report": (lambda i: supervisor.generate_performance_report(), None),
+        "search_theses_archive[title]": (lambda i: models.search_theses_archive(t['title_word'], 'title'), None),
+        "search_theses_archive[author]": (lambda i: models.search_theses_archive(t['author'], 'author'), None),
+        "search_theses_archive[year]": (lambda i: models.search_theses_archive(t['year'], 'year'), None),
+        "search_theses_archive[text]": (lambda i: models.search_theses_archive(t['title_word'], 'text'), None),
+    }
+
+def _measure(function, i):
+    """Runs one call. Returns (milliseconds, collections read, bytes parsed)."""
+    before = data_manager.cache_stats()
+    start = time.perf_counter()
+    function(i)
+    elapsed = (time.perf_counter() - start) * 1000
+    after = data_manager.cache_stats()
+    return elapsed, after['reads'] - before['reads'], after['bytes_parsed'] - before['bytes_parsed']
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_size(students, repeat):
+    """Benchmarks every operation on a fresh dataset. Returns {operation: result}."""
+    data_dir = tempfile.mkdtemp()
+    try:
+        data_manager.set_data_dir(data_dir)
+        dataset = Dataset(students, seed=SEED, today=TODAY)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate(dataset)
+        results = {}
+        for name, (function, available) in operations(dataset).items():
+            calls = repeat if available is None else min(repeat + 1, available)
+            if calls < 2:
+                continue
+            data_manager.clear_cache()
+            cold = _measure(function, 0)
+            samples = [_measure(function, i) for i in range(1, calls)]
+            times = [s[0] for s in samples]
+            results[name] = {
+                "calls": len(samples),
+                "median_ms": round(statistics.median(times), 4),
+                "p95_ms": round(_percentile(times, 0.95), 4),
+                "cold_ms": round(cold[0], 4),
+                "reads": round(statistics.mean(s[1] for s in samples), 2),
+                "bytes_parsed": round(statistics.mean(s[2] for s in samples)),
+                "cold_reads": cold[1],
+                "cold_bytes_parsed": cold[2],
+            }
+        return results
+    finally:
+        data_manager.sqlite_store.close_all()
+        shutil.rmtree(data_dir)
+
+def run(sizes, repeat):
+    """Benchmarks every size. Returns the report saved as a baseline."""
+    return {
+        "meta": {
+            "python": platform.python_version(), "storage": data_manager.STORAGE_MODE,
+            "repeat": repeat, "date": date.today().isoformat(),
+        },
+        "results": {str(size): run_size(size, repeat) for size in sizes},
+    }
+
+def compare(report, baseline, threshold, min_delta_ms=MIN_DELTA_MS):
+    """
+    Returns the regressions of a report against a baseline: operations whose
+    median latency grew by more than threshold (a fraction), or that read
+    more collections or parsed more bytes than before.
+    """
+    regressions = []
+    for size, by_operation in report['results'].items():
+        for name, result in by_operation.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if not old:
+                continue
+            if (result['median_ms'] > old['median_ms'] * (1 + threshold)
+                    and result['median_ms'] - old['median_ms'] > min_delta_ms):
+                regressions.append(f"{size:>7} {name}: median {old['median_ms']:.3f} -> {result['median_ms']:.3f} ms")
+            for key in ("reads", "bytes_parsed"):
+                if result[key] > old[key] * (1 + threshold):
+                    regressions.append(f"{size:>7} {name}: {key} {old[key]} -> {result[key]}")
+    return regressions
+
+def print_report(report, baseline=None):
+    print(f"{'students':>8} {'operation':<32} {'median ms':>10} {'p95 ms':>9} {'cold ms':>9} {'reads':>6} {'bytes':>10} {'cold reads':>10} {'cold bytes':>11}  baseline")
+    for size, by_operation in report['results'].items():
+        for name, result in by_operation.items():
+            old = (baseline or {}).get('results', {}).get(size, {}).get(name)
+            change = f"{result['median_ms'] / old['median_ms'] - 1:+.0%}" if old and old['median_ms'] else ""
+            print(f"{size:>8} {name:<32} {result['median_ms']:>10.3f} {result['p95_ms']:>9.3f} "
+                  f"{result['cold_ms']:>9.1f} {result['reads']:>6} {result['bytes_parsed']:>10} "
+                  f"{result['cold_reads']:>10} {result['cold_bytes_parsed']:>11}  {change}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the model operations over synthetic datasets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="numbers of students")
+    parser.add_argument("--repeat", type=int, default=50, help="warm calls per operation")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="fail if an operation regressed against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA_MS,
+                        help=f"ignore latency changes smaller than this (default {MIN_DELTA_MS})")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"-> Baseline saved to {args.save}")
+    if baseline:
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}.")
@@ -0,0 +1,84 @@
+# scripts/benchmark_startup.py
+# Cold-start benchmark of the CLI: the wall time of a whole `main.py` run
+# that logs a student in, shows their dashboard, logs out and exits, over a
+# synthetic dataset (see seed_data.Dataset). It is measured with the JSON
+# files indented and compact, and with the binary copies of the collections
+# (see src/binary_cache.py) turned off, stale (the run rebuilds them) and
+# fresh.
+#
+#   python3 scripts/benchmark_startup.py --students 20000 --repeat 5
+import argparse
+import glob
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import binary_cache
+from src import data_manager
+from seed_data import Dataset, generate
+
+# What the CLI is fed: user id, password, Enter, logout, exit
+SESSION = "{user}\n{user}\n\n6\nexit\n"
+
+def login_run(data_dir, user_id, binary=True):
+    """Runs main.py for one login session and returns its wall time in seconds."""
+    env = dict(os.environ, THESIS_DATA_DIR=data_dir, THESIS_STORAGE='json',
+               THESIS_BINARY_CACHE='1' if binary else '0', THESIS_SESSION_FILE='')
+    env.pop('THESIS_SERVER', None)
+    start = time.perf_counter()
+    # A new session has no terminal, so getpass reads the password from stdin
+    subprocess.run([sys.executable, os.path.join(project_root, "main.py")], input=SESSION.format(user=user_id),
+                   text=True, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   start_new_session=True, check=True)
+    return time.perf_counter() - start
+
+def remove_copies(data_dir):
+    for path in glob.glob(os.path.join(data_dir, '*' + binary_cache.SUFFIX)):
+        os.unlink(path)
+
+def rewrite(indent):
+    """Saves every collection again with the given JSON indentation (None: compact)."""
+    data_manager.JSON_INDENT = indent
+    for name in data_manager.COLLECTION_FILES:
+        file_path = data_manager.collection_file(name)
+        data_manager.write_data(file_path, data_manager.read_data(file_path, frozen=True))
+    data_manager.clear_cache()
+
+def run(students, repeat):
+    data_dir = tempfile.mkdtemp()
+    try:
+        data_manager.set_data_dir(data_dir)
+        dataset = Dataset(students, seed=1, today=date(2026, 10, 17))
+        generate(dataset)
+        user_id = next(u['id'] for u in dataset.users() if u['role'] == 'student')
+        print(f"{students} students, login as {user_id}, median of {repeat} runs")
+        print(f"{'JSON files':<12} {'MiB':>7} {'no copies':>10} {'stale':>8} {'fresh':>8}")
+        for label, indent in (("indented", 4), ("compact", None)):
+            rewrite(indent)
+            size = sum(os.path.getsize(data_manager.collection_file(n)) for n in data_manager.COLLECTION_FILES)
+            plain = [login_run(data_dir, user_id, binary=False) for _ in range(repeat)]
+            stale = []
+            for _ in range(repeat):
+                remove_copies(data_dir)
+                stale.append(login_run(data_dir, user_id))
+            fresh = [login_run(data_dir, user_id) for _ in range(repeat)]
+            print(f"{label:<12} {size / 2**20:>7.1f} {statistics.median(plain) * 1000:>8.0f}ms "
+                  f"{statistics.median(stale) * 1000:>6.0f}ms {statistics.median(fresh) * 1000:>6.0f}ms")
+    finally:
+        shutil.rmtree(data_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of a CLI login.")
+    parser.add_argument("--students", type=int, default=20000, help="size of the synthetic dataset")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per configuration")
+    args = parser.parse_args()
+    run(args.students, args.repeat)
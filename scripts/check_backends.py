@@ -0,0 +1,103 @@
+# scripts/check_backends.py
+import sys
+import os
+import re
+import shutil
+import tempfile
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import aggregates
+from src import archive
+from src import data_manager
+from src import models
+from src import partitions
+from seed_data import seed
+
+def run_scenario(backend=models):
+    """
+    Walks one thesis through its whole lifecycle using the model API (or a
+    client.connect() stand-in for it) and returns everything the models
+    reported along the way.
+    """
+    log = []
+    student = backend.User.login('stu981001', 'student1')
+    professor = backend.User.login('prof101', 'pass123')
+    reviewer = backend.User.login('prof102', 'pass456')
+    log.append([c['id'] for c in student.get_available_courses()])
+    log.append(student.submit_thesis_request('CRS01'))
+    log.append(backend.User.login('stu981002', 'student2').submit_thesis_request('CRS01'))
+    pending = professor.get_pending_proposals()
+    log.append(pending)
+    log.append(professor.decide_on_proposal(pending[0]['proposal']['proposal_id'], 'approved'))
+    log.append(professor.get_load())
+    log.append(student.view_my_thesis_status())
+
+    # Pretend the proposal was approved long enough ago to request a defense.
+    proposals = data_manager.get_proposals()
+    for p in proposals:
+        if p['status'] == 'approved':
+            p['approval_date'] = '2020-01-01'
+    data_manager.save_proposals(proposals)
+
+    log.append(student.request_defense('شبکه‌های عصبی', 'چکیده', 'شبکه, یادگیری', 'a.pdf', 'a.png'))
+    thesis_id = professor.get_pending_defense_requests()[0]['thesis']['thesis_id']
+    log.append(professor.decide_on_defense(thesis_id, 'approved', '2020-06-01', ['prof102']))
+    log.append(reviewer.get_theses_to_review())
+    log.append(reviewer.submit_grade(thesis_id, 18))
+    log.append(professor.submit_grade(thesis_id, 15))
+    log.append(professor.generate_performance_report())
+    log.append(reviewer.get_load())
+    log.append(backend.search_theses_archive('شبکه', 'title'))
+    log.append(backend.search_theses_archive('1404', 'year'))
+    log.append(backend.search_theses_archive('شبكه يادگيري', 'text'))
+    log.append(backend.archive_facets())
+    log.append(backend.archive_facets('grade>=10'))
+    log.append(aggregates.verify())
+
+    # Close the year: its archived thesis moves to the cold partitions
+    log.append(partitions.move_archived(1405, archive.ARCHIVED_STATUSES))
+    log.append(student.view_my_thesis_status())
+    log.append(student.submit_thesis_request('CRS02'))
+    log.append(professor.get_load())
+    log.append(professor.generate_performance_report())
+    log.append(backend.search_theses_archive('شبکه', 'title'))
+    log.append(backend.search_theses_archive('1404', 'year'))
+    log.append(backend.search_theses_archive('شبكه يادگيري', 'text'))
+    log.append(backend.archive_facets('year=1404'))
+    log.append(aggregates.verify())
+    return log
+
+def normalize(log):
+    """Makes generated ids, dates and salted password hashes comparable between runs."""
+    text = repr(log)
+    text = re.sub(r"'[0-9a-f]{8}'", "'<id>'", text)
+    text = re.sub(r"pbkdf2_sha256\$[^']*", "<hash>", text)
+    return re.sub(r"\d{4}-\d{2}-\d{2}", "<date>", text)
+
+def check():
+    """Runs the scenario against every storage backend and compares the results."""
+    results = {}
+    for mode in data_manager.STORAGE_MODES:
+        data_dir = tempfile.mkdtemp()
+        try:
+            data_manager.set_data_dir(data_dir)
+            data_manager.set_storage_mode(mode)
+            seed()
+            results[mode] = normalize(run_scenario())
+        finally:
+            data_manager.sqlite_store.close_all()
+            shutil.rmtree(data_dir)
+
+    reference = results['json']
+    ok = True
+    for mode, result in results.items():
+        same = result == reference
+        ok = ok and same
+        print(f"{mode:<8} {'OK' if same else 'MISMATCH'}")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
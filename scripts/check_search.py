@@ -0,0 +1,206 @@
+# scripts/check_search.py
+import argparse
+import random
+import sys
+import os
+import shutil
+import tempfile
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import archive
+from src import data_manager
+from src import models
+from src import partitions
+from src import planner
+from src import utils
+
+ALPHABET = "abcABC آبپتکگیيكﻙشسIİi ‌-"
+WORDS = ["شبکه", "شبكه", "عصبی", "یادگیری", "Deep", "deep", "LEARNING", "داده", "İstanbul", "ای", "م"]
+
+def scan(query, search_by):
+    """The archive search as a plain scan over all defended theses (the reference behavior)."""
+    users = {u['id']: u for u in data_manager.get_users()}
+    proposals = [p for name in partitions.names('proposals') for p in data_manager.get_collection(name)]
+    courses = data_manager.get_courses()
+    results = []
+    for thesis in [t for name in partitions.names('theses') for t in data_manager.get_collection(name)]:
+        if thesis['status'] not in ('graded', 'defended'):
+            continue
+        proposal = next((p for p in proposals if p['proposal_id'] == thesis['proposal_id']), None)
+        if not proposal:
+            continue
+        student = users.get(proposal['student_id'])
+        course = next(c for c in courses if c['id'] == proposal['course_id'])
+        supervisor = users.get(course['professor_id'])
+        reviewers = [users.get(r_id) for r_id in thesis['reviewers']]
+        if search_by == 'title':
+            match = query.lower() in thesis['title'].lower()
+        elif search_by == 'keyword':
+            match = query.lower() in thesis['keywords'].lower()
+        elif search_by == 'author':
+            match = query.lower() in student['name'].lower()
+        elif search_by == 'supervisor':
+            match = query.lower() in supervisor['name'].lower()
+        else:
+            match = any(query.lower() in r['name'].lower() for r in reviewers if r)
+        if match:
+            avg_score = sum(thesis['grades'].values()) / len(thesis['grades']) if thesis['grades'] else 0
+            results.append({
+                "title": thesis['title'], "abstract": thesis['abstract'], "keywords": thesis['keywords'],
+                "author": student['name'], "year": course['year'], "semester": course['semester'],
+                "supervisor": supervisor['name'], "reviewers": [r['name'] for r in reviewers if r],
+                "download_link": thesis['pdf_path'], "final_grade_score": f"{avg_score:.2f}",
+                "final_grade_letter": utils.get_letter_grade(avg_score),
+            })
+    return results
+
+def scan_query(predicates):
+    """A multi-field query as a plain scan: every predicate checked on every archive record."""
+    compare = {'<': float.__lt__, '<=': float.__le__, '=': float.__eq__, '>=': float.__ge__, '>': float.__gt__}
+    columns = {'year': 'year', 'semester': 'semester', 'supervisor': 'supervisor_id',
+               'reviewer': 'reviewer_ids', 'letter': 'final_grade_letter'}
+    results = []
+    for record in archive.records():
+        for field, op, value in predicates:
+            if op == '~':
+                stored = record[archive.SUBSTRING_FIELDS[field]]
+                stored = stored if isinstance(stored, (list, tuple)) else [stored]
+                if not any(value.lower() in v.lower() for v in stored):
+                    break
+            elif field == 'grade':
+                if not compare[op](float(record['final_grade_score']), value):
+                    break
+            else:
+                stored = record[columns[field]]
+                stored = stored if isinstance(stored, (list, tuple)) else [stored]
+                if not any(str(v) == value for v in stored):
+                    break
+        else:
+            results.append(record)
+    return results
+
+def scan_facets(records):
+    """Facet counts over archive records, counted directly."""
+    counts = {"year": {}, "semester": {}, "supervisor": {}, "reviewer": {}, "letter": {}}
+    for record in records:
+        buckets = [("year", record['year']), ("semester", record['semester']), ("supervisor", record['supervisor_id']),
+                   ("letter", record['final_grade_letter'])] + [("reviewer", r) for r in set(record['reviewer_ids'])]
+        for facet, value in buckets:
+            counts[facet][str(value)] = counts[facet].get(str(value), 0) + 1
+    return {facet: sorted(c.items()) for facet, c in counts.items()}
+
+def random_predicate(rng, texts):
+    kind = rng.choice(['year', 'semester', 'supervisor', 'reviewer', 'letter', 'grade', '~'])
+    if kind == 'year':
+        return f"year={rng.choice(['1400', '1402', '1404', '01404', 'x'])}"
+    if kind == 'semester':
+        return f'semester="{rng.choice(["نیمسال اول", "نیمسال دوم"])}"'
+    if kind in ('supervisor', 'reviewer'):
+        return f"{kind}=prof{rng.randint(0, 5)}"
+    if kind == 'letter':
+        return f"letter={rng.choice(['الف', 'ب', 'ج', 'د'])}"
+    if kind == 'grade':
+        return f"grade{rng.choice(['<', '<=', '=', '>=', '>'])}{rng.choice([rng.randint(0, 20), round(rng.uniform(0, 20), 1)])}"
+    query = random_query(rng, texts).replace('"', '')
+    return f'{rng.choice(list(archive.SUBSTRING_FIELDS))}~"{query}"'
+
+def random_text(rng):
+    parts = [rng.choice(WORDS) if rng.random() < 0.6 else "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 6)))
+             for _ in range(rng.randint(1, 4))]
+    return " ".join(parts)
+
+def random_query(rng, texts):
+    if rng.random() < 0.7:
+        value = rng.choice(texts)
+        start = rng.randint(0, len(value))
+        return value[start:start + rng.randint(0, 8)]
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 5)))
+
+def generate(rng, size):
+    professors = [{"id": f"prof{i}", "name": random_text(rng), "role": "professor", "password_hash": ""} for i in range(size // 10 + 2)]
+    students = [{"id": f"stu{i}", "name": random_text(rng), "role": "student", "password_hash": ""} for i in range(size)]
+    courses = [{"id": f"CRS{i}", "title": "", "professor_id": rng.choice(professors)['id'], "year": 1400 + i % 5,
+                "semester": rng.choice(["نیمسال اول", "نیمسال دوم"]), "capacity": size, "resources": "", "sessions": 1, "credits": 6}
+               for i in range(size // 5 + 1)]
+    proposals = [{"proposal_id": f"p{i}", "student_id": s['id'], "course_id": rng.choice(courses)['id'],
+                  "request_date": "2025-01-01", "status": "approved", "approval_date": "2025-01-01"}
+                 for i, s in enumerate(students)]
+    theses = [{"thesis_id": f"t{i}", "proposal_id": p['proposal_id'], "student_id": p['student_id'],
+               "title": random_text(rng), "abstract": "", "keywords": random_text(rng), "pdf_path": f"t{i}.pdf",
+               "grades": {r['id']: rng.randint(0, 20) for r in professors[:2]},
+               "status": rng.choice(["graded", "defended", "defense_approved", "defense_requested"]),
+               "reviewers": [r['id'] for r in rng.sample(professors, rng.randint(0, 2))]}
+              for i, p in enumerate(proposals)]
+    data_manager.save_users(professors + students)
+    data_manager.save_courses(courses)
+    data_manager.save_proposals(proposals)
+    data_manager.save_theses(theses)
+
+def run(seed, size, queries):
+    """Checks that the indexed archive searches and queries return exactly what a scan returns."""
+    rng = random.Random(seed)
+    generate(rng, size)
+    texts = [u['name'] for u in data_manager.get_users()]
+    texts += [t['title'] for t in data_manager.get_theses()] + [t['keywords'] for t in data_manager.get_theses()]
+    failures = 0
+    for i in range(queries):
+        if i == queries // 4:
+            # Move the archived theses of the first years to cold partitions.
+            partitions.move_archived(1403, archive.ARCHIVED_STATUSES)
+        if i == queries // 2:
+            # Change the data halfway so that the indexes have to be rebuilt.
+            users = data_manager.get_users()
+            for user in rng.sample(users, len(users) // 4):
+                user['name'] = random_text(rng)
+                texts.append(user['name'])
+            data_manager.save_users(users)
+            theses = data_manager.get_theses()
+            for thesis in rng.sample(theses, len(theses) // 4):
+                thesis['title'] = random_text(rng)
+                texts.append(thesis['title'])
+            data_manager.save_theses(theses)
+            # Saving theses directly bypasses the model; re-derive the view.
+            archive.rebuild()
+        query = random_query(rng, texts)
+        search_by = rng.choice(list(archive.SUBSTRING_FIELDS))
+        expected = scan(query, search_by)
+        actual = models.search_theses_archive(query, search_by)
+        if actual != expected:
+            failures += 1
+            print(f"MISMATCH {search_by} {query!r}: expected {len(expected)} results, got {len(actual)}")
+
+        text = " AND ".join(random_predicate(rng, texts) for _ in range(rng.randint(1, 3)))
+        matched = scan_query(planner.parse(text))
+        expected = [archive.result(record) for record in matched]
+        actual = list(models.query_archive(text))
+        if actual != expected:
+            failures += 1
+            print(f"MISMATCH {text}: expected {len(expected)} results, got {len(actual)}")
+        if scan_facets(matched) != {f: sorted(c.items()) for f, c in models.archive_facets(text).items()}:
+            failures += 1
+            print(f"MISMATCH facets of {text}")
+
+    # The precomputed facets of the whole archive, after all the changes
+    if scan_facets(archive.records()) != {f: sorted(c.items()) for f, c in models.archive_facets().items()}:
+        failures += 1
+        print("MISMATCH facets of the whole archive")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the indexed archive search with a full scan.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=200, help="number of theses")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        data_manager.set_data_dir(data_dir)
+        failures = run(args.seed, args.size, args.queries)
+    finally:
+        shutil.rmtree(data_dir)
+    print("OK" if not failures else f"FAILED ({failures} mismatches)")
+    sys.exit(0 if not failures else 1)
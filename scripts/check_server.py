@@ -0,0 +1,152 @@
+# scripts/check_server.py
+# Checks the shared server (src/server.py) against the models it serves:
+# - the check_backends scenario gives the same results through a client as
+#   it does in-process;
+# - many clients reading and writing at once leave the data consistent
+#   (counters, course capacities, supervision limits), and how many
+#   requests per second the server answered.
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import aggregates
+from src import client
+from src import data_manager
+from src import models
+from src import server
+from check_backends import normalize, run_scenario
+from seed_data import Dataset, generate, seed
+
+def start_server(data_dir):
+    """Starts a server on a Unix socket in data_dir. Returns (process, address)."""
+    path = os.path.join(data_dir, "server.sock")
+    env = dict(os.environ, THESIS_DATA_DIR=data_dir, THESIS_STORAGE=data_manager.STORAGE_MODE)
+    process = subprocess.Popen([sys.executable, os.path.join(project_root, "main.py"), "--serve", f"unix:{path}"],
+                               env=env, stdout=subprocess.DEVNULL)
+    for _ in range(200):
+        if os.path.exists(path):
+            return process, f"unix:{path}"
+        time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("The server did not start")
+
+def _comparable(log):
+    return normalize(json.loads(json.dumps(server._public(log), ensure_ascii=False, default=dict)))
+
+def check_scenario():
+    """Runs the lifecycle scenario in-process and through a server. Returns True if they agree."""
+    results = []
+    for remote in (False, True):
+        data_dir = tempfile.mkdtemp()
+        process = None
+        try:
+            data_manager.set_data_dir(data_dir)
+            seed()
+            backend = models
+            if remote:
+                process, address = start_server(data_dir)
+                backend = client.connect(address)
+            results.append(_comparable(run_scenario(backend)))
+        finally:
+            if process:
+                process.kill()
+                process.wait()
+            data_manager.sqlite_store.close_all()
+            shutil.rmtree(data_dir)
+    same = results[0] == results[1]
+    print(f"scenario     {'OK' if same else 'MISMATCH'}")
+    return same
+
+def _client_work(address, user_id, rounds, counts, lock):
+    """One client session: reads its dashboard and the archive, and makes the writes its role allows."""
+    remote = client.connect(address)
+    user = remote.User.login(user_id, user_id)
+    done = Counter()
+    for i in range(rounds):
+        remote.search_theses_archive("شبکه", "title")
+        done["reads"] += 1
+        if user.role == "student":
+            user.view_my_thesis_status()
+            courses = user.get_available_courses()
+            done["reads"] += 2
+            if courses:
+                success, _ = user.submit_thesis_request(courses[i % len(courses)]['id'])
+                done["submitted" if success else "refused"] += 1
+        else:
+            load = user.get_load()
+            pending = user.get_pending_proposals()
+            done["reads"] += 2
+            if pending:
+                decision = 'approved' if load['supervision'] < user.supervision_limit else 'rejected'
+                success, _ = user.decide_on_proposal(pending[0]['proposal']['proposal_id'], decision)
+                done[decision if success else "refused"] += 1
+    remote.connection.close()
+    with lock:
+        counts.update(done)
+
+def check_concurrency(students, clients, rounds):
+    """Runs many clients at once against one server. Returns True if the data stayed consistent."""
+    data_dir = tempfile.mkdtemp()
+    process = None
+    try:
+        data_manager.set_data_dir(data_dir)
+        dataset = Dataset(students, seed=3, today=date(2026, 10, 17))
+        generate(dataset)
+        proposals = data_manager.get_proposals()
+        active = {p['student_id'] for p in proposals if p['status'] in ('pending', 'approved')}
+        free = [u['id'] for u in data_manager.get_users() if u['role'] == 'student' and u['id'] not in active]
+        courses = {c['id']: c for c in data_manager.get_courses()}
+        busy = Counter(courses[p['course_id']]['professor_id'] for p in proposals if p['status'] == 'pending')
+        users = free[:clients // 2] + [professor_id for professor_id, _ in busy.most_common(clients - clients // 2)]
+
+        process, address = start_server(data_dir)
+        counts, lock = Counter(), threading.Lock()
+        threads = [threading.Thread(target=_client_work, args=(address, u, rounds, counts, lock)) for u in users]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        requests = sum(counts.values())
+
+        data_manager.clear_cache()
+        proposals = data_manager.get_proposals()
+        approved_course = Counter(p['course_id'] for p in proposals if p['status'] == 'approved')
+        approved_professor = Counter(courses[c]['professor_id'] for c in approved_course.elements())
+        ok = (
+            aggregates.verify() == {}
+            and all(n <= courses[c]['capacity'] for c, n in approved_course.items())
+            and max(approved_professor.values(), default=0) <= models.Professor("", "").supervision_limit
+        )
+        print(f"concurrency  {'OK' if ok else 'INCONSISTENT'}  {len(users)} clients, {requests} requests "
+              f"in {elapsed:.2f}s ({requests / elapsed:.0f}/s): {dict(counts)}")
+        return ok
+    finally:
+        if process:
+            process.kill()
+            process.wait()
+        data_manager.sqlite_store.close_all()
+        shutil.rmtree(data_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the shared server against the in-process models.")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    ok = check_scenario()
+    ok = check_concurrency(args.students, args.clients, args.rounds) and ok
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,24 @@
+# scripts/department_report.py
+import argparse
+import sys
+import os
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import reports
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance report of every professor, computed in one pass.")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--output", help="output file (default: standard output)")
+    args = parser.parse_args()
+
+    write = reports.write_json if args.format == "json" else reports.write_csv
+    report = reports.department_report()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            write(report, f)
+    else:
+        write(report, sys.stdout)
@@ -0,0 +1,46 @@
+# scripts/end_of_term.py
+import argparse
+import json
+import sys
+import os
+import time
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import jobs
+
+def benchmark(max_workers):
+    """Times the end-of-term run for 1, 2, 4, ... workers and checks that all outputs agree."""
+    job_list = jobs.end_of_term_jobs()
+    print(f"{len(job_list)} jobs")
+    counts = sorted({1, max_workers} | {2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers})
+    baseline = reference = None
+    for workers in counts:
+        started = time.perf_counter()
+        result = jobs.run(job_list, workers=workers, min_theses=0)
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        reference = reference or result
+        same = "" if result == reference else "  OUTPUT DIFFERS"
+        print(f"{workers:>3} workers: {elapsed:7.2f}s  speedup {baseline / elapsed:5.2f}x{same}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Professor reports, course rosters and the archive export.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default="end_of_term", help="directory for reports.json, rosters.json and archive.json")
+    parser.add_argument("--benchmark", action="store_true", help="compare run times for up to --workers workers")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.workers)
+        sys.exit(0)
+
+    result = jobs.run(workers=args.workers)
+    os.makedirs(args.output, exist_ok=True)
+    for name in ("reports", "rosters", "archive"):
+        with open(os.path.join(args.output, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(result[name], f, ensure_ascii=False, indent=4)
+    print(f"-> {len(result['reports'])} reports, {len(result['rosters'])} rosters and "
+          f"{len(result['archive'])} archived theses written to {args.output}")
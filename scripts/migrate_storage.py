@@ -0,0 +1,42 @@
+# scripts/migrate_storage.py
+import argparse
+import sys
+import os
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import data_manager
+
+def migrate(source, target):
+    """
+    Copies all collections from one storage backend to another.
+    e.g. 'json' -> 'sqlite' imports data/*.json into data/thesis.db.
+    """
+    print(f"Migrating collections from '{source}' to '{target}'...")
+    for name in data_manager.PRIMARY_KEYS:
+        data_manager.set_storage_mode(source)
+        records = data_manager.get_collection(name)
+        data_manager.set_storage_mode(target)
+        data_manager.write_data(data_manager.collection_file(name), records)
+        print(f"-> {name}: {len(records)} records.")
+    if target == 'json':
+        # The JSON files are now complete; drop stale journals. Journaled
+        # collections are still read with theirs.
+        for name in data_manager.PRIMARY_KEYS:
+            if name in data_manager.JOURNALED:
+                continue
+            journal_file = data_manager.journal.journal_path(data_manager.collection_file(name))
+            if os.path.exists(journal_file):
+                os.remove(journal_file)
+    print("\nMigration complete!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move the collections between storage backends.")
+    parser.add_argument("source", choices=data_manager.STORAGE_MODES)
+    parser.add_argument("target", choices=data_manager.STORAGE_MODES)
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("source and target must differ")
+    migrate(args.source, args.target)
@@ -0,0 +1,37 @@
+# scripts/partition_archive.py
+# Moves the archived (graded or defended) theses of past academic years, with
+# their proposals and archive records, to the read-only cold partitions of
+# their years (see src/partitions.py). The current year stays in the hot
+# collections.
+#
+#   python3 scripts/partition_archive.py               # years before the latest course year
+#   python3 scripts/partition_archive.py --before 1402
+import argparse
+import sys
+import os
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import archive
+from src import data_manager
+from src import partitions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move the archived theses of past years to cold partitions.")
+    parser.add_argument("--before", type=int, help="move the years before this one (default: the latest course year)")
+    args = parser.parse_args()
+
+    before = args.before
+    if before is None:
+        years = [c['year'] for c in data_manager.get_courses(frozen=True) if isinstance(c['year'], int)]
+        if not years:
+            print("No courses.")
+            sys.exit(0)
+        before = max(years)
+
+    moved = partitions.move_archived(before, archive.ARCHIVED_STATUSES)
+    for year, count in moved.items():
+        print(f"-> {year}: {count} theses moved to {data_manager.partition('theses', year)}.")
+    print(f"{sum(moved.values())} theses moved." if moved else f"No archived theses before {before} to move.")
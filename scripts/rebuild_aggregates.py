@@ -0,0 +1,25 @@
+# scripts/rebuild_aggregates.py
+import argparse
+import sys
+import os
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import aggregates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or check the materialized counters.")
+    parser.add_argument("--check", action="store_true", help="only report counters that are out of date")
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = aggregates.verify()
+        for key, (stored, actual) in sorted(mismatches.items()):
+            print(f"{key}: stored {stored}, actual {actual}")
+        print("Counters are consistent." if not mismatches else f"{len(mismatches)} counters are out of date.")
+        sys.exit(1 if mismatches else 0)
+
+    counts = aggregates.rebuild()
+    print(f"-> {len(counts)} counters rebuilt.")
@@ -0,0 +1,13 @@
+# scripts/rebuild_search_index.py
+import sys
+import os
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import fulltext
+
+if __name__ == "__main__":
+    count = fulltext.rebuild()
+    print(f"-> {count} archived theses indexed.")
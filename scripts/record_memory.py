@@ -0,0 +1,78 @@
+# scripts/record_memory.py
+# Memory report of the shared cached records: the bytes held by a collection
+# read from JSON and frozen as read-only dict views (data_manager.freeze)
+# and as the record classes of src/records.py (data_manager.freeze_records),
+# and, for collections with cold fields, loaded by data_manager with those
+# in a side file (see src/cold_store.py). Measured with tracemalloc over
+# synthetic theses and proposals (see seed_data.Dataset) and given per 100k
+# records.
+#
+#   python3 scripts/record_memory.py --theses 100000
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from datetime import date
+from itertools import islice
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import binary_cache
+from src import data_manager
+from seed_data import Dataset
+
+def measure(text, build):
+    """Returns the bytes still held after parsing JSON text and freezing it with build()."""
+    gc.collect()
+    tracemalloc.start()
+    frozen = build(json.loads(text) if text is not None else None)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del frozen
+    return size
+
+def measure_load(name, records):
+    """Returns the bytes held by a collection loaded from its files, its cold fields left in the side file."""
+    data_dir = tempfile.mkdtemp()
+    try:
+        data_manager.set_data_dir(data_dir)
+        data_manager.write_stream(name, iter(records))
+        data_manager.clear_cache()
+        return measure(None, lambda _: data_manager.get_collection(name, frozen=True))
+    finally:
+        data_manager.clear_cache()
+        shutil.rmtree(data_dir)
+
+def run(theses):
+    data_manager.set_storage_mode('json')
+    binary_cache.ENABLED = False
+    # About half of the students of a dataset defend a thesis
+    dataset = Dataset(theses * 3, seed=1, today=date(2026, 10, 17))
+    collections = {
+        "theses": list(islice(dataset.theses(), theses)),
+        "proposals": list(islice(dataset.proposals(), theses)),
+    }
+    print(f"{'collection':<10} {'records':>8} {'dict views':>12} {'records.py':>12} {'saved':>12}  per 100k records")
+    for name, records in collections.items():
+        text = json.dumps(records, ensure_ascii=False)
+        views = measure(text, data_manager.freeze)
+        slotted = measure(text, lambda data: data_manager.freeze_records(name, data))
+        scale = 100000 / len(records)
+        print(f"{name:<10} {len(records):>8} {views * scale / 2**20:>9.1f}MiB {slotted * scale / 2**20:>9.1f}MiB "
+              f"{(views - slotted) * scale / 2**20:>9.1f}MiB  ({1 - slotted / views:.0%})")
+        if data_manager.RECORD_CLASSES[name].COLD_FIELDS:
+            loaded = measure_load(name, records)
+            print(f"{'  cold fields in side file':<35} {loaded * scale / 2**20:>9.1f}MiB "
+                  f"{(views - loaded) * scale / 2**20:>9.1f}MiB  ({1 - loaded / views:.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the memory held by the cached records.")
+    parser.add_argument("--theses", type=int, default=100000, help="number of theses (and proposals) to measure")
+    args = parser.parse_args()
+    run(args.theses)
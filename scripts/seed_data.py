@@ -1,14 +1,71 @@
 # scripts/seed_data.py
+# Without arguments, replaces the data with a small hand-written sample.
+# With --students, generates a synthetic dataset of any size instead (see
+# generate()): the same seed and --today always give the same data, and the
+# records are streamed to disk, so a million of them fit in bounded memory.
+# Rebuilding the derived data (counters, archive view, search index) then
+# loads the collections whole; --skip-derived leaves it to be built on first use.
+import argparse
+import math
+import random
 import sys
 import os
+from datetime import date, timedelta
 
 # Add the project root to the Python path to allow importing from 'src'
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
+from src import aggregates
+from src import archive
 from src import data_manager
+from src import fulltext
+from src import models
+from src import partitions
 from src import utils
 
+FIRST_NAMES = (
+    "مریم", "علی", "زهرا", "محمد", "فاطمه", "حسین", "سارا", "رضا", "نرگس", "امیر",
+    "الهام", "مهدی", "نگار", "حمید", "لیلا", "سعید", "مینا", "جواد", "شیما", "کاوه",
+    "پریسا", "بهرام", "آزاده", "مجید", "یاسمن", "فرهاد", "هانیه", "پویا", "سمیرا", "آرش",
+)
+LAST_NAMES = (
+    "رضایی", "محمدی", "حسینی", "احمدی", "کریمی", "موسوی", "جعفری", "صادقی", "رحیمی", "قاسمی",
+    "اکبری", "صالحی", "نوری", "کاظمی", "مرادی", "عباسی", "طاهری", "یزدانی", "شریفی", "فرهادی",
+    "بهرامی", "نظری", "زارعی", "سلطانی", "امینی", "کامرانی", "ملکی", "حیدری", "توکلی", "شجاعی",
+)
+FIELDS = (
+    "هوش مصنوعی", "شبکه‌های کامپیوتری", "پردازش تصویر", "مهندسی نرم‌افزار", "امنیت اطلاعات",
+    "پایگاه داده", "رایانش ابری", "پردازش زبان طبیعی", "سیستم‌های توزیع‌شده", "بینایی ماشین",
+)
+RESOURCES = ("مقالات IEEE", "مقالات ACM", "کتاب مرجع درس", "پایگاه داده Scopus", "جزوه استاد")
+OPENINGS = ("ارائه روشی مبتنی بر", "بهبود", "بررسی کاربرد", "طراحی سامانه‌ای مبتنی بر", "ارزیابی")
+METHODS = (
+    "یادگیری عمیق", "یادگیری تقویتی", "الگوریتم ژنتیک", "شبکه‌های عصبی گرافی", "منطق فازی",
+    "بهینه‌سازی ازدحام ذرات", "مدل‌های زبانی", "یادگیری فدرال", "خوشه‌بندی طیفی", "زنجیره بلوکی",
+)
+TASKS = (
+    "تشخیص ناهنجاری", "پیش‌بینی ترافیک", "زمان‌بندی وظایف", "تشخیص چهره", "خلاصه‌سازی متن",
+    "مسیریابی", "تخصیص منابع", "طبقه‌بندی تصاویر پزشکی", "تحلیل احساسات", "تشخیص نفوذ",
+)
+DOMAINS = (
+    "شبکه‌های حسگر بی‌سیم", "رایانش ابری", "اینترنت اشیا", "متون فارسی", "شبکه‌های اجتماعی",
+    "خودروهای خودران", "شبکه‌های نرم‌افزارمحور", "سامانه‌های توصیه‌گر", "تصاویر ماهواره‌ای", "شبکه هوشمند برق",
+)
+CHALLENGES = (
+    "حجم بالای داده", "محدودیت انرژی", "تاخیر زیاد", "کمبود داده برچسب‌دار",
+    "ناهمگونی منابع", "هزینه محاسباتی بالا", "حفظ حریم خصوصی",
+)
+DATASETS = ("داده‌های واقعی", "مجموعه داده‌های استاندارد", "شبیه‌سازی گسترده", "داده‌های جمع‌آوری‌شده در این پژوهش")
+SEMESTERS = ("نیمسال اول", "نیمسال دوم")
+
+# Share of proposals that are not approved which are rejected (the rest are pending)
+REJECTED_SHARE = 0.7
+# Share of defense requests that are rejected, and of approved defenses
+# past their date whose grading is still in progress
+DEFENSE_REJECTED_SHARE = 0.1
+GRADING_SHARE = 0.1
+
 def seed():
     """
     Populates the database with initial sample data.
@@ -21,6 +78,8 @@ def seed():
     data_manager.save_courses([])
     data_manager.save_proposals([])
     data_manager.save_theses([])
+    # Forget the cold partitions of the old data (see src/partitions.py)
+    data_manager.write_data(data_manager.collection_file(partitions.CATALOG), [])
 
     # --- Create Sample Users ---
     users = [
@@ -71,7 +130,227 @@ def seed():
     data_manager.save_courses(courses)
     print(f"-> {len(courses)} courses created.")
 
+    # --- Rebuild the materialized counters, the archive view and the search index for the new data ---
+    aggregates.rebuild()
+    archive.rebuild()
+    fulltext.rebuild()
+
+    print("\nDatabase seeding complete!")
+
+def _semester_start(year, semester):
+    """Gregorian start date of a semester of a (solar hijri) academic year."""
+    if semester == SEMESTERS[0]:
+        return date(year + 621, 9, 23)
+    return date(year + 622, 2, 1)
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def _thesis_text(rng):
+    """Returns a (title, abstract, keywords) triple."""
+    method, task, domain = rng.choice(METHODS), rng.choice(TASKS), rng.choice(DOMAINS)
+    title = f"{rng.choice(OPENINGS)} {method} برای {task} در {domain}"
+    abstract = " ".join((
+        f"در این پایان‌نامه روشی مبتنی بر {method} برای {task} در {domain} ارائه می‌شود.",
+        f"چالش اصلی در این زمینه {rng.choice(CHALLENGES)} است.",
+        f"نتایج ارزیابی بر روی {rng.choice(DATASETS)} نشان می‌دهد که روش پیشنهادی "
+        f"دقت را {rng.randint(2, 30)} درصد بهبود می‌دهد.",
+    ))
+    return title, abstract, f"{method}, {task}, {domain}"
+
+class Dataset:
+    """
+    Describes a synthetic dataset. Every record is derived from the seed and
+    the record's number, and the proposals and theses from one sequential
+    pass over the students, so each collection can be produced again, one
+    record at a time, while the others are written.
+
+    Students are spread evenly over the years and pick a random course of
+    their year. A proposal is approved with probability acceptance_rate,
+    unless its course is full or its supervisor has reached the supervision
+    limit (it then stays pending, as it would in the system). An approved
+    student requests a defense with probability completion_rate, at least
+    90 days after the approval; the defense is then pending, rejected,
+    approved or, once its date has passed, graded. Nothing is dated after
+    'today'.
+    """
+
+    def __init__(self, students, professors=None, courses_per_year=None, years=(1398, 1404),
+                 acceptance_rate=0.7, completion_rate=0.8, seed=0, today=None, hash_iterations=1):
+        limit = models.Professor("", "").supervision_limit
+        self.students = students
+        self.professors = professors or max(1, math.ceil(students * acceptance_rate / limit))
+        self.years = list(range(years[0], years[1] + 1))
+        self.courses_per_year = courses_per_year or max(1, math.ceil(self.professors / len(self.years)))
+        self.acceptance_rate = acceptance_rate
+        self.completion_rate = completion_rate
+        self.seed = seed
+        self.today = today or date.today()
+        # Cost of the password hashes; hashing at the real cost would make
+        # large datasets take hours to generate.
+        self.hash_iterations = hash_iterations
+        self.supervision_limit = limit
+        # Enough for the expected approvals of a course, with some slack
+        per_course = students / (len(self.years) * self.courses_per_year)
+        self.capacity = max(1, math.ceil(1.5 * per_course * acceptance_rate))
+
+    def _rng(self, kind, number):
+        return random.Random(f"{self.seed}:{kind}:{number}")
+
+    def professor_id(self, number):
+        return f"prof{number + 1:05d}"
+
+    def _password_hash(self, rng, password):
+        return utils.hash_password(password, self.hash_iterations, f"{rng.getrandbits(64):016x}")
+
+    def course_id(self, year, number):
+        return f"CRS{year}{number + 1:04d}"
+
+    def users(self):
+        for j in range(self.professors):
+            rng = self._rng("professor", j)
+            user_id = self.professor_id(j)
+            yield {"id": user_id, "name": f"دکتر {rng.choice(LAST_NAMES)}", "role": "professor",
+                   "password_hash": self._password_hash(rng, user_id)}
+        for i in range(self.students):
+            rng = self._rng("student", i)
+            user_id = f"stu{i + 1:07d}"
+            yield {"id": user_id, "name": _name(rng), "role": "student",
+                   "password_hash": self._password_hash(rng, user_id)}
+
+    def courses(self):
+        for y, year in enumerate(self.years):
+            for k in range(self.courses_per_year):
+                rng = self._rng("course", (year, k))
+                yield {
+                    "id": self.course_id(year, k),
+                    "title": f"پایان‌نامه - {rng.choice(FIELDS)}",
+                    "professor_id": self.professor_id((y * self.courses_per_year + k) % self.professors),
+                    "year": year, "semester": SEMESTERS[k % 2], "capacity": self.capacity,
+                    "resources": rng.choice(RESOURCES), "sessions": rng.randint(8, 16), "credits": 6
+                }
+
+    def _histories(self):
+        """Yields (proposal, thesis or None) for every student, in order."""
+        approved_per_course = {}
+        approved_per_professor = {}
+        for i in range(self.students):
+            rng = self._rng("history", i)
+            y = i * len(self.years) // self.students
+            year, k = self.years[y], rng.randrange(self.courses_per_year)
+            course_id = self.course_id(year, k)
+            supervisor = self.professor_id((y * self.courses_per_year + k) % self.professors)
+
+            request_date = _semester_start(year, SEMESTERS[k % 2]) + timedelta(days=rng.randint(0, 30))
+            approval_date = request_date + timedelta(days=rng.randint(3, 30))
+            if request_date > self.today:
+                continue
+            if rng.random() < self.acceptance_rate:
+                full = (approved_per_course.get(course_id, 0) >= self.capacity
+                        or approved_per_professor.get(supervisor, 0) >= self.supervision_limit)
+                status = "pending" if full or approval_date > self.today else "approved"
+            else:
+                status = "rejected" if rng.random() < REJECTED_SHARE and approval_date <= self.today else "pending"
+            proposal = {
+                "proposal_id": f"P{i + 1:07d}", "student_id": f"stu{i + 1:07d}",
+                "course_id": course_id, "request_date": request_date.isoformat(),
+                "status": status, "approval_date": approval_date.isoformat() if status == "approved" else None
+            }
+            if status != "approved":
+                yield proposal, None
+                continue
+            approved_per_course[course_id] = approved_per_course.get(course_id, 0) + 1
+            approved_per_professor[supervisor] = approved_per_professor.get(supervisor, 0) + 1
+
+            defense_request_date = approval_date + timedelta(days=rng.randint(90, 300))
+            if rng.random() >= self.completion_rate or defense_request_date > self.today:
+                yield proposal, None
+                continue
+            title, abstract, keywords = _thesis_text(rng)
+            thesis = {
+                "thesis_id": f"T{i + 1:07d}", "proposal_id": proposal['proposal_id'],
+                "title": title, "abstract": abstract, "keywords": keywords,
+                "pdf_path": f"theses/T{i + 1:07d}.pdf", "cover_image_path": f"theses/T{i + 1:07d}.jpg",
+                "status": "defense_pending", "defense_request_date": defense_request_date.isoformat(),
+                "grades": {}, "reviewers": []
+            }
+            decision_date = defense_request_date + timedelta(days=rng.randint(3, 14))
+            if decision_date <= self.today:
+                if rng.random() < DEFENSE_REJECTED_SHARE:
+                    thesis['status'] = "defense_rejected"
+                else:
+                    defense_date = decision_date + timedelta(days=rng.randint(14, 60))
+                    others = [p for p in rng.sample(range(self.professors), min(3, self.professors))
+                              if self.professor_id(p) != supervisor]
+                    thesis['status'] = "defense_approved"
+                    thesis['defense_date'] = defense_date.isoformat()
+                    thesis['reviewers'] = [self.professor_id(p) for p in others[:rng.randint(1, 2)]]
+                    if defense_date <= self.today:
+                        graders = thesis['reviewers'] + [supervisor]
+                        if rng.random() < GRADING_SHARE:
+                            graders = graders[:rng.randrange(len(graders))]
+                        else:
+                            thesis['status'] = "graded"
+                        base = rng.uniform(10, 20)
+                        thesis['grades'] = {
+                            grader: round(min(20, max(0, base + rng.uniform(-2, 2))) * 4) / 4 for grader in graders
+                        }
+            yield proposal, thesis
+
+    def proposals(self):
+        return (proposal for proposal, _ in self._histories())
+
+    def theses(self):
+        return (thesis for _, thesis in self._histories() if thesis)
+
+def generate(dataset, derived=True):
+    """
+    Replaces the data with a synthetic dataset, streaming each collection to
+    disk, then rebuilds the counters, the archive view and the search index.
+    Only the streaming is bounded in memory: the rebuilds load every
+    collection. With derived=False the derived data is emptied instead, and
+    built on first use. Returns {collection: number of records}.
+    """
+    counts = {}
+    for name, records in (("users", dataset.users()), ("courses", dataset.courses()),
+                          ("proposals", dataset.proposals()), ("theses", dataset.theses())):
+        counts[name] = data_manager.write_stream(name, records)
+        print(f"-> {counts[name]} {name} written.")
+    data_manager.write_stream(partitions.CATALOG, [])
+    if derived:
+        aggregates.rebuild()
+        archive.rebuild()
+        fulltext.rebuild()
+    else:
+        for name in ("counters", "archive", "archive_docs"):
+            data_manager.write_stream(name, [])
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the data with a sample or a synthetic dataset of any size.")
+    parser.add_argument("--students", type=int, help="generate a synthetic dataset with this many students")
+    parser.add_argument("--professors", type=int, help="default: enough to supervise the accepted students")
+    parser.add_argument("--courses-per-year", type=int, help="default: about one course per professor")
+    parser.add_argument("--years", type=int, nargs=2, default=(1398, 1404), metavar=("FIRST", "LAST"))
+    parser.add_argument("--acceptance-rate", type=float, default=0.7)
+    parser.add_argument("--completion-rate", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=date.fromisoformat, help="YYYY-MM-DD, default: the current date")
+    parser.add_argument("--hash-iterations", type=int, default=1,
+                        help="cost of the synthetic users' password hashes (default 1, to generate quickly)")
+    parser.add_argument("--skip-derived", action="store_true",
+                        help="do not rebuild the counters, archive view and search index, whose rebuild loads every "
+                             "collection into memory; they are built on first use")
+    args = parser.parse_args()
+    if args.students is None:
+        seed()
+        return
+    dataset = Dataset(args.students, args.professors, args.courses_per_year, tuple(args.years),
+                      args.acceptance_rate, args.completion_rate, args.seed, args.today, args.hash_iterations)
+    print(f"Generating {dataset.students} students, {dataset.professors} professors and "
+          f"{dataset.courses_per_year * len(dataset.years)} courses (as of {dataset.today})...")
+    generate(dataset, derived=not args.skip_derived)
     print("\nDatabase seeding complete!")
 
 if __name__ == "__main__":
-    seed()
+    main()
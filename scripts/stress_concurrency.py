@@ -0,0 +1,100 @@
+# scripts/stress_concurrency.py
+import argparse
+import multiprocessing
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+# Add the project root to the Python path to allow importing from 'src'
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src import aggregates
+from src import data_manager
+from src import models
+from src import utils
+
+def _init_worker(data_dir, mode):
+    data_manager.set_data_dir(data_dir)
+    data_manager.set_storage_mode(mode)
+
+def _submit_requests(worker_id, count):
+    """Submits one request for each of `count` new students; every one must be accepted."""
+    for i in range(count):
+        student = models.Student(f"stu-{worker_id}-{i}", "stress")
+        success, _ = student.submit_thesis_request("CRS-BIG")
+        assert success
+    return count
+
+def _approve(proposal_id):
+    professor = models.Professor("prof-stress", "stress")
+    success, _ = professor.decide_on_proposal(proposal_id, 'approved')
+    return success
+
+def _seed(capacity, students):
+    data_manager.save_users([
+        {"id": "prof-stress", "name": "stress", "role": "professor", "password_hash": utils.hash_password("x")},
+    ])
+    data_manager.save_courses([
+        {"id": "CRS-BIG", "title": "big", "professor_id": "prof-stress", "year": 1404,
+         "semester": "نیمسال اول", "capacity": 10 ** 9, "resources": "", "sessions": 1, "credits": 6},
+        {"id": "CRS-SMALL", "title": "small", "professor_id": "prof-stress", "year": 1404,
+         "semester": "نیمسال اول", "capacity": capacity, "resources": "", "sessions": 1, "credits": 6},
+    ])
+    data_manager.save_proposals([
+        {"proposal_id": f"p{i}", "student_id": f"stu-small-{i}", "course_id": "CRS-SMALL",
+         "request_date": "2025-01-01", "status": "pending", "approval_date": None}
+        for i in range(students)
+    ])
+    data_manager.save_theses([])
+
+def run(mode, workers, ops, capacity):
+    """
+    Runs two contention scenarios with `workers` concurrent processes:
+    - lost updates: every worker appends `ops` proposals; all must survive.
+    - limits: every worker approves a different proposal of one small course;
+      approvals must not exceed the course capacity or the supervision limit.
+    """
+    data_dir = tempfile.mkdtemp()
+    ok = True
+    try:
+        _init_worker(data_dir, mode)
+        _seed(capacity, workers)
+
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(data_dir, mode)) as pool:
+            started = time.perf_counter()
+            written = sum(pool.starmap(_submit_requests, [(w, ops) for w in range(workers)]))
+            elapsed = time.perf_counter() - started
+
+            stored = sum(1 for p in data_manager.get_proposals(frozen=True) if p['course_id'] == 'CRS-BIG')
+            print(f"[{mode}] lost updates: wrote {written}, stored {stored} "
+                  f"({written / elapsed:.0f} writes/s with {workers} writers)")
+            ok = ok and stored == written
+
+            approved = sum(pool.map(_approve, [f"p{i}" for i in range(workers)]))
+            limit = min(capacity, models.Professor("prof-stress", "stress").supervision_limit)
+            stored = sum(1 for p in data_manager.get_proposals(frozen=True) if p['status'] == 'approved')
+            print(f"[{mode}] limits: {approved} approvals reported, {stored} stored, limit {limit}")
+            ok = ok and approved == stored <= limit
+
+            mismatches = aggregates.verify()
+            print(f"[{mode}] counters: {'consistent' if not mismatches else mismatches}")
+            ok = ok and not mismatches
+    finally:
+        data_manager.sqlite_store.close_all()
+        shutil.rmtree(data_dir)
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent writers stress test.")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=20, help="writes per worker")
+    parser.add_argument("--capacity", type=int, default=3)
+    parser.add_argument("--mode", choices=data_manager.STORAGE_MODES, action="append")
+    args = parser.parse_args()
+
+    results = [run(mode, args.workers, args.ops, args.capacity) for mode in (args.mode or data_manager.STORAGE_MODES)]
+    print("OK" if all(results) else "FAILED")
+    sys.exit(0 if all(results) else 1)
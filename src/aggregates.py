@@ -0,0 +1,189 @@
+# src/aggregates.py
+# Materialized counters kept in the 'counters' collection:
+#   course_approved:<course_id>       approved proposals of a course
+#   professor_supervision:<user_id>   approved proposals in a professor's courses
+#   professor_review:<user_id>        theses a professor is a reviewer of
+#   facet:<facet>:<value>             archived theses per year, semester,
+#                                     supervisor, reviewer and letter grade
+# The mutating model methods apply the change they made through
+# record_changes(), so capacity and load lookups are a single index probe.
+# rebuild() recomputes everything from the collections and their cold
+# partitions, and verify() reports counters that disagree with them. Moving
+# records to a cold partition (see partitions.py) changes no counter.
+#
+# Deltas are applied while the source collection's lock is held, and
+# rebuild()/verify() hold the locks of all source collections, so a rebuild
+# never runs between a saved change and its delta. Locks are always taken in
+# the order proposals, theses, archive, counters.
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from . import data_manager
+from . import indexes
+from . import partitions
+
+# Marks that the counters collection has been built at least once.
+BUILT_KEY = "meta:built"
+
+def _proposal_keys(proposal):
+    """Returns the counters a proposal contributes to."""
+    if proposal['status'] != 'approved':
+        return []
+    keys = [f"course_approved:{proposal['course_id']}"]
+    course = indexes.get('courses', proposal['course_id'])
+    if course:
+        keys.append(f"professor_supervision:{course['professor_id']}")
+    return keys
+
+def _thesis_keys(thesis):
+    """Returns the counters a thesis contributes to."""
+    return [f"professor_review:{reviewer_id}" for reviewer_id in dict.fromkeys(thesis.get('reviewers') or ())]
+
+# Facet name -> field of the archive view it counts (list fields count each element once)
+FACET_FIELDS = {
+    "year": "year",
+    "semester": "semester",
+    "supervisor": "supervisor_id",
+    "reviewer": "reviewer_ids",
+    "letter": "final_grade_letter",
+}
+
+def _facet_values(record):
+    """Yields (facet, value) for every facet bucket an archive record falls into."""
+    for facet, field in FACET_FIELDS.items():
+        value = record.get(field)
+        for v in dict.fromkeys(value) if isinstance(value, (list, tuple)) else (value,):
+            yield facet, str(v)
+
+def _is_archived_thesis(record):
+    # Skips the meta record of the archive view
+    return 'final_grade_letter' in record
+
+def _archive_keys(record):
+    """Returns the counters an archive record contributes to."""
+    if not _is_archived_thesis(record):
+        return []
+    return [f"facet:{facet}:{value}" for facet, value in _facet_values(record)]
+
+_KEY_FUNCTIONS = {"proposals": _proposal_keys, "theses": _thesis_keys, "archive": _archive_keys}
+
+def compute():
+    """Computes all counters from scratch in one pass per collection."""
+    counts = Counter()
+    for name, key_function in _KEY_FUNCTIONS.items():
+        for part in partitions.names(name):
+            for record in data_manager.get_collection(part, frozen=True):
+                counts.update(key_function(record))
+    return counts
+
+@contextmanager
+def _source_locks():
+    """Holds the locks of all collections the counters are derived from."""
+    with ExitStack() as stack:
+        for name in _KEY_FUNCTIONS:
+            stack.enter_context(data_manager.locked(data_manager.collection_file(name)))
+        yield
+
+def rebuild():
+    """Recomputes and saves all counters."""
+    with _source_locks():
+        counts = compute()
+        records = [{"id": key, "value": value} for key, value in sorted(counts.items())]
+        records.append({"id": BUILT_KEY, "value": 1})
+        data_manager.write_data(data_manager.COUNTERS_FILE, records)
+    return counts
+
+def verify():
+    """Returns {key: (stored, actual)} for every counter that is out of date."""
+    ensure_built()
+    with _source_locks():
+        actual = compute()
+        stored = {r['id']: r['value'] for r in data_manager.get_collection('counters', frozen=True) if r['id'] != BUILT_KEY}
+    return {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in set(stored) | set(actual)
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+
+def is_built():
+    """Tells whether the counters collection has been built."""
+    return indexes.get('counters', BUILT_KEY) is not None
+
+def ensure_built():
+    """Builds the counters if they were never built."""
+    if not is_built():
+        rebuild()
+
+def record_changes(name, changes):
+    """
+    Applies the effect of changed records to the counters.
+    changes is a list of (before, after) pairs; before is None for new
+    records and after is None for deleted ones. Must be called while the
+    source collection's lock is held (see data_manager.update's on_success).
+    If the counters were never built, nothing is recorded: the first
+    rebuild() will include the change.
+    """
+    key_function = _KEY_FUNCTIONS.get(name)
+    if key_function is None or not changes:
+        return
+    delta = Counter()
+    for before, after in changes:
+        if before is not None:
+            delta.subtract(key_function(before))
+        if after is not None:
+            delta.update(key_function(after))
+    delta = {key: value for key, value in delta.items() if value}
+    if not delta:
+        return
+
+    def apply(counters):
+        if indexes.locate(counters, 'counters', BUILT_KEY) is None:
+            return False, None
+        for key, value in delta.items():
+            counter = indexes.locate(counters, 'counters', key)
+            if counter is None:
+                counters.append({"id": key, "value": value})
+            else:
+                counter['value'] += value
+        return True, None
+
+    data_manager.update('counters', apply)
+
+def get(key):
+    """Returns the current value of a counter."""
+    ensure_built()
+    counter = indexes.get('counters', key)
+    return counter['value'] if counter else 0
+
+def course_approved(course_id):
+    """Returns the number of approved proposals of a course."""
+    return get(f"course_approved:{course_id}")
+
+def professor_supervision(professor_id):
+    """Returns the number of approved proposals in a professor's courses."""
+    return get(f"professor_supervision:{professor_id}")
+
+def professor_review(professor_id):
+    """Returns the number of theses a professor reviews."""
+    return get(f"professor_review:{professor_id}")
+
+def facets(records=None):
+    """
+    Returns {facet: {value: count}} with every facet's buckets, largest first.
+    Without records, the counts cover the whole archive and come from the
+    counters; otherwise they are counted over the given archive records.
+    """
+    counts = {facet: Counter() for facet in FACET_FIELDS}
+    if records is None:
+        ensure_built()
+        for counter in data_manager.get_collection('counters', frozen=True):
+            if counter['id'].startswith("facet:") and counter['value']:
+                _, facet, value = counter['id'].split(":", 2)
+                counts[facet][value] = counter['value']
+    else:
+        for record in filter(_is_archived_thesis, records):
+            for facet, value in _facet_values(record):
+                counts[facet][value] += 1
+    return {
+        facet: dict(sorted(counter.items(), key=lambda item: (-item[1], item[0])))
+        for facet, counter in counts.items()
+    }
@@ -0,0 +1,273 @@
+# src/archive.py
+# Denormalized archive view kept in the 'archive' collection: one record per
+# archived (graded or defended) thesis with everything an archive search
+# result shows, so searching the archive needs no joins.
+#   {"thesis_id", "title", "abstract", "keywords", "author", "student_id",
+#    "year", "semester", "course_id", "supervisor", "supervisor_id",
+#    "reviewers", "reviewer_ids", "download_link", "final_grade_score",
+#    "final_grade_letter"}
+# Records follow the order of the theses collection. Professor.submit_grade
+# writes a thesis' record once it is graded (see record()). Names, years and
+# semesters are copied from users and courses; the meta record remembers the
+# versions of those two collections the view was checked against, and once
+# either has been saved since, fresh() re-derives the records whose copies
+# no longer match.
+# Every change to the view is passed on to aggregates, which keeps the facet
+# counts of the whole archive.
+# The theses moved to a cold partition (see partitions.py) have their records
+# in the view's partition of the same year, archive@<year>, which follow the
+# order of theses@<year>; the view itself holds those of the other theses.
+# views() lists the partitions, and a search on a year opens only its own.
+# Lock order: theses, archive, counters.
+from itertools import chain
+from . import aggregates
+from . import data_manager
+from . import indexes
+from . import partitions
+from . import utils
+
+ARCHIVED_STATUSES = ('graded', 'defended')
+
+# Fields of an archive search result, in display order
+RESULT_FIELDS = (
+    "title", "abstract", "keywords", "author", "year", "semester", "supervisor",
+    "reviewers", "download_link", "final_grade_score", "final_grade_letter",
+)
+
+# search_by values matched as substrings of a text field, and that field
+SUBSTRING_FIELDS = {
+    'title': 'title',
+    'keyword': 'keywords',
+    'author': 'author',
+    'supervisor': 'supervisor',
+    'reviewer': 'reviewers',
+}
+
+# Holds the source versions; it is the first record of the view.
+META_KEY = "meta:sources"
+
+def build_record(thesis, proposals='proposals'):
+    """
+    Returns the archive record of a thesis, or None if its proposal is
+    missing from proposals (the collection, or the partition of the thesis).
+    """
+    proposal = indexes.get(proposals, thesis['proposal_id'])
+    if not proposal:
+        return None
+
+    student = indexes.get('users', proposal['student_id'])
+    course = indexes.get('courses', proposal['course_id'])
+    supervisor = indexes.get('users', course['professor_id'])
+    reviewers = [r for r in (indexes.get('users', r_id) for r_id in thesis['reviewers']) if r]
+    total_score = sum(thesis['grades'].values())
+    avg_score = total_score / len(thesis['grades']) if thesis['grades'] else 0
+
+    return {
+        "thesis_id": thesis['thesis_id'],
+        "title": thesis['title'],
+        "abstract": thesis['abstract'],
+        "keywords": thesis['keywords'],
+        "author": student['name'],
+        "student_id": student['id'],
+        "year": course['year'],
+        "semester": course['semester'],
+        "course_id": course['id'],
+        "supervisor": supervisor['name'],
+        "supervisor_id": supervisor['id'],
+        "reviewers": [r['name'] for r in reviewers],
+        "reviewer_ids": [r['id'] for r in reviewers],
+        "download_link": thesis['pdf_path'],
+        "final_grade_score": f"{avg_score:.2f}",
+        "final_grade_letter": utils.get_letter_grade(avg_score)
+    }
+
+def _sources():
+    return {name: data_manager.collection_version(name) for name in ('users', 'courses')}
+
+def _build_records(theses, proposals):
+    records = []
+    for thesis in indexes.find_any(theses, 'status', ARCHIVED_STATUSES):
+        record = build_record(thesis, proposals)
+        if record:
+            records.append(record)
+    return records
+
+def rebuild():
+    """
+    Re-derives the whole view, with its cold partitions, from the
+    collections. Returns the number of records.
+    """
+    with data_manager.locked(data_manager.collection_file('theses')):
+        # Versions are taken before reading, so a concurrent save of users or
+        # courses is picked up by the next fresh() check.
+        views = {'archive': [dict(_sources(), thesis_id=META_KEY)] + _build_records('theses', 'proposals')}
+        for year in partitions.years('theses'):
+            views[data_manager.partition('archive', year)] = _build_records(
+                data_manager.partition('theses', year), data_manager.partition('proposals', year))
+        archive_file = data_manager.collection_file('archive')
+        with data_manager.locked(archive_file):
+            old = {r['thesis_id']: r for name in views for r in data_manager.get_collection(name, frozen=True)}
+            for name, records in views.items():
+                data_manager.write_data(data_manager.collection_file(name), records)
+            new = {r['thesis_id']: r for records in views.values() for r in records}
+            aggregates.record_changes('archive', [
+                (old.get(key), new.get(key)) for key in dict.fromkeys(list(old) + list(new))
+                if old.get(key) != new.get(key)
+            ])
+    return len(new) - 1
+
+def is_fresh():
+    """Tells whether the view is built and up to date, i.e. fresh() would save nothing."""
+    meta = indexes.get('archive', META_KEY)
+    return meta is not None and all(meta.get(name) == version for name, version in _sources().items())
+
+def fresh():
+    """Makes sure the view is built and up to date with users and courses."""
+    meta = indexes.get('archive', META_KEY)
+    if meta is None:
+        rebuild()
+    elif any(meta.get(name) != version for name, version in _sources().items()):
+        _refresh()
+
+def _current(record):
+    """Tells whether the names, year and semester a record copied from users and courses are unchanged."""
+    student = indexes.get('users', record['student_id'])
+    course = indexes.get('courses', record['course_id'])
+    supervisor = indexes.get('users', course['professor_id']) if course else None
+    reviewers = [indexes.get('users', r_id) for r_id in record['reviewer_ids']]
+    return (student is not None and supervisor is not None and all(reviewers)
+            and student['name'] == record['author']
+            and (course['year'], course['semester']) == (record['year'], record['semester'])
+            and (supervisor['id'], supervisor['name']) == (record['supervisor_id'], record['supervisor'])
+            and [r['name'] for r in reviewers] == list(record['reviewers']))
+
+def _refresh_records(view, theses, proposals):
+    """
+    Re-derives the records of a mutable copy of a view partition that are
+    not _current(), in place. Returns their changes as (old, new) pairs.
+    """
+    changes = []
+    for record in view:
+        if record['thesis_id'] == META_KEY or _current(record):
+            continue
+        thesis = indexes.get(theses, record['thesis_id'])
+        entry = build_record(thesis, proposals) if thesis else None
+        changes.append((dict(record), entry))
+        record.clear()
+        record.update(entry or {"thesis_id": None})
+    if any(new is None for _, new in changes):
+        view[:] = [r for r in view if r['thesis_id'] is not None]
+    return changes
+
+def _refresh():
+    """Brings the view up to date after users or courses were saved."""
+    with data_manager.locked(data_manager.collection_file('theses')):
+        with data_manager.locked(data_manager.collection_file('archive')):
+            # Versions are taken before reading, as in rebuild().
+            sources = _sources()
+            for year in partitions.years('archive'):
+                name = data_manager.partition('archive', year)
+                view = data_manager.get_collection(name)
+                changes = _refresh_records(view, data_manager.partition('theses', year),
+                                           data_manager.partition('proposals', year))
+                if changes:
+                    data_manager.write_data(data_manager.collection_file(name), view)
+                    aggregates.record_changes('archive', changes)
+            changes = []
+
+            def refresh(view):
+                meta = indexes.locate(view, 'archive', META_KEY)
+                changes[:] = _refresh_records(view, 'theses', 'proposals')
+                meta.update(sources)
+                return True, None
+
+            data_manager.update('archive', refresh, on_success=lambda: aggregates.record_changes('archive', changes))
+
+def record(thesis):
+    """
+    Writes the record of one thesis, or removes it if the thesis is no longer
+    archived. Must be called while the theses lock is held (see
+    data_manager.update's on_success). Nothing is written if the view was
+    never built: building it will include the thesis.
+    """
+    record_all([thesis])
+
+def record_all(theses):
+    """Like record(), for many theses in one write of the view."""
+    entries = [(thesis['thesis_id'], build_record(thesis) if thesis['status'] in ARCHIVED_STATUSES else None)
+               for thesis in theses]
+    changes = []
+
+    def apply(view):
+        changes.clear()
+        if indexes.locate(view, 'archive', META_KEY) is None:
+            return False, None
+        for thesis_id, entry in entries:
+            existing = indexes.locate(view, 'archive', thesis_id)
+            if existing is None and entry is None:
+                continue
+            changes.append((dict(existing) if existing else None, entry))
+            if existing is None:
+                view.insert(_insert_at(view, thesis_id), entry)
+            elif entry is None:
+                view.remove(existing)
+            else:
+                existing.clear()
+                existing.update(entry)
+        return bool(changes), None
+
+    data_manager.update('archive', apply, on_success=lambda: aggregates.record_changes('archive', changes))
+
+def _insert_at(view, thesis_id):
+    """Returns where a thesis' record goes in a mutable copy of the view, which follows the theses order."""
+    target = indexes.position('theses', thesis_id)
+    if target is None:
+        return len(view)
+    # The meta record stays first
+    low, high = 1, len(view)
+    while low < high:
+        middle = (low + high) // 2
+        position = indexes.position('theses', view[middle]['thesis_id'])
+        if position is not None and position < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def views(years=None):
+    """
+    Returns the names of the view's partitions in archive order: the cold
+    ones (only those of the given years, if any), then the view itself.
+    """
+    return partitions.names('archive', years)
+
+def get(thesis_id):
+    """Returns the (read-only) archive record of a thesis, or None."""
+    fresh()
+    return lookup(thesis_id)
+
+def lookup(thesis_id):
+    """Like get(), without checking that the view is up to date."""
+    for name in reversed(views()):
+        record = indexes.get(name, thesis_id)
+        if record is not None:
+            return record
+    return None
+
+def records():
+    """Returns the (read-only) archive records of all partitions, without the meta record."""
+    fresh()
+    parts = [data_manager.get_collection(name, frozen=True) for name in views()]
+    view = parts[-1]
+    parts[-1] = view[1:] if view and view[0]['thesis_id'] == META_KEY else view
+    return parts[0] if len(parts) == 1 else tuple(chain.from_iterable(parts))
+
+def check_fields(fields):
+    """Raises ValueError if fields names anything that is not a result field."""
+    unknown = set(fields or ()) - set(RESULT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown archive fields: {', '.join(sorted(unknown))}")
+
+def result(record, fields=None):
+    """Returns the search result fields of an archive record, or only the given ones."""
+    return {field: data_manager.thaw(record[field]) for field in fields or RESULT_FIELDS}
@@ -0,0 +1,177 @@
+# src/auth.py
+# Logins that do not load the users collection, and sessions that outlive
+# a process.
+#
+# Credentials: the id, name, role and password hash of every user are kept
+# in a small SQLite database (CREDENTIALS_FILE in the data directory),
+# indexed by id, so a login looks up one row. It is derived from the users
+# collection and rebuilt whenever the collection's version moved past the
+# one it was built from.
+#
+# Sessions: a token names the user and its expiry, signed with HMAC-SHA256
+# under a key kept in the data directory (SESSION_KEY_FILE). A valid token
+# stands in for the password. It also carries a keyed fingerprint of the
+# user's password hash, so session_credentials() refuses it once the user
+# is deleted, changes role or changes password. The CLI keeps its token in
+# SESSION_FILE, so running it again resumes the session.
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from . import data_manager
+
+CREDENTIALS_FILE = 'credentials.db'
+SESSION_KEY_FILE = 'session.key'
+
+# Seconds a session token is valid (THESIS_SESSION_TTL)
+SESSION_TTL = int(os.environ.get('THESIS_SESSION_TTL', str(8 * 3600)))
+
+# Where the CLI keeps its session token; THESIS_SESSION_FILE='' keeps none.
+SESSION_FILE = os.environ.get('THESIS_SESSION_FILE', os.path.join(os.path.expanduser('~'), '.thesis_session'))
+
+# (pid, thread id, db path) -> connection, as in sqlite_store
+_connections = {}
+# data directory -> signing key
+_keys = {}
+
+def _connect():
+    path = os.path.join(data_manager.DATA_DIR, CREDENTIALS_FILE)
+    key = (os.getpid(), threading.get_ident(), path)
+    conn = _connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS credentials "
+                     "(id TEXT PRIMARY KEY, name TEXT NOT NULL, role TEXT NOT NULL, password_hash TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.commit()
+        _connections[key] = conn
+    return conn
+
+def _rebuild(conn, version):
+    """Copies the credentials of all users, as of the given users version."""
+    users = data_manager.get_users(frozen=True)
+    with conn:
+        conn.execute("DELETE FROM credentials")
+        conn.executemany("INSERT OR REPLACE INTO credentials VALUES (?, ?, ?, ?)",
+                         ((u['id'], u['name'], u['role'], u['password_hash']) for u in users))
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('users_version', ?)", (version,))
+
+def credentials(user_id):
+    """Returns {'id', 'name', 'role', 'password_hash'} of a user, or None."""
+    conn = _connect()
+    # Read first: users saved from here on move the version past it again.
+    version = data_manager.collection_version('users')
+    row = conn.execute("SELECT value FROM meta WHERE key = 'users_version'").fetchone()
+    if row is None or row[0] != version:
+        _rebuild(conn, version)
+    row = conn.execute("SELECT id, name, role, password_hash FROM credentials WHERE id = ?", (user_id,)).fetchone()
+    return dict(zip(('id', 'name', 'role', 'password_hash'), row)) if row else None
+
+# Length of the signing key in bytes; a shorter key file is refused
+KEY_BYTES = 32
+
+def _key():
+    """Returns the data directory's signing key, creating it on first use."""
+    path = os.path.join(data_manager.DATA_DIR, SESSION_KEY_FILE)
+    key = _keys.get(path)
+    if key is None:
+        if not os.path.exists(path):
+            # Written and synced under a temporary name, then linked into
+            # place: readers only ever see a complete key, and if several
+            # processes race, the first link wins and the others read it.
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(secrets.token_bytes(KEY_BYTES))
+                    f.flush()
+                    os.fsync(f.fileno())
+                try:
+                    os.link(tmp_path, path)
+                except FileExistsError:
+                    pass
+            finally:
+                os.unlink(tmp_path)
+        with open(path, 'rb') as f:
+            key = f.read()
+        if len(key) < KEY_BYTES:
+            raise RuntimeError(f"Session key {path} is shorter than {KEY_BYTES} bytes")
+        _keys[path] = key
+    return key
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _fingerprint(password_hash):
+    return _encode(hmac.digest(_key(), password_hash.encode('utf-8'), hashlib.sha256)[:12])
+
+def issue_token(user_id, name, role, password_hash, ttl=None):
+    """Returns a signed session token for a user, valid for ttl seconds (default SESSION_TTL)."""
+    payload = {"id": user_id, "name": name, "role": role, "password": _fingerprint(password_hash),
+               "expires": int(time.time()) + (ttl or SESSION_TTL)}
+    body = _encode(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+    return f"{body}.{_encode(hmac.digest(_key(), body.encode('ascii'), hashlib.sha256))}"
+
+def verify_token(token):
+    """Returns the payload ({'id', 'name', 'role', 'expires'}) of a valid, unexpired token, else None."""
+    try:
+        body, signature = token.split('.')
+        expected = hmac.digest(_key(), body.encode('ascii'), hashlib.sha256)
+        if not hmac.compare_digest(_decode(signature), expected):
+            return None
+        payload = json.loads(_decode(body))
+    except (AttributeError, ValueError, UnicodeError):
+        return None
+    return payload if payload.get("expires", 0) > time.time() else None
+
+def session_credentials(token):
+    """
+    Returns the current credentials (see credentials()) of a valid token's
+    user, or None if the token is invalid or expired, or the user has since
+    been deleted or changed role or password.
+    """
+    payload = verify_token(token)
+    if payload is None:
+        return None
+    user = credentials(payload['id'])
+    if (user is None or user['role'] != payload['role']
+            or not hmac.compare_digest(_fingerprint(user['password_hash']), str(payload.get('password')))):
+        return None
+    return user
+
+def save_session(token):
+    """Keeps the CLI's session token in SESSION_FILE (readable by the owner only)."""
+    if not SESSION_FILE:
+        return
+    tmp_path = f"{SESSION_FILE}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write(token)
+    os.replace(tmp_path, SESSION_FILE)
+
+def load_session():
+    """Returns the CLI's saved session token, or None."""
+    if not SESSION_FILE:
+        return None
+    try:
+        with open(SESSION_FILE, encoding='ascii') as f:
+            return f.read().strip() or None
+    except (OSError, UnicodeError):
+        return None
+
+def forget_session():
+    """Deletes the CLI's saved session token (on logout)."""
+    if SESSION_FILE:
+        try:
+            os.unlink(SESSION_FILE)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,154 @@
+# src/batch.py
+# Bulk administrative operations behind the non-interactive subcommands of
+# main.py. Each reads all its rows first, rejects the malformed ones, and
+# applies the rest through one of the batch functions of models (one
+# load-validate-write cycle, with the rules of the Professor methods).
+# Every function returns one (row number, key, success, message) per input
+# row, in input order. Rows act as the professor the rules need: the
+# supervisor of the proposal or thesis, and for grades the grader named in
+# the row.
+import csv
+import json
+from datetime import datetime
+from . import archive
+from . import indexes
+from . import models
+
+# Columns of the input files
+GRADE_COLUMNS = ("thesis_id", "professor_id", "grade")
+DEFENSE_COLUMNS = ("thesis_id", "defense_date", "reviewers")
+
+def _professor(user_id):
+    """Returns the Professor with this id, or None."""
+    user = indexes.get('users', user_id)
+    if not user or user['role'] != 'professor':
+        return None
+    return models.Professor(user_id=user['id'], name=user['name'])
+
+def _supervisor(proposal):
+    course = indexes.get('courses', proposal['course_id']) if proposal else None
+    return _professor(course['professor_id']) if course else None
+
+def _apply(rows, function):
+    """
+    rows: (row number, key, batch row or error message). Runs the batch rows
+    through function and returns the report of all rows.
+    """
+    valid = [row for row in rows if not isinstance(row[2], str)]
+    outcomes = iter(function([batch_row for _, _, batch_row in valid]) if valid else [])
+    report = []
+    for number, key, batch_row in rows:
+        if isinstance(batch_row, str):
+            report.append((number, key, False, batch_row))
+        else:
+            success, message = next(outcomes)
+            report.append((number, key, success, message))
+    return report
+
+def read_ids(f):
+    """Reads one id per line, skipping blank lines and '#' comments. Returns [(line number, id)]."""
+    ids = []
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            ids.append((number, line))
+    return ids
+
+def decide_proposals(ids, decision, professor_id=None):
+    """
+    Approves or rejects proposals, as their supervisor or, if professor_id
+    is given, as that professor.
+    """
+    acting = _professor(professor_id) if professor_id else None
+    if professor_id and acting is None:
+        return [(number, proposal_id, False, "استاد یافت نشد.") for number, proposal_id in ids]
+    rows = []
+    for number, proposal_id in ids:
+        professor = acting or _supervisor(indexes.get('proposals', proposal_id))
+        if professor is None:
+            rows.append((number, proposal_id, "درخواست مورد نظر یافت نشد."))
+        else:
+            rows.append((number, proposal_id, (professor, proposal_id, decision)))
+    return _apply(rows, models.decide_on_proposals)
+
+def _read_csv(f, columns):
+    """Yields (line number, row dict or error message) for a CSV file with a header."""
+    reader = csv.DictReader(f)
+    missing = [c for c in columns if c not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"ستون‌های لازم در فایل نیست: {', '.join(missing)}")
+    for row in reader:
+        values = {c: (row.get(c) or '').strip() for c in columns}
+        empty = [c for c in columns if not values[c] and c != "reviewers"]
+        yield reader.line_num, (f"ستون خالی: {', '.join(empty)}" if empty else values)
+
+def import_grades(f):
+    """Imports grades from a CSV file with columns thesis_id, professor_id, grade."""
+    rows = []
+    for number, values in _read_csv(f, GRADE_COLUMNS):
+        if isinstance(values, str):
+            rows.append((number, None, values))
+            continue
+        key = f"{values['thesis_id']}/{values['professor_id']}"
+        try:
+            grade = float(values['grade'])
+        except ValueError:
+            grade = None
+        professor = _professor(values['professor_id'])
+        if grade is None or not 0 <= grade <= 20:
+            rows.append((number, key, "نمره باید عددی بین ۰ و ۲۰ باشد."))
+        elif professor is None:
+            rows.append((number, key, "استاد یافت نشد."))
+        else:
+            rows.append((number, key, (professor, values['thesis_id'], grade)))
+    return _apply(rows, models.submit_grades)
+
+def approve_defenses(f):
+    """
+    Approves defense requests from a CSV file with columns thesis_id,
+    defense_date (YYYY-MM-DD) and reviewers (ids separated by ';'), as each
+    thesis' supervisor.
+    """
+    rows = []
+    for number, values in _read_csv(f, DEFENSE_COLUMNS):
+        if isinstance(values, str):
+            rows.append((number, None, values))
+            continue
+        thesis_id = values['thesis_id']
+        reviewer_ids = [r.strip() for r in values['reviewers'].split(';') if r.strip()]
+        thesis = indexes.get('theses', thesis_id)
+        supervisor = _supervisor(indexes.get('proposals', thesis['proposal_id'])) if thesis else None
+        try:
+            datetime.strptime(values['defense_date'], '%Y-%m-%d')
+        except ValueError:
+            rows.append((number, thesis_id, "تاریخ دفاع باید به شکل YYYY-MM-DD باشد."))
+            continue
+        unknown = [r for r in reviewer_ids if _professor(r) is None]
+        if supervisor is None:
+            rows.append((number, thesis_id, "پایان‌نامه یافت نشد."))
+        elif not reviewer_ids or unknown:
+            rows.append((number, thesis_id, f"داور نامعتبر: {', '.join(unknown) or '-'}"))
+        else:
+            rows.append((number, thesis_id, (supervisor, thesis_id, 'approved', values['defense_date'], reviewer_ids)))
+    return _apply(rows, models.decide_on_defenses)
+
+def export_archive(f, output_format="json"):
+    """Writes every archived thesis (the archive search result fields) to a text file. Returns the count."""
+    count = 0
+    if output_format == "csv":
+        writer = csv.writer(f)
+        writer.writerow(archive.RESULT_FIELDS)
+        for result in models.query_archive(""):
+            writer.writerow([
+                "; ".join(result[field]) if isinstance(result[field], list) else result[field]
+                for field in archive.RESULT_FIELDS
+            ])
+            count += 1
+        return count
+    f.write("[")
+    for result in models.query_archive(""):
+        f.write(",\n    " if count else "\n    ")
+        f.write(json.dumps(result, ensure_ascii=False))
+        count += 1
+    f.write("\n]\n" if count else "]\n")
+    return count
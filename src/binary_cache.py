@@ -0,0 +1,117 @@
+# src/binary_cache.py
+# Binary copies of the parsed JSON collections, for a fast process start.
+# Parsing a collection file is only part of the cost of a cold read: the
+# records must then be frozen (see data_manager.freeze) and indexed. So next
+# to each collection file '<file>', '<file>.bin' keeps the frozen records and
+# the data derived from them (the indexes), pickled, after a header with the
+# stamp (mtime, size, version) and a BLAKE2 digest of the source files they
+# were read from. A copy is fresh if its stamp matches the sources, or else
+# if its digest still does (e.g. the files were copied elsewhere), in which
+# case its header is rewritten with the new stamp, so the next start does
+# not hash the sources again. A reader that finds it stale parses the JSON
+# as before and writes a new copy.
+#
+# The copies are only a cache: deleting them is always safe, and
+# THESIS_BINARY_CACHE=0 turns them off. Like the JSON files next to them
+# they are trusted local data (unpickling can run code).
+import hashlib
+import os
+import pickle
+import threading
+from types import MappingProxyType
+
+ENABLED = os.environ.get('THESIS_BINARY_CACHE', '1') not in ('', '0')
+
+SUFFIX = '.bin'
+
+# Changed whenever the layout of the copies (or of what they hold) changes
+FORMAT = 4
+
+def copy_path(file_path):
+    """Returns the path of the binary copy of a collection file."""
+    return file_path + SUFFIX
+
+def _mapping(items):
+    return MappingProxyType(items)
+
+class _Pickler(pickle.Pickler):
+    """Pickles the read-only mappings of frozen data, which pickle cannot do by itself."""
+
+    def reducer_override(self, obj):
+        if type(obj) is MappingProxyType:
+            return _mapping, (dict(obj),)
+        return NotImplemented
+
+def digest(paths):
+    """Returns the BLAKE2 digest of the contents of files (missing ones count as empty)."""
+    h = hashlib.blake2b(digest_size=20)
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                while chunk := f.read(1 << 20):
+                    h.update(chunk)
+        except FileNotFoundError:
+            pass
+        h.update(b'\0')
+    return h.hexdigest()
+
+def load(file_path, stamp, sources):
+    """
+    Returns (frozen records, derived data, size) from the copy of a file if it
+    is fresh for the given stamp and source files, else None.
+    """
+    path = copy_path(file_path)
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+            if header.get('format') != FORMAT:
+                return None
+            restamp = header['stamp'] != stamp
+            if restamp and header['digest'] != digest(sources):
+                return None
+            records, derived = pickle.load(f)
+            size = f.tell()
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError, TypeError, ValueError):
+        return None
+    if restamp:
+        _restamp(path, header, stamp)
+    return records, derived, size
+
+def _restamp(path, header, stamp):
+    """Rewrites the header of a copy whose sources are unchanged but have a new stamp."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(path, 'rb') as f:
+            # Skipped if another process replaced the copy meanwhile
+            if pickle.load(f) != header:
+                return
+            body = f.read()
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(dict(header, stamp=stamp), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.write(body)
+        os.replace(tmp_path, path)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def store(file_path, stamp, source_digest, records, derived):
+    """
+    Writes the copy of a file atomically. A copy that cannot be written (e.g.
+    in a read-only data directory) is skipped: readers parse the JSON instead.
+    """
+    path = copy_path(file_path)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickler = _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickler.dump({'format': FORMAT, 'stamp': stamp, 'digest': source_digest})
+            pickler.clear_memo()
+            pickler.dump((records, derived))
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,199 @@
+# src/client.py
+# Thin client of the local server (see server.py).
+# connect() returns an object with the same interface main.py uses on the
+# models module: User.login() returns a RemoteUser whose methods, like the
+# archive and lookup functions, are forwarded to the server. Archive results
+# are fetched lazily, one page per request. Change events (subscribe(),
+# watch()) are raised after the client's own writes and when polling the
+# server finds a collection's version changed.
+import json
+import socket
+import threading
+import time
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+# Archive results fetched per request
+PAGE_SIZE = 50
+
+# Collections each write operation changes
+WRITE_COLLECTIONS = {
+    "submit_thesis_request": ("proposals",),
+    "request_defense": ("theses",),
+    "decide_on_proposal": ("proposals", "counters"),
+    "decide_on_defense": ("theses", "counters"),
+    "submit_grade": ("theses", "counters", "archive"),
+}
+
+class ServerError(Exception):
+    """An error the server reported that has no local exception type."""
+
+def parse_address(address):
+    """Returns ('unix', path) for 'unix:PATH', else ('tcp', (host, port)) for 'HOST:PORT'."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+class Connection:
+    def __init__(self, address):
+        kind, target = parse_address(address)
+        if kind == "unix":
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(target)
+        else:
+            self.sock = socket.create_connection(target)
+        self.file = self.sock.makefile('rwb')
+
+    def request(self, op, *args, session=None, **kwargs):
+        """Sends one request and returns its result, raising the error it reports."""
+        message = {"op": op, "args": list(args), "kwargs": kwargs}
+        if session:
+            message["session"] = session
+        self.file.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection")
+        response = json.loads(line)
+        if response["ok"]:
+            return response["result"]
+        if response["error"] in ("ValueError", "TypeError"):
+            raise {"ValueError": ValueError, "TypeError": TypeError}[response["error"]](response["message"])
+        raise ServerError(f"{response['error']}: {response['message']}")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+class RemoteUser:
+    """A logged-in Student or Professor whose methods run on the server."""
+
+    def __init__(self, remote, session, user):
+        self._remote = remote
+        self._session = session
+        self.user_id = user["user_id"]
+        self.name = user["name"]
+        self.role = user["role"]
+        if self.role == "professor":
+            self.supervision_limit = user["supervision_limit"]
+            self.review_limit = user["review_limit"]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._remote.request(name, *args, session=self._session, **kwargs)
+
+    def session_token(self):
+        return self._session
+
+    def __repr__(self):
+        return f"Remote{self.role.capitalize()}(id='{self.user_id}', name='{self.name}')"
+
+class Remote:
+    """Stands in for the models module, forwarding every call to the server."""
+
+    def __init__(self, address):
+        self.address = address
+        self.connection = Connection(address)
+        self.session = None
+        self.User = self
+        self._listeners = []
+        self._watching = False
+
+    def login(self, user_id, password):
+        result = self.connection.request("login", user_id, password)
+        if result is None:
+            return None
+        self.session = result["session"]
+        return RemoteUser(self, self.session, result["user"])
+
+    def resume(self, token):
+        """Resumes a session of this server from its token (see RemoteUser.session_token())."""
+        result = self.connection.request("resume", token)
+        if result is None:
+            return None
+        self.session = result["session"]
+        return RemoteUser(self, self.session, result["user"])
+
+    def request(self, op, *args, session=None, **kwargs):
+        result = self.connection.request(op, *args, session=session or self.session, **kwargs)
+        for name in WRITE_COLLECTIONS.get(op, ()):
+            self._notify(name)
+        return result
+
+    def subscribe(self, callback):
+        """Registers callback(name) to be called whenever a collection changes."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, name):
+        for callback in list(self._listeners):
+            callback(name)
+
+    def watch(self, interval=1.0):
+        """
+        Starts (once) a daemon thread that asks the server for the collection
+        versions every interval seconds, on its own connection, and notifies
+        the listeners of those that changed.
+        """
+        if self._watching:
+            return
+        self._watching = True
+        connection = Connection(self.address)
+        versions = connection.request("collection_versions", session=self.session)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    current = connection.request("collection_versions", session=self.session)
+                except (ConnectionError, ServerError):
+                    self._watching = False
+                    return
+                for name, version in current.items():
+                    if versions.get(name) != version:
+                        self._notify(name)
+                versions.update(current)
+
+        threading.Thread(target=run, name="collection-watcher", daemon=True).start()
+
+    def _pages(self, op, args, kwargs, offset, limit):
+        """Yields the results of a paged archive operation, fetching them as they are consumed."""
+        while limit is None or limit > 0:
+            size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit)
+            page = self.request(op, *args, offset=offset, limit=size, **kwargs)
+            yield from page
+            if len(page) < size:
+                return
+            offset += size
+            if limit is not None:
+                limit -= size
+
+    def iter_theses_archive(self, query, search_by="title", fields=None, offset=0, limit=None):
+        return self._pages("iter_theses_archive", (query, search_by), {"fields": fields}, offset, limit)
+
+    def query_archive(self, query, fields=None, offset=0, limit=None):
+        # Fetch the first page now, so an invalid query raises ValueError right away
+        first = self.request("query_archive", query, fields=fields, offset=offset, limit=PAGE_SIZE)
+        def results():
+            yield from first[:limit]
+            if len(first) == PAGE_SIZE and (limit is None or limit > PAGE_SIZE):
+                rest = None if limit is None else limit - PAGE_SIZE
+                yield from self._pages("query_archive", (query,), {"fields": fields}, offset + PAGE_SIZE, rest)
+        return results()
+
+    def search_theses_archive(self, query, search_by="title"):
+        return list(self.iter_theses_archive(query, search_by))
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.request(name, *args, **kwargs)
+
+def connect(address=DEFAULT_ADDRESS):
+    """Connects to a server and returns a stand-in for the models module."""
+    return Remote(address)
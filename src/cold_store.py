@@ -0,0 +1,368 @@
+# src/cold_store.py
+# Side files for the large, rarely read fields of a collection (its record
+# class's COLD_FIELDS, e.g. the abstract and keywords of theses).
+#
+# In the JSON file a record keeps only its small fields, plus
+#   "cold": [generation, offset, length]
+# locating its cold fields: a JSON object of `length` bytes at `offset` in
+# '<file>.cold.<generation>'. Those side files are append-only, so a
+# location stays valid while its generation exists; a save appends only the
+# cold fields that changed. When a generation has grown to mostly garbage, a
+# full rewrite of the collection moves the live entries to a new generation
+# and deletes all but the previous one (which readers may have just opened).
+#
+# Loaded records hold a ColdRef for their cold fields, which reads and
+# decodes the entry through an mmap of the side file on every access, so a
+# loaded collection takes memory proportional to its records, not its text.
+# Their mutable copies (ThawedRecord) keep the ColdRef until a cold field is
+# used, so saving a collection only encodes the cold fields of the records
+# that were touched.
+# Records saved before this layout keep their cold fields inline until the
+# next save.
+import glob
+import json
+import mmap
+import os
+import threading
+import weakref
+
+SUFFIX = '.cold'
+
+# Field of a stored record holding the location of its cold fields
+REF_FIELD = 'cold'
+
+# A full rewrite starts a new generation when the current one is at least
+# COMPACT_MIN_BYTES and more than COMPACT_RATIO times its live entries.
+COMPACT_MIN_BYTES = 1024 * 1024
+COMPACT_RATIO = 2
+
+# (side file path, inode) -> Segment, shared by the records of all loads.
+# Held weakly: a segment is unmapped once no ColdRef refers to it, so the
+# generations a compaction replaced do not stay mapped (and their disk space
+# is freed) in a long-running process.
+_segments = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+def segment_path(file_path, generation):
+    """Returns the path of a generation of a collection file's side file."""
+    return f"{file_path}{SUFFIX}.{generation}"
+
+def generations(file_path):
+    """Returns the existing generations of a collection file's side file, oldest first."""
+    prefix = file_path + SUFFIX + '.'
+    found = []
+    for path in glob.glob(glob.escape(prefix) + '*'):
+        suffix = path[len(prefix):]
+        if suffix.isdigit():
+            found.append(int(suffix))
+    return sorted(found)
+
+class Segment:
+    """A read-only mmap of one side file (as large as the file when it was opened)."""
+
+    __slots__ = ('path', 'size', '_map', '__weakref__')
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            # An empty file cannot be mapped, and holds nothing to read anyway
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.path = path
+
+    def read(self, offset, length):
+        return self._map[offset:offset + length]
+
+    def __reduce__(self):
+        # Opened again (and shared) in the process that unpickles it
+        return segment, (self.path,)
+
+def segment(path, size=0):
+    """Returns the shared Segment of a side file that maps at least size bytes of it."""
+    st = os.stat(path)
+    key = (path, st.st_ino)
+    with _lock:
+        found = _segments.get(key)
+        if found is None or found.size < size:
+            found = Segment(path)
+            _segments[key] = found
+        return found
+
+class ColdRef:
+    """The location of a record's cold fields; load() decodes them."""
+
+    __slots__ = ('segment', 'offset', 'length')
+
+    def __init__(self, segment, offset, length):
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+
+    def raw(self):
+        return self.segment.read(self.offset, self.length)
+
+    def load(self):
+        """Returns {field: value} of the record's cold fields."""
+        return json.loads(self.raw())
+
+    def __eq__(self, other):
+        if type(other) is not ColdRef:
+            return NotImplemented
+        return (self.segment.path, self.offset, self.length) == (other.segment.path, other.offset, other.length)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return ColdRef, (self.segment, self.offset, self.length)
+
+    def __repr__(self):
+        return f"<cold {self.segment.path}@{self.offset}+{self.length}>"
+
+def _generation(path):
+    return int(path.rsplit('.', 1)[1])
+
+class ThawedRecord(dict):
+    """
+    A mutable record (see data_manager.thaw) whose cold fields still hold
+    the ColdRef they were loaded with. Using a cold field, or the record as
+    a whole, decodes them first; split() stores an untouched ColdRef as it is.
+    """
+
+    __slots__ = ('cold_fields',)
+
+    def __init__(self, data, cold_fields):
+        dict.__init__(self, data)
+        self.cold_fields = cold_fields
+
+    def _decode(self):
+        ref = _ref(self, self.cold_fields)
+        if ref is not None:
+            values = ref.load()
+            for field in self.cold_fields:
+                if field in values:
+                    dict.__setitem__(self, field, values[field])
+                else:
+                    dict.pop(self, field, None)
+
+    def _use(self, key):
+        if key in self.cold_fields:
+            self._decode()
+
+    def __getitem__(self, key):
+        self._use(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self._use(key)
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        self._use(key)
+        return dict.__contains__(self, key)
+
+    def __setitem__(self, key, value):
+        self._use(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._use(key)
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *default):
+        self._use(key)
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        self._use(key)
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        self._decode()
+        dict.update(self, *args, **kwargs)
+
+    # Whole-record access (also dict(record) and json.dumps) sees decoded values
+
+    def __iter__(self):
+        self._decode()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self._decode()
+        return dict.keys(self)
+
+    def items(self):
+        self._decode()
+        return dict.items(self)
+
+    def values(self):
+        self._decode()
+        return dict.values(self)
+
+    def copy(self):
+        self._decode()
+        return dict(dict.items(self))
+
+    def __eq__(self, other):
+        self._decode()
+        return dict.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._decode()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+def attach(file_path, records, fields):
+    """
+    Replaces the cold-field locations of stored records (parsed JSON dicts,
+    changed in place) with a ColdRef in each cold field, and returns them.
+    """
+    located = [(record, record.pop(REF_FIELD)) for record in records if REF_FIELD in record]
+    # Each generation is mapped once, as far as its last entry in use
+    ends = {}
+    for _, (generation, offset, length) in located:
+        ends[generation] = max(ends.get(generation, 0), offset + length)
+    segments = {generation: segment(segment_path(file_path, generation), end) for generation, end in ends.items()}
+    for record, (generation, offset, length) in located:
+        ref = ColdRef(segments[generation], offset, length)
+        for field in fields:
+            record[field] = ref
+    return records
+
+def _ref(record, fields):
+    """Returns the ColdRef held by a record's cold fields, or None."""
+    for field in fields:
+        # Not through get(), which would decode a ThawedRecord
+        value = dict.get(record, field) if isinstance(record, dict) else getattr(record, field, None)
+        if type(value) is ColdRef:
+            return value
+    return None
+
+def _encode(record, fields):
+    """Returns the encoded cold fields of a (plain or loaded) record, or None if it has none."""
+    values = {field: record[field] for field in fields if field in record}
+    if not values:
+        return None
+    return json.dumps(values, ensure_ascii=False, separators=(',', ':'), default=dict).encode('utf-8')
+
+class _Appender:
+    """Appends entries to a generation of a side file, opening it on the first one."""
+
+    def __init__(self, file_path, generation, truncate=False):
+        self.path = segment_path(file_path, generation)
+        self.generation = generation
+        self.mode = 'wb' if truncate else 'ab'
+        self.file = None
+
+    def add(self, entry):
+        if self.file is None:
+            self.file = open(self.path, self.mode)
+            self.offset = self.file.seek(0, os.SEEK_END)
+        location = [self.generation, self.offset, len(entry)]
+        self.file.write(entry)
+        self.offset += len(entry)
+        return location
+
+    def close(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+def _stored(record, fields, location):
+    """Returns the JSON-ready form of a record: without its cold fields, with their location."""
+    if isinstance(record, dict):
+        stored = {key: value for key, value in dict.items(record) if key not in fields}
+    else:
+        # A loaded record: its cold fields are not even decoded
+        stored = dict(record.hot_items())
+    if location is not None:
+        stored[REF_FIELD] = location
+    return stored
+
+def split(file_path, records, old_records, pk, fields, rewrite=True):
+    """
+    Stores the cold fields of records (plain dicts, or loaded records) that
+    old_records (the loaded records being replaced) do not already hold,
+    and returns the records in stored form. Unless rewrite is False (the
+    stored records are then appended to a journal), a generation that has
+    become mostly garbage is replaced by a new one holding only the live
+    entries. The caller must hold the collection's lock.
+    """
+    old_refs = {}
+    for record in old_records:
+        ref = _ref(record, fields)
+        if ref is not None:
+            old_refs[record[pk]] = ref
+
+    known = generations(file_path)
+    current = known[-1] if known else 0
+    pending = []
+    live = 0
+    for record in records:
+        ref = _ref(record, fields)
+        if ref is not None and ref.segment.path != segment_path(file_path, _generation(ref.segment.path)):
+            # Loaded from another collection's side file (e.g. moved to a cold partition)
+            ref = None
+        if ref is not None:
+            # Cold fields unchanged since they were loaded: not even decoded
+            location = [_generation(ref.segment.path), ref.offset, ref.length]
+            entry = None
+        else:
+            entry = _encode(record, fields)
+            old = old_refs.get(record[pk])
+            if entry is not None and old is not None and old.raw() == entry:
+                location, ref = [_generation(old.segment.path), old.offset, old.length], old
+            else:
+                location = None
+        if ref is not None and location[0] == current:
+            live += ref.length
+        pending.append((record, entry, ref, location))
+
+    try:
+        size = os.path.getsize(segment_path(file_path, current))
+    except OSError:
+        size = 0
+    compacting = rewrite and known and size >= COMPACT_MIN_BYTES and size > COMPACT_RATIO * live
+    appender = _Appender(file_path, current + 1 if compacting or not known else current, truncate=compacting)
+    stored = []
+    try:
+        for record, entry, ref, location in pending:
+            if compacting and location is not None:
+                entry = bytes(ref.raw())
+                location = None
+            if location is None and entry is not None:
+                location = appender.add(entry)
+            stored.append(_stored(record, fields, location))
+    finally:
+        appender.close()
+    if compacting:
+        drop_generations(file_path, keep=appender.generation - 1)
+    return stored
+
+def drop_generations(file_path, keep):
+    """Deletes the side file generations older than keep."""
+    for generation in generations(file_path):
+        if generation < keep:
+            try:
+                os.unlink(segment_path(file_path, generation))
+            except OSError:
+                pass
+
+def stream(file_path, records, fields):
+    """
+    Yields records in stored form, with their cold fields written to a new
+    generation (see data_manager.write_stream, which replaces the whole
+    collection). The caller must hold the collection's lock.
+    """
+    known = generations(file_path)
+    appender = _Appender(file_path, known[-1] + 1 if known else 1, truncate=True)
+    try:
+        for record in records:
+            entry = _encode(record, fields)
+            yield _stored(record, fields, appender.add(entry) if entry is not None else None)
+    finally:
+        appender.close()
+    drop_generations(file_path, keep=appender.generation - 1)
@@ -0,0 +1,73 @@
+# src/dashboard.py
+# What the dashboards of main.py show on every redraw, kept per session.
+# The facts (defense eligibility, supervision load, pending counts) are
+# computed once and then only again after a change event for a collection
+# they depend on: from this process' own writes, or from another process'
+# (noticed by the backend's watch()). Redrawing the menu in between does no
+# I/O at all.
+from datetime import date, timedelta
+from . import records
+
+# Collections the facts of each role are computed from
+RELEVANT_COLLECTIONS = {
+    "student": {"proposals", "theses", "courses", "partitions"},
+    "professor": {"proposals", "theses", "courses", "counters"},
+}
+
+# Days after a proposal's approval before its student may request a defense
+DEFENSE_WAIT_DAYS = 90
+
+# Seconds between checks for changes made by other processes
+WATCH_INTERVAL = 1.0
+
+class DashboardState:
+    """
+    The dashboard facts of one logged-in user. backend is models or a
+    client.Remote: anything with subscribe(), unsubscribe() and watch().
+    """
+
+    def __init__(self, user, backend):
+        self.user = user
+        self.backend = backend
+        self.collections = RELEVANT_COLLECTIONS[user.role]
+        self.dirty = True
+        self._facts = None
+        backend.subscribe(self._changed)
+        backend.watch(WATCH_INTERVAL)
+
+    def _changed(self, name):
+        if name in self.collections:
+            self.dirty = True
+
+    def close(self):
+        """Stops listening for changes."""
+        self.backend.unsubscribe(self._changed)
+
+    def facts(self):
+        """Returns the facts, recomputing them only if a relevant collection changed."""
+        if self.dirty:
+            # Cleared first, so a change during the computation is not lost
+            self.dirty = False
+            self._facts = self._student_facts() if self.user.role == "student" else self._professor_facts()
+        return self._facts
+
+    def _student_facts(self):
+        result, status_type = self.user.view_my_thesis_status()
+        eligible_from = None
+        if status_type == 'proposal_status' and result['proposal']['status'] == 'approved':
+            approval_date = records.to_date(result['proposal']['approval_date'])
+            eligible_from = approval_date + timedelta(days=DEFENSE_WAIT_DAYS)
+        return {"status": result, "status_type": status_type, "eligible_from": eligible_from}
+
+    def _professor_facts(self):
+        return {
+            "load": self.user.get_load(),
+            "pending_proposals": len(self.user.get_pending_proposals()),
+            "pending_defenses": len(self.user.get_pending_defense_requests()),
+            "to_review": len(self.user.get_theses_to_review()),
+        }
+
+    def is_eligible_for_defense(self):
+        """True if the student may request a defense now."""
+        eligible_from = self.facts()["eligible_from"]
+        return eligible_from is not None and date.today() >= eligible_from
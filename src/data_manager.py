@@ -1,51 +1,753 @@
 # src/data_manager.py
+import gc
 import json
 import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from types import MappingProxyType
+from . import binary_cache
+from . import cold_store
+from . import journal
+from . import sqlite_store
+from .records import RECORD_CLASSES, Record
 
-# The absolute path to the 'data' directory
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not locked across processes
+    fcntl = None
+
+# The absolute path to the 'data' directory (can be overridden with THESIS_DATA_DIR)
+DATA_DIR = os.environ.get('THESIS_DATA_DIR') or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
 
 # Define file paths for easier management
 USERS_FILE = os.path.join(DATA_DIR, 'users.json')
 COURSES_FILE = os.path.join(DATA_DIR, 'courses.json')
 PROPOSALS_FILE = os.path.join(DATA_DIR, 'thesis_proposals.json')
 THESES_FILE = os.path.join(DATA_DIR, 'theses.json')
+COUNTERS_FILE = os.path.join(DATA_DIR, 'counters.json')
+DB_FILE = os.path.join(DATA_DIR, 'thesis.db')
+
+# Storage mode: 'json' rewrites a collection's whole file on every save,
+# 'journal' appends the changed records to a per-collection journal
+# (see journal.py) and periodically compacts it into the JSON file,
+# 'sqlite' keeps the collections in DB_FILE (see sqlite_store.py).
+STORAGE_MODES = ('json', 'journal', 'sqlite')
+STORAGE_MODE = os.environ.get('THESIS_STORAGE', 'json')
+
+# Indentation of the JSON files. THESIS_JSON_INDENT=0 writes them compactly,
+# which makes them several times smaller and faster to read.
+JSON_INDENT = int(os.environ.get('THESIS_JSON_INDENT', '4')) or None
+
+# Primary key field of each collection
+PRIMARY_KEYS = {
+    "users": "id",
+    "courses": "id",
+    "proposals": "proposal_id",
+    "theses": "thesis_id",
+    "counters": "id",
+    "archive_docs": "thesis_id",
+    "archive": "thesis_id",
+    "partitions": "id",
+}
+
+# File name of each collection inside DATA_DIR
+COLLECTION_FILES = {
+    "users": "users.json",
+    "courses": "courses.json",
+    "proposals": "thesis_proposals.json",
+    "theses": "theses.json",
+    "counters": "counters.json",
+    "archive_docs": "archive_docs.json",
+    "archive": "archive.json",
+    "partitions": "partitions.json",
+}
+
+# Collections whose closed records may be moved to read-only cold partitions,
+# one per academic year (see partitions.py). The partition of a year is a
+# collection of its own, named '<collection>@<year>' and always stored as a
+# JSON file next to the collection's: theses@1399 in 'theses.1399.json'.
+# The collection itself (the hot partition) keeps everything else.
+PARTITIONED = ("proposals", "theses", "archive")
+
+# Collections kept as a snapshot plus a journal in json mode too: the
+# archive's full-text index changes a few of its records at a time (see
+# apply()), and rewriting it whole for that would cost its full size.
+JOURNALED = ("archive_docs",)
+
+# Number of optimistic attempts update() makes before it holds the
+# collection lock for the whole read-modify-write cycle.
+OPTIMISTIC_ATTEMPTS = 2
+
+class ConflictError(Exception):
+    """Raised when a collection was saved by another writer since it was read."""
+
+# --- In-process read cache ---
+# Parsed file contents keyed by file path. Each entry is (stamp, frozen_data),
+# where stamp is (st_mtime_ns, st_size) of the file when it was parsed (and of
+# its journal, in journal mode) plus the collection's version.
+_cache = {}
+# reads: collections loaded from the backend, bytes_parsed: their size
+# (binary_reads: those of the reads served by a binary copy, see binary_cache.py)
+_cache_stats = {"hits": 0, "misses": 0, "reads": 0, "binary_reads": 0, "bytes_parsed": 0}
+
+# Data derived from collections that binary copies keep along with the
+# records: key -> build(collection name, frozen records), and
+# file path -> (frozen records, {key: derived data}) for the loaded copies.
+_derived_builders = {}
+_derived = {}
+
+# Lock files held by this process: (lock path, thread id) -> [fd, depth]
+_held_locks = {}
+
+# --- Change events ---
+# Callbacks called with a collection's name whenever it changes: right after
+# this process saved it, or when the watcher thread (see watch()) notices
+# another process did. Callbacks run on the thread that noticed the change
+# and must be quick (e.g. set a flag).
+_listeners = []
+# Collection name -> last version announced to the listeners
+_announced = {}
+_watcher = []
+
+# Read-only snapshot served instead of the files, see load_snapshot():
+# file path -> (version, frozen records)
+_snapshot = None
 
-def read_data(file_path):
+def freeze(obj):
     """
-    Reads data from a JSON file.
-    Returns an empty list if the file is empty or does not exist.
+    Returns a read-only copy of parsed JSON data.
+    Dicts become MappingProxyType and lists become tuples.
+    """
+    if isinstance(obj, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(value) for key, value in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(value) for value in obj)
+    return obj
+
+def freeze_records(name, records):
+    """
+    Freezes the records of a collection: into objects of its record class
+    (see records.py) if it has one, else as freeze() does.
+    """
+    cls = RECORD_CLASSES.get(base_name(name))
+    if cls is None:
+        return freeze(records)
+    return tuple(r if type(r) is cls else cls.from_dict(r, freeze) for r in records)
+
+# What thaw() copies; any other value is used as it is
+_CONTAINERS = (dict, MappingProxyType, Record, list, tuple)
+
+def thaw(obj):
+    """
+    Returns a plain, mutable copy of (possibly frozen) JSON data.
+    A record whose cold fields are in a side file becomes a
+    cold_store.ThawedRecord, which decodes them only once they are used.
     """
+    if isinstance(obj, (dict, MappingProxyType)):
+        return {key: thaw(value) if isinstance(value, _CONTAINERS) else value for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [thaw(value) if isinstance(value, _CONTAINERS) else value for value in obj]
+    if isinstance(obj, Record):
+        thawed = {key: thaw(value) if isinstance(value, _CONTAINERS) else value for key, value in obj.raw_items()}
+        return thawed if obj.cold_ref() is None else cold_store.ThawedRecord(thawed, obj.COLD_FIELDS)
+    return obj
+
+def _file_stamp(file_path):
+    """Returns (st_mtime_ns, st_size) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _collection_name(file_path):
+    """Returns the collection (or partition) stored in a file, or None for other files."""
+    for name in PRIMARY_KEYS:
+        if collection_file(name) == file_path:
+            return name
+    return _partition_name(file_path)
+
+def _partition_name(file_path):
+    """Returns the cold partition stored in a file (see partition()), or None."""
+    directory, file_name = os.path.split(file_path)
+    parts = file_name.split('.')
+    if directory != DATA_DIR or len(parts) != 3 or not parts[1].isdigit():
+        return None
+    for name in PARTITIONED:
+        if COLLECTION_FILES[name] == f"{parts[0]}.{parts[2]}":
+            return partition(name, int(parts[1]))
+    return None
+
+def _primary_key(file_path):
+    """Returns the primary key field for a collection file, or None for other files."""
+    name = _collection_name(file_path)
+    return primary_key(name) if name else None
+
+def _uses_backend(file_path):
+    """Tells whether a file's collection is kept by the storage backend (partitions are plain JSON files)."""
+    name = _collection_name(file_path)
+    return name is not None and not is_partition(name)
+
+def _uses_journal(file_path):
+    if not _uses_backend(file_path):
+        return False
+    return STORAGE_MODE == 'journal' or (STORAGE_MODE == 'json' and _collection_name(file_path) in JOURNALED)
+
+def _uses_sqlite(file_path):
+    return STORAGE_MODE == 'sqlite' and _uses_backend(file_path)
+
+def _cold_fields(file_path):
+    """
+    Returns the fields of a collection file's records that are kept in side
+    files (see cold_store.py). The database keeps them in its own columns.
+    """
+    name = _collection_name(file_path)
+    cls = RECORD_CLASSES.get(base_name(name)) if name else None
+    if cls is None or _uses_sqlite(file_path):
+        return ()
+    return cls.COLD_FIELDS
+
+def _lock_path(file_path):
+    return file_path + '.lock'
+
+@contextmanager
+def locked(file_path):
+    """
+    Holds the exclusive cross-process lock of a file (an fcntl lock on
+    '<file>.lock'). Re-entrant within a thread.
+    """
+    key = (_lock_path(file_path), threading.get_ident())
+    held = _held_locks.get(key)
+    if held:
+        held[1] += 1
+        try:
+            yield
+        finally:
+            held[1] -= 1
+        return
+    fd = os.open(key[0], os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        _held_locks[key] = [fd, 1]
+        try:
+            yield
+        finally:
+            del _held_locks[key]
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+def _version(file_path):
+    """
+    Returns the version of a file, which every save increments.
+    It is kept in the file's lock file (or the database, in sqlite mode).
+    """
+    if _snapshot is not None and file_path in _snapshot:
+        return _snapshot[file_path][0]
+    if _uses_sqlite(file_path):
+        return sqlite_store.version(DB_FILE, _collection_name(file_path))
+    try:
+        with open(_lock_path(file_path), 'rb') as f:
+            content = f.read(20)
+    except FileNotFoundError:
+        return 0
+    return int(content) if content.strip() else 0
+
+def _set_version(file_path, version):
+    """Stores a file's version. The caller must hold the file's lock."""
+    fd = _held_locks[(_lock_path(file_path), threading.get_ident())][0]
+    # Fixed width, written in one call, so readers never see a partial number.
+    os.pwrite(fd, b'%020d' % version, 0)
+
+def _stamp(file_path):
+    """Returns the cache validation stamp of a file, or None if it does not exist."""
+    if _uses_sqlite(file_path):
+        return ('sqlite', _version(file_path))
+    # The version is read first: data read after it is never older than it.
+    version = _version(file_path)
+    stamp = _file_stamp(file_path)
+    if _uses_journal(file_path):
+        journal_stamp = _file_stamp(journal.journal_path(file_path))
+        if stamp is None and journal_stamp is None:
+            return None
+        return (stamp, journal_stamp, version)
+    return (stamp, version) if stamp is not None else None
+
+def _load_file(file_path):
+    """Parses a JSON file. Returns an empty list if it is empty or missing."""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return []
 
-def write_data(file_path, data):
+def read_data(file_path, frozen=False):
+    """
+    Reads data from a JSON file.
+    Returns an empty list if the file is empty or does not exist.
+
+    Parsed data is cached per file and re-used as long as the file's
+    (mtime, size) stamp and version are unchanged. With frozen=True the shared, read-only
+    cached data is returned without copying; otherwise the caller gets its
+    own mutable copy and may modify it freely.
+    """
+    if _snapshot is not None and file_path in _snapshot:
+        data = _snapshot[file_path][1]
+        return data if frozen else thaw(data)
+    stamp = _stamp(file_path)
+    entry = _cache.get(file_path)
+    if entry is not None and stamp is not None and entry[0] == stamp:
+        _cache_stats["hits"] += 1
+        data = entry[1]
+    else:
+        _cache_stats["misses"] += 1
+        with _gc_paused():
+            data = _load(file_path, stamp)
+        _cache_stats["reads"] += 1
+        if stamp is not None:
+            _cache[file_path] = (stamp, data)
+        else:
+            _cache.pop(file_path, None)
+    return data if frozen else thaw(data)
+
+@contextmanager
+def _gc_paused():
+    """Pauses the cyclic garbage collector, which loads would trigger over and over for nothing."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _load(file_path, stamp):
+    """Loads a file from the backend as frozen data, from its binary copy if that is fresh."""
+    if _uses_sqlite(file_path):
+        _cache_stats["bytes_parsed"] += _stored_size(file_path)
+        name = _collection_name(file_path)
+        return freeze_records(name, sqlite_store.load(DB_FILE, name))
+    name = _collection_name(file_path)
+    use_copy = binary_cache.ENABLED and name is not None and stamp is not None
+    if use_copy:
+        loaded = binary_cache.load(file_path, stamp, _sources(file_path))
+        if loaded is not None and _derived_builders.keys() <= loaded[1].keys():
+            data, derived, size = loaded
+            _derived[file_path] = (data, derived)
+            _cache_stats["binary_reads"] += 1
+            _cache_stats["bytes_parsed"] += size
+            return data
+    if _uses_journal(file_path):
+        records = journal.load(file_path, _primary_key(file_path))
+    else:
+        records = _load_file(file_path)
+    if _cold_fields(file_path):
+        cold_store.attach(file_path, records, _cold_fields(file_path))
+    data = freeze_records(name, records)
+    _cache_stats["bytes_parsed"] += _stored_size(file_path)
+    if use_copy:
+        _store_copy(file_path, name, stamp, data)
+    return data
+
+def _store_copy(file_path, name, stamp, data):
+    """Writes the binary copy of data, just loaded from a file at stamp."""
+    source_digest = binary_cache.digest(_sources(file_path))
+    # If the file changed since it was stamped, the digest may not be that of
+    # data; the next reader will write the copy instead.
+    if _stamp(file_path) != stamp:
+        return
+    derived = {key: build(name, data) for key, build in _derived_builders.items()}
+    _derived[file_path] = (data, derived)
+    binary_cache.store(file_path, stamp, source_digest, data, derived)
+
+def register_derived(key, build):
+    """
+    Registers build(collection name, frozen records), computing data derived
+    from a collection that its binary copy should keep along with it.
+    """
+    _derived_builders[key] = build
+
+def derived(name, key, records):
+    """
+    Returns the data the key's builder derived from a collection's records
+    if it was loaded (or computed) along with exactly these records, else None.
+    """
+    entry = _derived.get(collection_file(name))
+    if entry is None or entry[0] is not records:
+        return None
+    return entry[1].get(key)
+
+def _sources(file_path):
+    """Returns the files a collection file's records are read from."""
+    return [file_path, journal.journal_path(file_path)] if _uses_journal(file_path) else [file_path]
+
+def _stored_size(file_path):
+    """Returns the number of bytes a load of the file parses."""
+    if _uses_sqlite(file_path):
+        return sqlite_store.size(DB_FILE, _collection_name(file_path))
+    size = 0
+    for path in _sources(file_path):
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
+
+def write_data(file_path, data, expected_version=None):
     """
     Writes data to a JSON file with pretty printing.
+    In journal mode only the changed records are appended to the journal;
+    in sqlite mode only the changed rows are written to the database.
+    The cache entry for the file is refreshed with the written data.
+
+    The write happens under the file's lock and increments its version. If
+    expected_version is given and the file is no longer at that version,
+    ConflictError is raised and nothing is written.
+    """
+    if _snapshot is not None:
+        raise RuntimeError("Cannot save while a read-only snapshot is loaded")
+    name = _collection_name(file_path)
+    cold_fields = _cold_fields(file_path)
+    # With cold fields, the records are frozen once those are stored
+    frozen_data = None if cold_fields else freeze_records(name, data)
+    with locked(file_path):
+        version = _version(file_path)
+        if expected_version is not None and version != expected_version:
+            raise ConflictError(f"{file_path} changed (version {expected_version} -> {version})")
+        if _uses_sqlite(file_path):
+            sqlite_store.store(DB_FILE, name, _primary_key(file_path), read_data(file_path, frozen=True), frozen_data)
+        else:
+            stored_data = data
+            if cold_fields:
+                stored_data = cold_store.split(file_path, data, read_data(file_path, frozen=True), primary_key(name),
+                                               cold_fields, rewrite=not _uses_journal(file_path))
+                frozen_data = freeze_records(
+                    name, cold_store.attach(file_path, [dict(r) for r in stored_data], cold_fields))
+            if _uses_journal(file_path):
+                _write_journal(file_path, frozen_data, stored_data)
+            else:
+                _write_json(file_path, stored_data)
+            _set_version(file_path, version + 1)
+        _cache[file_path] = (_stamp(file_path), frozen_data)
+        _derived.pop(file_path, None)
+        _notify(name, version + 1)
+
+def _write_json(file_path, data):
+    """Replaces a JSON file atomically, so readers never see a partial file."""
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=JSON_INDENT, separators=_separators(), default=dict)
+    os.replace(tmp_path, file_path)
+
+def _separators():
+    return (',', ':') if JSON_INDENT is None else None
+
+def _write_journal(file_path, frozen_data, stored_data):
     """
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    Appends the difference between the stored and the new records to the
+    journal. stored_data are the new records as written to the files.
+    """
+    pk = _primary_key(file_path)
+    entries = journal.diff(read_data(file_path, frozen=True), frozen_data, pk)
+    if entries is None or (not entries and not os.path.exists(file_path)):
+        # Reordered records cannot be journaled; write a fresh snapshot.
+        journal.write_snapshot(file_path, stored_data, JSON_INDENT)
+    elif entries:
+        if _cold_fields(file_path):
+            # Written without their cold fields, like the snapshot
+            stored = {record[pk]: record for record in stored_data}
+            for entry in entries:
+                if entry['op'] == 'upsert':
+                    entry['record'] = stored[entry['key']]
+        journal_size = journal.append(file_path, entries)
+        if journal.needs_compaction(file_path, journal_size):
+            name = _collection_name(file_path)
+            threading.Thread(target=compact, args=(name,), daemon=True).start()
+
+def apply(name, entries):
+    """
+    Saves changes to a few records of a collection, given as journal entries
+    (upserts and deletes, see journal.py), without reading or rewriting the
+    others: they are appended to its journal, or written as rows in sqlite
+    mode. The collection must be journaled (see JOURNALED) or in sqlite mode,
+    and have no cold fields. The cache entry is updated in place.
+    """
+    if _snapshot is not None:
+        raise RuntimeError("Cannot save while a read-only snapshot is loaded")
+    file_path = collection_file(name)
+    if not (_uses_journal(file_path) or _uses_sqlite(file_path)) or _cold_fields(file_path):
+        raise ValueError(f"Collection {name} cannot be saved record by record")
+    if not entries:
+        return
+    pk = primary_key(name)
+    entries = [dict(entry, record=freeze_records(name, [entry['record']])[0]) if entry['op'] == 'upsert' else entry
+               for entry in entries]
+    with locked(file_path):
+        version = _version(file_path)
+        entry = _cache.get(file_path)
+        cached = entry[1] if entry is not None and entry[0] == _stamp(file_path) else None
+        if _uses_sqlite(file_path):
+            sqlite_store.apply(DB_FILE, name, pk, entries)
+        else:
+            journal_size = journal.append(file_path, entries)
+            _set_version(file_path, version + 1)
+            if journal.needs_compaction(file_path, journal_size):
+                threading.Thread(target=compact, args=(name,), daemon=True).start()
+        if cached is not None:
+            _cache[file_path] = (_stamp(file_path), tuple(journal.replay(cached, entries, pk)))
+        else:
+            _cache.pop(file_path, None)
+        _derived.pop(file_path, None)
+        _notify(name, version + 1)
+
+def write_stream(name, records):
+    """
+    Replaces a collection with the records of an iterable without holding
+    them all in memory: they are written to the file (or inserted into the
+    database) one at a time. Returns the number of records written.
+    """
+    if _snapshot is not None:
+        raise RuntimeError("Cannot save while a read-only snapshot is loaded")
+    file_path = collection_file(name)
+    with locked(file_path):
+        version = _version(file_path)
+        if _uses_sqlite(file_path):
+            count = sqlite_store.store_all(DB_FILE, name, PRIMARY_KEYS[name], records)
+        else:
+            if _cold_fields(file_path):
+                records = cold_store.stream(file_path, records, _cold_fields(file_path))
+            count = _write_json_stream(file_path, records)
+            if _uses_journal(file_path):
+                journal.discard(file_path)
+            _set_version(file_path, version + 1)
+        _cache.pop(file_path, None)
+        _derived.pop(file_path, None)
+        _notify(name, version + 1)
+    return count
+
+def _write_json_stream(file_path, records):
+    """Writes records as a JSON list, one per line, and atomically replaces the file."""
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for record in records:
+            f.write(',\n    ' if count else '\n    ')
+            f.write(json.dumps(record, ensure_ascii=False, default=dict))
+            count += 1
+        f.write('\n]\n' if count else ']\n')
+    os.replace(tmp_path, file_path)
+    return count
+
+def compact(name):
+    """Folds a collection's journal into its JSON file (journaled collections only)."""
+    file_path = collection_file(name)
+    if _uses_journal(file_path):
+        cold_fields = _cold_fields(file_path)
+        with locked(file_path):
+            if cold_fields:
+                # Also moves the live cold fields to a new side file if the current one is mostly garbage
+                records = cold_store.attach(file_path, journal.load(file_path, PRIMARY_KEYS[name]), cold_fields)
+                stored = cold_store.split(file_path, records, (), PRIMARY_KEYS[name], cold_fields)
+                journal.write_snapshot(file_path, stored, JSON_INDENT)
+            else:
+                journal.compact(file_path, PRIMARY_KEYS[name], JSON_INDENT)
+
+def subscribe(callback):
+    """Registers callback(name) to be called whenever a collection changes."""
+    _listeners.append(callback)
+
+def unsubscribe(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+def _notify(name, version):
+    if name is None:
+        return
+    _announced[name] = version
+    for callback in list(_listeners):
+        callback(name)
+
+def watch(interval=1.0):
+    """
+    Starts (once per process) a daemon thread that checks every interval
+    seconds whether another process changed a collection, and notifies the
+    listeners if so. Only the version numbers are read.
+    """
+    if _watcher:
+        return
+    for name in COLLECTION_FILES:
+        _announced.setdefault(name, collection_version(name))
+
+    def run():
+        while True:
+            time.sleep(interval)
+            if _snapshot is not None:
+                continue
+            for name in COLLECTION_FILES:
+                version = collection_version(name)
+                if _announced.get(name) != version:
+                    _notify(name, version)
+
+    thread = threading.Thread(target=run, name="collection-watcher", daemon=True)
+    _watcher.append(thread)
+    thread.start()
+
+def collection_version(name):
+    """Returns the current version of a collection."""
+    return _version(collection_file(name))
+
+def update(name, mutate, on_success=None):
+    """
+    Runs a read-modify-write cycle on a collection.
+    mutate(records) gets a mutable copy of the collection, changes it in place
+    and returns (success, message). On success the records are saved with a
+    compare-and-swap on the collection's version; if another writer saved
+    in the meantime, the whole cycle is retried on fresh data. Returns the
+    result of the last mutate() call.
+
+    on_success() is called after a successful save while the collection's
+    lock is still held, so derived data can be updated before anyone else
+    changes the collection again.
+    """
+    file_path = collection_file(name)
+    for attempt in range(OPTIMISTIC_ATTEMPTS):
+        version = _version(file_path)
+        records = read_data(file_path)
+        result = mutate(records)
+        if not result[0]:
+            return result
+        try:
+            with locked(file_path):
+                write_data(file_path, records, expected_version=version)
+                if on_success:
+                    on_success()
+            return result
+        except ConflictError:
+            time.sleep(random.uniform(0, 0.001 * (attempt + 1)))
+    # Heavily contended: hold the lock for the whole cycle, so it cannot conflict.
+    with locked(file_path):
+        records = read_data(file_path)
+        result = mutate(records)
+        if result[0]:
+            write_data(file_path, records)
+            if on_success:
+                on_success()
+        return result
+
+def set_storage_mode(mode):
+    """Switches the storage backend ('json', 'journal' or 'sqlite') for this process."""
+    global STORAGE_MODE
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode: {mode}")
+    STORAGE_MODE = mode
+    clear_cache()
+
+def set_data_dir(path):
+    """Points all collection files (and the database) at another directory."""
+    global DATA_DIR, USERS_FILE, COURSES_FILE, PROPOSALS_FILE, THESES_FILE, COUNTERS_FILE, DB_FILE
+    DATA_DIR = path
+    USERS_FILE = os.path.join(DATA_DIR, 'users.json')
+    COURSES_FILE = os.path.join(DATA_DIR, 'courses.json')
+    PROPOSALS_FILE = os.path.join(DATA_DIR, 'thesis_proposals.json')
+    THESES_FILE = os.path.join(DATA_DIR, 'theses.json')
+    COUNTERS_FILE = os.path.join(DATA_DIR, 'counters.json')
+    DB_FILE = os.path.join(DATA_DIR, 'thesis.db')
+    clear_cache()
+
+def snapshot():
+    """
+    Returns {collection name: (version, records)} for every collection and
+    cold partition as plain, picklable data, to hand to other processes (see
+    load_snapshot()).
+    """
+    names = list(COLLECTION_FILES) + [r['id'] for r in get_collection('partitions', frozen=True)]
+    return {name: (collection_version(name), get_collection(name)) for name in names}
+
+def load_snapshot(collections):
+    """
+    Serves all reads of this process from a snapshot taken by snapshot()
+    instead of the storage backend, without checking the files again.
+    Saving is refused while the snapshot is loaded; load_snapshot(None)
+    goes back to the backend.
+    """
+    global _snapshot
+    if collections is None:
+        _snapshot = None
+        return
+    _snapshot = {collection_file(name): (version, freeze_records(name, records))
+                 for name, (version, records) in collections.items()}
+
+def snapshot_loaded():
+    """Tells whether reads are served from a snapshot (see load_snapshot())."""
+    return _snapshot is not None
+
+def cache_stats():
+    """
+    Returns the cache hit/miss counters, the number of collections read from
+    the backend (and of those served by a binary copy) and the bytes parsed
+    for them, and the number of cached files.
+    """
+    return dict(_cache_stats, entries=len(_cache))
+
+def clear_cache():
+    """Drops all cached file contents and resets the counters."""
+    _cache.clear()
+    _derived.clear()
+    for key in _cache_stats:
+        _cache_stats[key] = 0
 
 # --- Helper functions for specific data types ---
 
-def get_users():
+def collection_file(name):
+    """Returns the file path of a collection or partition (see COLLECTION_FILES and PARTITIONED)."""
+    base, _, year = name.partition('@')
+    file_name = COLLECTION_FILES[base]
+    if year:
+        stem, extension = os.path.splitext(file_name)
+        file_name = f"{stem}.{year}{extension}"
+    return os.path.join(DATA_DIR, file_name)
+
+def partition(name, year):
+    """Returns the name of a collection's cold partition for an academic year."""
+    if name not in PARTITIONED:
+        raise ValueError(f"Collection {name} is not partitioned")
+    return f"{name}@{int(year)}"
+
+def is_partition(name):
+    return '@' in name
+
+def base_name(name):
+    """Returns the collection a partition belongs to (a collection's own name for itself)."""
+    return name.partition('@')[0]
+
+def primary_key(name):
+    """Returns the primary key field of a collection or partition."""
+    return PRIMARY_KEYS[base_name(name)]
+
+def get_collection(name, frozen=False):
+    """Fetches all records of a collection by name."""
+    return read_data(collection_file(name), frozen)
+
+def get_users(frozen=False):
     """Fetches all users."""
-    return read_data(USERS_FILE)
+    return read_data(USERS_FILE, frozen)
 
-def get_courses():
+def get_courses(frozen=False):
     """Fetches all courses."""
-    return read_data(COURSES_FILE)
+    return read_data(COURSES_FILE, frozen)
 
-def get_proposals():
+def get_proposals(frozen=False):
     """Fetches all thesis proposals."""
-    return read_data(PROPOSALS_FILE)
+    return read_data(PROPOSALS_FILE, frozen)
 
-def get_theses():
+def get_theses(frozen=False):
     """Fetches all final theses."""
-    return read_data(THESES_FILE)
+    return read_data(THESES_FILE, frozen)
 
 def save_users(users):
     """Saves the users list to its file."""
@@ -0,0 +1,167 @@
+# src/fulltext.py
+# Persistent inverted index over the title, abstract and keywords of archived
+# (graded or defended) theses, ranked with BM25.
+#
+# The archive_docs collection holds the index as one record per thesis,
+#   {"thesis_id": ..., "length": token count, "terms": {term: frequency}}
+# so indexing a thesis writes its own record only, as a journal entry (see
+# data_manager.JOURNALED and data_manager.apply()). The postings of each term
+# are inverted from it in memory when the collection is loaded, and kept in
+# its binary copy (see binary_cache.py).
+# Professor.submit_grade indexes a thesis as soon as it becomes 'graded'.
+# Lock order: theses, archive_docs.
+import heapq
+import math
+import threading
+from itertools import chain
+from . import archive
+from . import data_manager
+from . import indexes
+from . import partitions
+from . import text
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Marks that the index has been built at least once, in the current FORMAT
+# (an index of an older format is rebuilt on first use).
+BUILT_KEY = "meta:built"
+FORMAT = 2
+
+# (archive_docs object, {term: {thesis_id: frequency}}, {thesis_id: length},
+# total length), see _index()
+_cache = [None, {}, {}, 0]
+_lock = threading.RLock()
+
+def thesis_terms(thesis):
+    """Returns the term frequencies of a thesis' searchable text."""
+    frequencies = {}
+    for field in ('title', 'abstract', 'keywords'):
+        for term in text.tokenize(thesis.get(field)):
+            frequencies[term] = frequencies.get(term, 0) + 1
+    return frequencies
+
+def _doc(thesis):
+    """Returns the archive_docs record of a thesis."""
+    frequencies = thesis_terms(thesis)
+    return {"thesis_id": thesis['thesis_id'], "length": sum(frequencies.values()), "terms": dict(sorted(frequencies.items()))}
+
+def _postings(name, records):
+    """Inverts the records of archive_docs into {term: {thesis_id: frequency}}."""
+    if name != 'archive_docs':
+        return None
+    postings = {}
+    for doc in records:
+        for term, frequency in doc['terms'].items():
+            postings.setdefault(term, {})[doc['thesis_id']] = frequency
+    return postings
+
+data_manager.register_derived('postings', _postings)
+
+def index_thesis(thesis):
+    """Adds, updates or (if it is not archived) removes one thesis in the index."""
+    index_theses([thesis])
+
+def index_theses(theses):
+    """Like index_thesis(), for many theses in one write of the index."""
+    if not theses or not is_built():
+        # The first build will pick the theses up.
+        return
+    with data_manager.locked(data_manager.collection_file('archive_docs')):
+        changed = {thesis['thesis_id']: _doc(thesis) if thesis.get('status') in archive.ARCHIVED_STATUSES else None
+                   for thesis in theses}
+        entries = []
+        for thesis_id, doc in changed.items():
+            if doc is not None:
+                entries.append({"op": "upsert", "key": thesis_id, "record": doc})
+            elif indexes.get('archive_docs', thesis_id) is not None:
+                entries.append({"op": "delete", "key": thesis_id})
+        data_manager.apply('archive_docs', entries)
+
+def rebuild():
+    """Rebuilds the whole index from the archived theses, those in cold partitions included."""
+    with data_manager.locked(data_manager.collection_file('theses')):
+        docs = (_doc(thesis) for name in partitions.names('theses')
+                for thesis in indexes.find_any(name, 'status', archive.ARCHIVED_STATUSES))
+        built = {"thesis_id": BUILT_KEY, "length": 0, "terms": {}, "format": FORMAT}
+        return data_manager.write_stream('archive_docs', chain(docs, [built])) - 1
+
+def is_built():
+    built = indexes.get('archive_docs', BUILT_KEY)
+    return built is not None and built.get('format') == FORMAT
+
+def ensure_built():
+    """Builds the index if it was never built (or has an older format)."""
+    if not is_built():
+        rebuild()
+
+def _index():
+    """Returns ({term: {thesis_id: frequency}}, {thesis_id: document length}, average document length)."""
+    # Read threads of the server share the cache; one of them patches it at a time (see search())
+    with _lock:
+        docs = data_manager.get_collection('archive_docs', frozen=True)
+        if _cache[0] is not docs:
+            old = _cache[0] or ()
+            # Records apply() did not replace are the same objects as before
+            kept = set(map(id, old)).intersection(map(id, docs))
+            if len(docs) - len(kept) > len(docs) // 4:
+                # Inverted along with the collection's binary copy, if it had one
+                postings = data_manager.derived('archive_docs', 'postings', docs)
+                if postings is None:
+                    postings = _postings('archive_docs', docs)
+                lengths = {d['thesis_id']: d['length'] for d in docs if d['thesis_id'] != BUILT_KEY}
+                _cache[:] = [docs, postings, lengths, sum(lengths.values())]
+            else:
+                # Only a few records changed: patch the postings in place (the
+                # records they were inverted from are no longer served).
+                _, postings, lengths, total = _cache
+                for doc in (d for d in old if id(d) not in kept):
+                    for term in doc['terms']:
+                        postings[term].pop(doc['thesis_id'], None)
+                        if not postings[term]:
+                            del postings[term]
+                    total -= lengths.pop(doc['thesis_id'], 0)
+                for doc in (d for d in docs if id(d) not in kept):
+                    for term, frequency in doc['terms'].items():
+                        postings.setdefault(term, {})[doc['thesis_id']] = frequency
+                    if doc['thesis_id'] != BUILT_KEY:
+                        lengths[doc['thesis_id']] = doc['length']
+                        total += doc['length']
+                _cache[:] = [docs, postings, lengths, total]
+        _, postings, lengths, total = _cache
+        return postings, lengths, total / len(lengths) if lengths else 0.0
+
+def search(query, limit=None):
+    """
+    Returns [(thesis_id, score)] for the archived theses in which every
+    query term occurs, best first.
+    """
+    ensure_built()
+    query_terms = list(dict.fromkeys(text.tokenize(query)))
+    if not query_terms:
+        return []
+    # Scored under the lock, so no other read thread patches the postings meanwhile
+    with _lock:
+        index, lengths, average_length = _index()
+        postings = sorted((index.get(term, {}) for term in query_terms), key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                return []
+
+        doc_count = len(lengths)
+        scores = dict.fromkeys(candidates, 0.0)
+        for p in postings:
+            idf = math.log(1 + (doc_count - len(p) + 0.5) / (len(p) + 0.5))
+            for thesis_id in candidates:
+                frequency = p.get(thesis_id)
+                if frequency:
+                    norm = K1 * (1 - B + B * lengths.get(thesis_id, 0) / average_length) if average_length else K1
+                    scores[thesis_id] += idf * frequency * (K1 + 1) / (frequency + norm)
+
+    order = lambda item: (-item[1], item[0])
+    if limit is not None:
+        return heapq.nsmallest(limit, scores.items(), key=order)
+    return sorted(scores.items(), key=order)
@@ -0,0 +1,109 @@
+# src/indexes.py
+# Hash indexes over the collections served by data_manager.
+# Every collection gets a unique index on its primary key and a set of
+# multi-valued secondary indexes. Indexes map keys to record positions in the
+# cached (frozen) collection and are rebuilt whenever data_manager hands out a
+# new cached object, i.e. after the file changed or was saved. They are kept
+# in the collections' binary copies too (see binary_cache.py), so a process
+# that loads a fresh copy does not rebuild them. A cold partition (e.g.
+# 'theses@1399', see data_manager.PARTITIONED) is indexed like its collection.
+from . import data_manager
+
+# Multi-valued indexes per collection. List-valued fields (theses.reviewers)
+# index each of their elements.
+SECONDARY_KEYS = {
+    "users": ("role",),
+    "courses": ("professor_id",),
+    "proposals": ("student_id", "course_id", "status"),
+    "theses": ("proposal_id", "reviewers", "status"),
+    "archive": ("year", "semester", "supervisor_id", "reviewer_ids", "final_grade_letter"),
+}
+
+# name -> (frozen records, primary index, secondary indexes)
+_built = {}
+
+def _build(name, records):
+    """Builds the primary and secondary indexes for a list of records."""
+    pk = data_manager.primary_key(name)
+    primary = {}
+    secondary = {field: {} for field in SECONDARY_KEYS.get(data_manager.base_name(name), ())}
+    for position, record in enumerate(records):
+        primary[record[pk]] = position
+        for field, index in secondary.items():
+            value = record.get(field)
+            values = dict.fromkeys(value) if isinstance(value, (list, tuple)) else (value,)
+            for v in values:
+                index.setdefault(v, []).append(position)
+    return primary, secondary
+
+data_manager.register_derived('indexes', _build)
+
+def _indexes(name):
+    """Returns (records, primary, secondary) for a collection, rebuilding if stale."""
+    records = data_manager.get_collection(name, frozen=True)
+    entry = _built.get(name)
+    if entry is None or entry[0] is not records:
+        # Indexes loaded from the collection's binary copy, if it had one
+        entry = (records,) + (data_manager.derived(name, 'indexes', records) or _build(name, records))
+        _built[name] = entry
+    return entry
+
+def get(name, key):
+    """Returns the (read-only) record with the given primary key, or None."""
+    records, primary, _ = _indexes(name)
+    position = primary.get(key)
+    return records[position] if position is not None else None
+
+def position(name, key):
+    """Returns the position of the record with the given primary key in the cached collection, or None."""
+    _, primary, _ = _indexes(name)
+    return primary.get(key)
+
+def positions(name, field, value):
+    """Returns the positions of records whose indexed field matches value."""
+    _, _, secondary = _indexes(name)
+    return secondary[field].get(value, [])
+
+def find(name, field, value):
+    """Returns the (read-only) records whose indexed field matches value, in file order."""
+    records, _, secondary = _indexes(name)
+    return [records[position] for position in secondary[field].get(value, [])]
+
+def find_any(name, field, values):
+    """Returns records matching any of the given values, in file order."""
+    records, _, secondary = _indexes(name)
+    index = secondary[field]
+    matched = sorted(position for value in values for position in index.get(value, []))
+    return [records[position] for position in matched]
+
+def locate(records, name, key):
+    """
+    Returns the record with the given primary key from a mutable copy of the
+    collection (as returned by data_manager.get_*), or None.
+    """
+    pk = data_manager.primary_key(name)
+    _, primary, _ = _indexes(name)
+    position = primary.get(key)
+    if position is not None and position < len(records) and records[position][pk] == key:
+        return records[position]
+    # The copy does not line up with the index (the file changed in between).
+    return next((r for r in records if r[pk] == key), None)
+
+def _matches(record, field, value):
+    """Whether an indexed field of a record matches value (an element of it, if list-valued)."""
+    stored = record.get(field)
+    return value in stored if isinstance(stored, (list, tuple)) else stored == value
+
+def locate_all(records, name, field, value):
+    """Returns the records of a mutable copy whose indexed field matches value, in file order."""
+    indexed, _, secondary = _indexes(name)
+    matched = []
+    if len(records) == len(indexed):
+        for position in secondary[field].get(value, []):
+            if not _matches(records[position], field, value):
+                break
+            matched.append(records[position])
+        else:
+            return matched
+    # The copy does not line up with the index (the file changed in between).
+    return [r for r in records if _matches(r, field, value)]
@@ -0,0 +1,192 @@
+# src/instrument.py
+# Opt-in timing and I/O accounting of the hot paths.
+# Set THESIS_PROFILE to enable it (THESIS_PROFILE=1 prints the summary to
+# stderr at exit, any other value is taken as the file to write it to), and
+# THESIS_PROFILE_STACKS to also write a collapsed-stack file for flamegraph
+# tools (flamegraph.pl, speedscope), weighted by microseconds of self time.
+#
+# install() wraps data_manager.read_data/write_data, every public method and
+# function of models, and the top-level actions of the CLI (its handle_*
+# functions, dashboards and main loop). Each call records its wall time and,
+# inclusive of what it calls, the files opened, the bytes read and written
+# (from /proc/self/io, where available) and the time spent parsing JSON.
+# Calls are grouped by the innermost CLI action they run under; the actions
+# themselves are not timed, as they mostly wait for input. Nothing is wrapped
+# unless install() is called, so a disabled profile costs nothing.
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+ENABLED = os.environ.get('THESIS_PROFILE', '') not in ('', '0')
+STACKS_FILE = os.environ.get('THESIS_PROFILE_STACKS') or None
+
+# Running totals the calls take deltas of
+_totals = {"files": 0, "json_seconds": 0.0}
+# (action, operation) -> [calls, seconds, files, bytes read, bytes written, json seconds]
+_stats = {}
+# "frame;frame;..." -> self seconds
+_stacks = {}
+_local = threading.local()
+_installed = []
+_proc_io = [None]
+
+NO_ACTION = "(startup)"
+
+class _TimedJson:
+    """Stands in for the json module in the storage modules, timing load() and loads()."""
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+    @staticmethod
+    def load(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return json.load(*args, **kwargs)
+        finally:
+            _totals["json_seconds"] += time.perf_counter() - start
+
+    @staticmethod
+    def loads(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return json.loads(*args, **kwargs)
+        finally:
+            _totals["json_seconds"] += time.perf_counter() - start
+
+def _audit(event, args):
+    if event == 'open':
+        _totals["files"] += 1
+
+def _io_bytes():
+    """Returns (bytes read, bytes written) by this process so far, or (0, 0) if unknown."""
+    fd = _proc_io[0]
+    if fd is None:
+        return 0, 0
+    content = os.pread(fd, 4096, 0)
+    values = dict(line.split(b': ') for line in content.splitlines() if b': ' in line)
+    # Reading /proc/self/io counts as a read itself
+    return int(values[b'rchar']) - len(content), int(values[b'wchar'])
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+def _wrap(label, function, action=False):
+    """Returns function wrapped so that its calls are recorded under label."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        stack = _stack()
+        # frame: [label, is action, seconds spent in wrapped callees]
+        frame = [label, action, 0.0]
+        stack.append(frame)
+        files, json_seconds = _totals["files"], _totals["json_seconds"]
+        read, written = _io_bytes()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            end_read, end_written = _io_bytes()
+            stack.pop()
+            if stack:
+                stack[-1][2] += elapsed
+            if not action:
+                current = next((f[0] for f in reversed(stack) if f[1]), NO_ACTION)
+                entry = _stats.setdefault((current, label), [0, 0.0, 0, 0, 0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] += _totals["files"] - files
+                entry[3] += end_read - read
+                entry[4] += end_written - written
+                entry[5] += _totals["json_seconds"] - json_seconds
+            if STACKS_FILE and not action:
+                key = ";".join([f[0] for f in stack] + [label])
+                _stacks[key] = _stacks.get(key, 0.0) + elapsed - frame[2]
+    return wrapper
+
+def _wrap_class(cls):
+    for name, member in list(vars(cls).items()):
+        if name.startswith('_'):
+            continue
+        label = f"{cls.__name__}.{name}"
+        if isinstance(member, staticmethod):
+            setattr(cls, name, staticmethod(_wrap(label, member.__func__)))
+        elif callable(member):
+            setattr(cls, name, _wrap(label, member))
+
+def install(cli=None):
+    """
+    Wraps the storage and model functions (and, if given, the actions of
+    the CLI module) and registers the summary to be written at exit.
+    """
+    if _installed:
+        return
+    from . import data_manager
+    from . import journal
+    from . import models
+    from . import sqlite_store
+
+    _installed.append(True)
+    sys.addaudithook(_audit)
+    try:
+        _proc_io[0] = os.open('/proc/self/io', os.O_RDONLY)
+    except OSError:
+        pass
+    for module in (data_manager, journal, sqlite_store):
+        module.json = _TimedJson()
+    for name in ('read_data', 'write_data'):
+        setattr(data_manager, name, _wrap(name, getattr(data_manager, name)))
+    for name, member in list(vars(models).items()):
+        if name.startswith('_'):
+            continue
+        if isinstance(member, type) and member.__module__ == models.__name__:
+            _wrap_class(member)
+        elif callable(member) and getattr(member, '__module__', None) == models.__name__:
+            setattr(models, name, _wrap(name, member))
+    if cli is not None:
+        for name, member in list(vars(cli).items()):
+            if callable(member) and (name == 'main' or name.startswith('handle_') or name.endswith('_dashboard')):
+                setattr(cli, name, _wrap(name, member, action=True))
+    atexit.register(write_summary)
+
+def summary():
+    """Formats the recorded calls as a table grouped by CLI action."""
+    lines = [
+        f"{'action / operation':<44} {'calls':>6} {'total ms':>10} {'avg ms':>9} {'files':>6} "
+        f"{'read KiB':>9} {'written KiB':>11} {'json ms':>9}"
+    ]
+    for action in sorted({a for a, _ in _stats}):
+        lines.append(action)
+        rows = sorted(((op, entry) for (a, op), entry in _stats.items() if a == action), key=lambda r: -r[1][1])
+        for op, (calls, seconds, files, read, written, json_seconds) in rows:
+            lines.append(
+                f"  {op:<42} {calls:>6} {seconds * 1000:>10.1f} {seconds * 1000 / calls:>9.2f} {files:>6} "
+                f"{read / 1024:>9.1f} {written / 1024:>11.1f} {json_seconds * 1000:>9.1f}"
+            )
+    if _proc_io[0] is None:
+        lines.append("(bytes read and written are not available on this platform)")
+    return "\n".join(lines) + "\n"
+
+def write_stacks(path):
+    """Writes the self time of every call stack in collapsed-stack format, in microseconds."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for key, seconds in sorted(_stacks.items()):
+            if seconds > 0:
+                f.write(f"{key} {round(seconds * 1e6)}\n")
+
+def write_summary():
+    """Writes the summary (and the stacks file) where the environment asks for them."""
+    target = os.environ.get('THESIS_PROFILE', '1')
+    if target == '1':
+        sys.stderr.write(summary())
+    else:
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(summary())
+    if STACKS_FILE:
+        write_stacks(STACKS_FILE)
@@ -0,0 +1,83 @@
+# src/jobs.py
+# End-of-term batch jobs: every professor's performance report, every
+# course's roster and a full export of the archive.
+#
+# run() spreads the jobs over a ProcessPoolExecutor. The parent takes one
+# read-only snapshot of all collections (data_manager.snapshot()) and hands it
+# to each worker once, through the pool initializer; workers answer every job
+# from it and never touch the data files. pool.map keeps the job order, so
+# merging the outputs is deterministic and the result is the same as a serial
+# run. Small datasets are run serially, where starting workers would cost more
+# than it saves.
+import os
+from concurrent.futures import ProcessPoolExecutor
+from . import archive
+from . import data_manager
+from . import indexes
+from . import models
+from . import reports
+
+# Archive records per export job
+EXPORT_CHUNK = 2000
+
+# Below this many theses, run() does not start a pool.
+PARALLEL_MIN_THESES = 5000
+
+def end_of_term_jobs():
+    """Returns the list of jobs that make up the end-of-term run."""
+    jobs = [("report", user['id']) for user in indexes.find('users', 'role', 'professor')]
+    jobs += [("roster", course['id']) for course in data_manager.get_courses(frozen=True)]
+    # One series of chunks per partition of the archive view, in archive order
+    archive.fresh()
+    for name in archive.views():
+        total = len(data_manager.get_collection(name, frozen=True))
+        jobs += [("export", name, offset, EXPORT_CHUNK) for offset in range(0, total, EXPORT_CHUNK)]
+    return jobs
+
+def run_job(job):
+    """Runs one job and returns its output."""
+    kind = job[0]
+    if kind == "report":
+        user = indexes.get('users', job[1])
+        return models.Professor(job[1], user['name'] if user else '').generate_performance_report()
+    if kind == "roster":
+        return reports.course_roster(job[1])
+    if kind == "export":
+        # Sliced straight out of the partition, so a chunk costs only its own records
+        _, name, offset, limit = job
+        records = data_manager.get_collection(name, frozen=True)[offset:offset + limit]
+        return [archive.result(record) for record in records if record['thesis_id'] != archive.META_KEY]
+    raise ValueError(f"Unknown job: {kind}")
+
+def _init_worker(snapshot):
+    data_manager.load_snapshot(snapshot)
+
+def merge(jobs, outputs):
+    """Combines job outputs into {"reports": {...}, "rosters": {...}, "archive": [...]}."""
+    result = {"reports": {}, "rosters": {}, "archive": []}
+    for job, output in zip(jobs, outputs):
+        if job[0] == "report":
+            result["reports"][job[1]] = output
+        elif job[0] == "roster":
+            result["rosters"][job[1]] = output
+        else:
+            result["archive"].extend(output)
+    return result
+
+def run(jobs=None, workers=None, min_theses=PARALLEL_MIN_THESES):
+    """
+    Runs jobs (default: end_of_term_jobs()) with up to `workers` processes
+    (default: one per CPU) and returns the merged outputs. Runs serially for
+    one worker or fewer than min_theses theses.
+    """
+    # Derived data is brought up to date here, so that workers only read.
+    archive.fresh()
+    if jobs is None:
+        jobs = end_of_term_jobs()
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(data_manager.get_theses(frozen=True)) < min_theses:
+        return merge(jobs, [run_job(job) for job in jobs])
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(data_manager.snapshot(),)) as pool:
+        outputs = list(pool.map(run_job, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    return merge(jobs, outputs)
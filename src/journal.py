@@ -0,0 +1,189 @@
+# src/journal.py
+# Append-only journal storage for the JSON collections.
+#
+# Instead of rewriting a whole collection file on every save, changed records
+# are appended as one JSON line each to '<file>.journal':
+#   {"op": "upsert", "key": ..., "record": {...}}
+#   {"op": "delete", "key": ...}
+# Reads replay the journal over the last snapshot (the plain JSON file).
+# Once the journal grows past a size or ratio threshold, a compactor folds it
+# into a new snapshot, written atomically, and truncates the journal.
+import json
+import os
+import threading
+
+JOURNAL_SUFFIX = '.journal'
+
+# Compact when the journal is bigger than COMPACT_MAX_BYTES, or bigger than
+# COMPACT_MIN_BYTES and more than COMPACT_RATIO times the snapshot size.
+COMPACT_MIN_BYTES = 64 * 1024
+COMPACT_MAX_BYTES = 8 * 1024 * 1024
+COMPACT_RATIO = 0.5
+
+# Serializes appends and compactions within this process.
+_lock = threading.RLock()
+
+def journal_path(file_path):
+    """Returns the journal file path belonging to a snapshot file."""
+    return file_path + JOURNAL_SUFFIX
+
+def _read_snapshot(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+def _read_entries(path):
+    """
+    Yields the journal entries in order.
+    A torn last line (from a crash in the middle of an append) is ignored.
+    """
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return
+    lines = content.split(b'\n')
+    # Everything after the last newline is an incomplete write.
+    for line in lines[:-1]:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # Only complete lines are terminated by a newline, so a line that
+            # does not parse can only come from outside interference; skip it.
+            continue
+
+def replay(records, entries, pk):
+    """Applies journal entries to a list of records and returns the result."""
+    positions = {record[pk]: i for i, record in enumerate(records)}
+    records = list(records)
+    for entry in entries:
+        key = entry['key']
+        position = positions.get(key)
+        if entry['op'] == 'upsert':
+            if position is None or records[position] is None:
+                positions[key] = len(records)
+                records.append(entry['record'])
+            else:
+                records[position] = entry['record']
+        elif entry['op'] == 'delete' and position is not None:
+            records[position] = None
+            del positions[key]
+    return [record for record in records if record is not None]
+
+def load(file_path, pk):
+    """Returns the current records: the snapshot with the journal replayed over it."""
+    with _lock:
+        return replay(_read_snapshot(file_path), _read_entries(journal_path(file_path)), pk)
+
+def diff(old_records, new_records, pk):
+    """
+    Returns the journal entries that turn old_records into new_records, or
+    None if the change cannot be expressed as upserts and deletes (i.e. the
+    surviving records were reordered).
+    """
+    old_by_key = {record[pk]: record for record in old_records}
+    new_keys = {record[pk] for record in new_records}
+
+    kept_old_order = [record[pk] for record in old_records if record[pk] in new_keys]
+    kept_new_order = [record[pk] for record in new_records if record[pk] in old_by_key]
+    if kept_old_order != kept_new_order:
+        return None
+    # New records must come after all surviving ones, as replay appends them.
+    seen_new = False
+    for record in new_records:
+        if record[pk] not in old_by_key:
+            seen_new = True
+        elif seen_new:
+            return None
+
+    entries = [{"op": "delete", "key": key} for key in old_by_key if key not in new_keys]
+    for record in new_records:
+        old = old_by_key.get(record[pk])
+        if old is None or old != record:
+            entries.append({"op": "upsert", "key": record[pk], "record": record})
+    return entries
+
+def _repair_tail(f):
+    """Truncates a torn last line so that new entries start on a fresh line."""
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        return
+    f.seek(size - 1)
+    if f.read(1) == b'\n':
+        return
+    f.seek(0)
+    content = f.read()
+    f.truncate(content.rfind(b'\n') + 1)
+    f.seek(0, os.SEEK_END)
+
+def append(file_path, entries):
+    """Appends entries to a collection's journal and fsyncs it. Returns the journal size."""
+    payload = b''.join(
+        json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=dict).encode('utf-8') + b'\n'
+        for entry in entries
+    )
+    with _lock:
+        with open(journal_path(file_path), 'a+b') as f:
+            _repair_tail(f)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def write_snapshot(file_path, records, indent=4):
+    """
+    Atomically replaces the snapshot file and empties the journal.
+    indent=None writes it compactly.
+    """
+    with _lock:
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=indent,
+                      separators=(',', ':') if indent is None else None, default=dict)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        _fsync_dir(file_path)
+        # Replaying the old journal over the new snapshot is harmless, so a
+        # crash between the replace and the truncate loses nothing.
+        discard(file_path)
+
+def discard(file_path):
+    """Empties a collection's journal, e.g. after its snapshot was replaced."""
+    with _lock:
+        with open(journal_path(file_path), 'wb') as f:
+            os.fsync(f.fileno())
+
+def needs_compaction(file_path, journal_size):
+    """Checks the journal size against the compaction thresholds."""
+    if journal_size >= COMPACT_MAX_BYTES:
+        return True
+    try:
+        snapshot_size = os.path.getsize(file_path)
+    except FileNotFoundError:
+        snapshot_size = 0
+    return journal_size >= COMPACT_MIN_BYTES and journal_size > COMPACT_RATIO * snapshot_size
+
+def compact(file_path, pk, indent=4):
+    """
+    Folds the journal into a new snapshot.
+    Callers must hold the collection's cross-process lock.
+    """
+    with _lock:
+        write_snapshot(file_path, load(file_path, pk), indent)
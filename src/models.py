@@ -1,6 +1,18 @@
 # src/models.py
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+from itertools import chain, islice
+from . import aggregates
+from . import archive
+from . import auth
 from . import data_manager
+from . import fulltext
+from . import indexes
+from . import partitions
+from . import planner
+from . import queries
+from . import records
+from . import reports
+from . import trigrams
 from . import utils
 
 class User:
@@ -16,16 +28,35 @@ class User:
         If successful, returns an instance of Student or Professor.
         Otherwise, returns None.
         """
-        users = data_manager.get_users()
-        for user_data in users:
-            if user_data['id'] == user_id:
-                if utils.verify_password(password, user_data['password_hash']):
-                    if user_data['role'] == 'student':
-                        return Student(user_id=user_data['id'], name=user_data['name'])
-                    elif user_data['role'] == 'professor':
-                        return Professor(user_id=user_data['id'], name=user_data['name'])
+        user_data = auth.credentials(user_id)
+        if user_data and utils.verify_password(password, user_data['password_hash']):
+            return User._from_record(user_data)
         return None
 
+    @staticmethod
+    def resume(token):
+        """
+        Returns the Student or Professor of a session token (see
+        session_token()), without a password, or None if the token is
+        invalid or expired, or its user was deleted or changed role or
+        password since. Costs one credentials lookup.
+        """
+        record = auth.session_credentials(token)
+        return User._from_record(record) if record else None
+
+    @staticmethod
+    def _from_record(record):
+        if record['role'] == 'student':
+            return Student(user_id=record['id'], name=record['name'])
+        elif record['role'] == 'professor':
+            return Professor(user_id=record['id'], name=record['name'])
+        return None
+
+    def session_token(self):
+        """Returns a signed token that resume() accepts until it expires or the password changes."""
+        record = auth.credentials(self.user_id)
+        return auth.issue_token(self.user_id, self.name, self.role, record['password_hash'])
+
     def __repr__(self):
         return f"{self.__class__.__name__}(id='{self.user_id}', name='{self.name}')"
 
@@ -36,12 +67,11 @@ class Student(User):
 
     def get_available_courses(self):
         """Returns a list of courses that have capacity."""
-        all_courses = data_manager.get_courses()
-        proposals = data_manager.get_proposals()
+        all_courses = data_manager.get_courses(frozen=True)
         available_courses = []
 
         for course in all_courses:
-            approved_count = sum(1 for p in proposals if p['course_id'] == course['id'] and p['status'] == 'approved')
+            approved_count = aggregates.course_approved(course['id'])
             if approved_count < course['capacity']:
                 available_courses.append(course)
 
@@ -49,31 +79,39 @@ class Student(User):
 
     def submit_thesis_request(self, course_id):
         """Submits a new thesis proposal request."""
-        proposals = data_manager.get_proposals()
-        if any(p for p in proposals if p['student_id'] == self.user_id and p['status'] in ['pending', 'approved']):
+        # An approved proposal moved to a cold partition (see partitions.py)
+        if partitions.student_year(self.user_id) is not None:
             return False, "شما در حال حاضر یک درخواست فعال یا در انتظار تایید دارید."
 
-        new_proposal = {
-            "proposal_id": utils.generate_unique_id(), "student_id": self.user_id,
-            "course_id": course_id, "request_date": utils.get_current_date_str(),
-            "status": "pending", "approval_date": None
-        }
-        proposals.append(new_proposal)
-        data_manager.save_proposals(proposals)
-        return True, "درخواست شما با موفقیت ثبت و برای استاد ارسال شد."
+        def submit(proposals):
+            my_proposals = indexes.locate_all(proposals, 'proposals', 'student_id', self.user_id)
+            if any(p for p in my_proposals if p['status'] in ['pending', 'approved']):
+                return False, "شما در حال حاضر یک درخواست فعال یا در انتظار تایید دارید."
+
+            new_proposal = {
+                "proposal_id": utils.generate_unique_id(), "student_id": self.user_id,
+                "course_id": course_id, "request_date": utils.get_current_date_str(),
+                "status": "pending", "approval_date": None
+            }
+            proposals.append(new_proposal)
+            return True, "درخواست شما با موفقیت ثبت و برای استاد ارسال شد."
+
+        return data_manager.update('proposals', submit)
 
     def view_my_thesis_status(self):
         """Retrieves the status of the student's thesis proposal."""
-        proposals = data_manager.get_proposals()
-        theses = data_manager.get_theses()
-
-        my_proposal = next((p for p in proposals if p['student_id'] == self.user_id), None)
+        proposals, theses = 'proposals', 'theses'
+        year = partitions.student_year(self.user_id)
+        if year is not None:
+            # Defended, and moved to the cold partitions of its year
+            proposals, theses = data_manager.partition('proposals', year), data_manager.partition('theses', year)
+        my_proposal = next(iter(indexes.find(proposals, 'student_id', self.user_id)), None)
         if not my_proposal:
             return None, "no_proposal"
 
-        course_info = next((c for c in data_manager.get_courses() if c['id'] == my_proposal['course_id']), None)
+        course_info = indexes.get('courses', my_proposal['course_id'])
 
-        my_thesis = next((t for t in theses if t.get('proposal_id') == my_proposal['proposal_id']), None)
+        my_thesis = next(iter(indexes.find(theses, 'proposal_id', my_proposal['proposal_id'])), None)
         if my_thesis:
             return {"proposal": my_proposal, "course": course_info, "thesis": my_thesis}, "defense_status"
 
@@ -82,33 +120,37 @@ class Student(User):
 
     def request_defense(self, title, abstract, keywords, pdf_path, image_path):
         """Submits a defense request if conditions are met."""
-        proposals = data_manager.get_proposals()
-        my_proposal = next((p for p in proposals if p['student_id'] == self.user_id and p['status'] == 'approved'), None)
+        my_proposal = next((p for p in indexes.find('proposals', 'student_id', self.user_id) if p.status == 'approved'), None)
 
         if not my_proposal:
             return False, "شما باید یک پروپوزال تایید شده داشته باشید."
 
-        approval_date_str = my_proposal.get('approval_date')
-        if not approval_date_str:
+        # A ProposalRecord: the approval date is already parsed
+        approval_date = my_proposal.approval_date
+        if not approval_date:
             return False, "تاریخ تایید پروپوزال شما ثبت نشده است."
 
-        approval_date = datetime.strptime(approval_date_str, '%Y-%m-%d')
-        if datetime.now() < approval_date + timedelta(days=90):
-            return False, f"باید حداقل ۹۰ روز از تاریخ تایید پروپوزال شما ({approval_date_str}) گذشته باشد."
-
-        theses = data_manager.get_theses()
-        new_thesis = {
-            "thesis_id": utils.generate_unique_id(),
-            "proposal_id": my_proposal['proposal_id'],
-            "title": title, "abstract": abstract, "keywords": keywords,
-            "pdf_path": pdf_path, "cover_image_path": image_path,
-            "status": "defense_pending", # defense_pending, defense_approved, defense_rejected, graded, defended
-            "defense_request_date": utils.get_current_date_str(),
-            "grades": {}, "reviewers": []
-        }
-        theses.append(new_thesis)
-        data_manager.save_theses(theses)
-        return True, "درخواست دفاع شما با موفقیت ثبت شد."
+        if date.today() < approval_date + timedelta(days=90):
+            return False, f"باید حداقل ۹۰ روز از تاریخ تایید پروپوزال شما ({my_proposal['approval_date']}) گذشته باشد."
+
+        def submit(theses):
+            my_theses = indexes.locate_all(theses, 'theses', 'proposal_id', my_proposal['proposal_id'])
+            if any(t for t in my_theses if t['status'] != 'defense_rejected'):
+                return False, "شما قبلا درخواست دفاع ثبت کرده‌اید."
+
+            new_thesis = {
+                "thesis_id": utils.generate_unique_id(),
+                "proposal_id": my_proposal['proposal_id'],
+                "title": title, "abstract": abstract, "keywords": keywords,
+                "pdf_path": pdf_path, "cover_image_path": image_path,
+                "status": "defense_pending", # defense_pending, defense_approved, defense_rejected, graded, defended
+                "defense_request_date": utils.get_current_date_str(),
+                "grades": {}, "reviewers": []
+            }
+            theses.append(new_thesis)
+            return True, "درخواست دفاع شما با موفقیت ثبت شد."
+
+        return data_manager.update('theses', submit)
 
 
 class Professor(User):
@@ -119,220 +161,331 @@ class Professor(User):
 
     def get_load(self):
         """Calculates current supervision and review load."""
-        proposals = data_manager.get_proposals()
-        theses = data_manager.get_theses()
-
-        supervision_count = sum(1 for p in proposals if self.is_supervisor_for_proposal(p) and p['status'] == 'approved')
-        review_count = sum(1 for t in theses if self.user_id in t.get('reviewers', []))
+        supervision_count = aggregates.professor_supervision(self.user_id)
+        review_count = aggregates.professor_review(self.user_id)
 
         return {"supervision": supervision_count, "review": review_count}
 
     def is_supervisor_for_proposal(self, proposal):
-        course = next((c for c in data_manager.get_courses() if c['id'] == proposal['course_id']), None)
+        course = indexes.get('courses', proposal['course_id'])
         return course and course['professor_id'] == self.user_id
 
     def get_pending_proposals(self):
         """Returns a list of pending thesis proposals for this professor."""
-        proposals = data_manager.get_proposals()
         pending_list = []
-        for p in proposals:
-            if self.is_supervisor_for_proposal(p) and p['status'] == 'pending':
-                student = next((u for u in data_manager.get_users() if u['id'] == p['student_id']), None)
-                course = next((c for c in data_manager.get_courses() if c['id'] == p['course_id']), None)
-                pending_list.append({"proposal": p, "student": student, "course": course})
+        for p in queries.proposals_for_professor(self.user_id, 'pending'):
+            student = indexes.get('users', p['student_id'])
+            course = indexes.get('courses', p['course_id'])
+            pending_list.append({"proposal": p, "student": student, "course": course})
         return pending_list
 
     def decide_on_proposal(self, proposal_id, decision):
-        """Approves or rejects a thesis proposal."""
-        if decision == 'approved' and self.get_load()['supervision'] >= self.supervision_limit:
-            return False, "ظرفیت راهنمایی شما تکمیل است."
-
-        proposals = data_manager.get_proposals()
-        proposal_to_update = next((p for p in proposals if p['proposal_id'] == proposal_id and self.is_supervisor_for_proposal(p)), None)
-
-        if not proposal_to_update:
-            return False, "درخواست مورد نظر یافت نشد یا متعلق به شما نیست."
-
-        proposal_to_update['status'] = decision
-        if decision == 'approved':
-            proposal_to_update['approval_date'] = utils.get_current_date_str()
-            # Reject other pending proposals from the same student
-            for p in proposals:
-                if p['student_id'] == proposal_to_update['student_id'] and p['status'] == 'pending':
-                    p['status'] = 'rejected'
-
-        data_manager.save_proposals(proposals)
-        return True, f"درخواست با موفقیت {decision} شد."
+        """Approves or rejects a thesis proposal; decision is 'approved' or 'rejected'."""
+        return decide_on_proposals([(self, proposal_id, decision)])[0]
 
     def get_pending_defense_requests(self):
         """Returns defense requests for theses supervised by this professor."""
-        theses = data_manager.get_theses()
-        proposals = data_manager.get_proposals()
-        users = data_manager.get_users()
-
         pending_list = []
-        for thesis in theses:
-            if thesis['status'] == 'defense_pending':
-                proposal = next((p for p in proposals if p.get('proposal_id') == thesis.get('proposal_id')), None)
-                if proposal and self.is_supervisor_for_proposal(proposal):
-                    student = next((u for u in users if u['id'] == proposal['student_id']), None)
-                    pending_list.append({'thesis': thesis, 'student': student})
+        for thesis in indexes.find('theses', 'status', 'defense_pending'):
+            proposal = indexes.get('proposals', thesis.get('proposal_id'))
+            if proposal and self.is_supervisor_for_proposal(proposal):
+                student = indexes.get('users', proposal['student_id'])
+                pending_list.append({'thesis': thesis, 'student': student})
         return pending_list
 
     def decide_on_defense(self, thesis_id, decision, defense_date, reviewer_ids):
-        """Approves or rejects a defense request."""
-        theses = data_manager.get_theses()
-        thesis_to_update = next((t for t in theses if t['thesis_id'] == thesis_id), None)
-
-        if not thesis_to_update:
-            return False, "پایان‌نامه یافت نشد."
-
-        if decision == 'approved':
-            thesis_to_update['status'] = 'defense_approved'
-            thesis_to_update['defense_date'] = defense_date
-            thesis_to_update['reviewers'] = reviewer_ids
-        else:
-            thesis_to_update['status'] = 'defense_rejected'
-
-        data_manager.save_theses(theses)
-        return True, f"درخواست دفاع با موفقیت {decision} شد."
+        """Approves or rejects a pending defense request."""
+        return decide_on_defenses([(self, thesis_id, decision, defense_date, reviewer_ids)])[0]
 
     def get_theses_to_review(self):
         """Returns theses assigned to this professor for review."""
-        theses = data_manager.get_theses()
-        proposals = data_manager.get_proposals()
-        users = data_manager.get_users()
         review_list = []
-        for thesis in theses:
-            if self.user_id in thesis.get('reviewers', []) and thesis.get('status') == 'defense_approved':
-                proposal = next((p for p in proposals if p.get('proposal_id') == thesis.get('proposal_id')), None)
-                student = next((u for u in users if u['id'] == proposal['student_id']), None)
+        for thesis in indexes.find('theses', 'reviewers', self.user_id):
+            if thesis.get('status') == 'defense_approved':
+                proposal = indexes.get('proposals', thesis.get('proposal_id'))
+                student = indexes.get('users', proposal['student_id'])
                 review_list.append({'thesis': thesis, 'student': student})
         return review_list
 
     def submit_grade(self, thesis_id, grade):
         """Submits a grade for a thesis."""
-        theses = data_manager.get_theses()
-        thesis = next((t for t in theses if t['thesis_id'] == thesis_id), None)
-        if not thesis:
-            return False, "پایان‌نامه یافت نشد."
+        return submit_grades([(self, thesis_id, grade)])[0]
 
-        # Check if today is after the defense date
-        defense_date = datetime.strptime(thesis['defense_date'], '%Y-%m-%d')
-        if datetime.now() < defense_date:
-            return False, "هنوز تاریخ دفاع فرا نرسیده است."
+    def generate_performance_report(self):
+        """Generates a performance report for the professor."""
+        return reports.professor_report(self.user_id)
 
-        # Record grade
-        thesis['grades'][self.user_id] = grade
+# --- Batches ---
+# Each function applies many changes in one load-validate-write cycle of the
+# collection, checking every row with the rules of the matching Professor
+# method and taking the earlier rows into account. A row that breaks a rule
+# is skipped; the others are saved together. They return one
+# (success, message) per row, in order.
 
-        # Check if all grades are submitted
-        supervisor_id = next(c['professor_id'] for c in data_manager.get_courses() if c['id'] == next(p['course_id'] for p in data_manager.get_proposals() if p['proposal_id'] == thesis['proposal_id']))
-        all_graders = thesis['reviewers'] + [supervisor_id]
+def decide_on_proposals(decisions):
+    """Applies (professor, proposal_id, decision) rows, see Professor.decide_on_proposal."""
+    results = []
+    changes = {}
+
+    def decide(proposals):
+        results.clear()
+        changes.clear()
+        # Approved proposals per professor and per course, including the batch so far
+        supervision = {}
+        approved = {}
+        for professor, proposal_id, decision in decisions:
+            results.append(_decide_on_proposal(proposals, professor, proposal_id, decision, supervision, approved, changes))
+        return _batch_result(results)
+
+    data_manager.update('proposals', decide, on_success=lambda: aggregates.record_changes('proposals', list(changes.values())))
+    return list(results)
+
+def _decide_on_proposal(proposals, professor, proposal_id, decision, supervision, approved, changes):
+    if decision not in ('approved', 'rejected'):
+        return False, "تصمیم نامعتبر است."
+    # Limits are checked against the proposals themselves rather than the
+    # counters, so they hold under concurrent sessions.
+    if professor.user_id not in supervision:
+        supervision[professor.user_id] = queries.count_proposals_for_professor(professor.user_id, 'approved')
+    if decision == 'approved' and supervision[professor.user_id] >= professor.supervision_limit:
+        return False, "ظرفیت راهنمایی شما تکمیل است."
+
+    proposal_to_update = indexes.locate(proposals, 'proposals', proposal_id)
+
+    if not proposal_to_update or not professor.is_supervisor_for_proposal(proposal_to_update):
+        return False, "درخواست مورد نظر یافت نشد یا متعلق به شما نیست."
+
+    course_id = proposal_to_update['course_id']
+    if course_id not in approved:
+        approved[course_id] = queries.count_approved_for_course(course_id)
+    was_approved = proposal_to_update['status'] == 'approved'
+    if decision == 'approved' and not was_approved:
+        course = indexes.get('courses', course_id)
+        if approved[course_id] >= course['capacity']:
+            return False, "ظرفیت این درس تکمیل است."
+
+    changes.setdefault(proposal_id, (dict(proposal_to_update), proposal_to_update))
+    proposal_to_update['status'] = decision
+    if decision == 'approved':
+        proposal_to_update['approval_date'] = utils.get_current_date_str()
+        # Reject other pending proposals from the same student
+        for p in indexes.locate_all(proposals, 'proposals', 'student_id', proposal_to_update['student_id']):
+            if p['status'] == 'pending':
+                p['status'] = 'rejected'
+    if was_approved != (decision == 'approved'):
+        delta = 1 if decision == 'approved' else -1
+        supervision[professor.user_id] += delta
+        approved[course_id] += delta
+
+    return True, f"درخواست با موفقیت {decision} شد."
+
+def decide_on_defenses(decisions):
+    """
+    Applies (professor, thesis_id, decision, defense_date, reviewer_ids)
+    rows, see Professor.decide_on_defense.
+    """
+    results = []
+    changes = {}
+
+    def decide(theses):
+        results.clear()
+        changes.clear()
+        for professor, thesis_id, decision, defense_date, reviewer_ids in decisions:
+            thesis_to_update = indexes.locate(theses, 'theses', thesis_id)
+
+            if not thesis_to_update:
+                results.append((False, "پایان‌نامه یافت نشد."))
+                continue
+            # Only a pending request is decided; a graded thesis never leaves the archive this way
+            if thesis_to_update['status'] != 'defense_pending':
+                results.append((False, "درخواست دفاعی برای این پایان‌نامه در انتظار بررسی نیست."))
+                continue
+
+            changes.setdefault(thesis_id, (dict(thesis_to_update), thesis_to_update))
+            if decision == 'approved':
+                thesis_to_update['status'] = 'defense_approved'
+                thesis_to_update['defense_date'] = defense_date
+                thesis_to_update['reviewers'] = reviewer_ids
+            else:
+                thesis_to_update['status'] = 'defense_rejected'
+
+            results.append((True, f"درخواست دفاع با موفقیت {decision} شد."))
+        return _batch_result(results)
+
+    data_manager.update('theses', decide, on_success=lambda: aggregates.record_changes('theses', list(changes.values())))
+    return list(results)
+
+def submit_grades(grades):
+    """Applies (professor, thesis_id, grade) rows, see Professor.submit_grade."""
+    results = []
+    graded = {}
 
-        if all(g_id in thesis['grades'] for g_id in all_graders):
-            thesis['status'] = 'graded'
+    def grade_theses(theses):
+        results.clear()
+        graded.clear()
+        for professor, thesis_id, grade in grades:
+            results.append(_submit_grade(theses, professor, thesis_id, grade, graded))
+        return _batch_result(results)
 
-        data_manager.save_theses(theses)
-        return True, "نمره با موفقیت ثبت شد."
+    def on_success():
+        # Archived theses become searchable right away.
+        archive.record_all(list(graded.values()))
+        fulltext.index_theses(list(graded.values()))
 
-    def generate_performance_report(self):
-        """Generates a performance report for the professor."""
-        theses = data_manager.get_theses()
-        proposals = data_manager.get_proposals()
+    data_manager.update('theses', grade_theses, on_success=on_success)
+    return list(results)
 
-        supervised_count = 0
-        reviewed_count = 0
-        supervised_student_grades = []
+def _submit_grade(theses, professor, thesis_id, grade, graded):
+    thesis = indexes.locate(theses, 'theses', thesis_id)
+    if not thesis:
+        return False, "پایان‌نامه یافت نشد."
+    if not thesis.get('defense_date'):
+        return False, "تاریخ دفاع هنوز تعیین نشده است."
 
-        for thesis in [t for t in theses if t.get('status') in ['graded', 'defended']]:
-            # Check for supervision
-            proposal = next((p for p in proposals if p['proposal_id'] == thesis['proposal_id']), None)
-            if proposal and self.is_supervisor_for_proposal(proposal):
-                supervised_count += 1
-                total_score = sum(thesis['grades'].values())
-                avg_score = total_score / len(thesis['grades']) if thesis['grades'] else 0
-                student = next((u for u in data_manager.get_users() if u['id'] == proposal['student_id']), None)
-                supervised_student_grades.append({
-                    "student_name": student['name'] if student else 'N/A',
-                    "thesis_title": thesis['title'],
-                    "final_grade": f"{avg_score:.2f}"
-                })
-
-            # Check for reviewing
-            if self.user_id in thesis.get('reviewers', []):
-                reviewed_count += 1
-
-        return {
-            "supervised_theses_count": supervised_count,
-            "reviewed_theses_count": reviewed_count,
-            "supervised_students": supervised_student_grades
-        }
-
-def get_letter_grade(score):
-    """Converts a numerical score (0-20) to a letter grade."""
-    if 17 <= score <= 20:
-        return "الف"
-    elif 13 <= score < 17:
-        return "ب"
-    elif 10 <= score < 13:
-        return "ج"
-    else:
-        return "د"
+    # Check if today is after the defense date
+    if date.today() < records.to_date(thesis['defense_date']):
+        return False, "هنوز تاریخ دفاع فرا نرسیده است."
+
+    # Record grade
+    thesis['grades'][professor.user_id] = grade
+
+    # Check if all grades are submitted
+    proposal = indexes.get('proposals', thesis['proposal_id'])
+    supervisor_id = indexes.get('courses', proposal['course_id'])['professor_id']
+    all_graders = thesis['reviewers'] + [supervisor_id]
+
+    if all(g_id in thesis['grades'] for g_id in all_graders):
+        thesis['status'] = 'graded'
+        graded[thesis_id] = thesis
+
+    return True, "نمره با موفقیت ثبت شد."
+
+def _batch_result(results):
+    """The result of a batch's mutate(): saved if any row succeeded."""
+    if any(success for success, _ in results):
+        return True, None
+    return False, results[-1][1] if results else None
+
+def get_user(user_id):
+    """Returns a user record, or None."""
+    return indexes.get('users', user_id)
+
+def list_professors():
+    """Returns the records of all professors."""
+    return indexes.find('users', 'role', 'professor')
+
+def course_approved_count(course_id):
+    """Returns the number of approved proposals of a course."""
+    return aggregates.course_approved(course_id)
+
+def collection_versions():
+    """Returns the current version of every collection, by name."""
+    return {name: data_manager.collection_version(name) for name in data_manager.COLLECTION_FILES}
+
+def subscribe(callback):
+    """Calls callback(collection name) whenever a collection changes (see data_manager.subscribe)."""
+    data_manager.subscribe(callback)
+
+def unsubscribe(callback):
+    data_manager.unsubscribe(callback)
+
+def watch(interval=1.0):
+    """Also reports changes other processes make, checking every interval seconds."""
+    data_manager.watch(interval)
+
+# Moved to utils, which the archive view uses too; kept for existing callers.
+get_letter_grade = utils.get_letter_grade
 
 def search_theses_archive(query, search_by="title"):
     """
     Searches the archive of defended theses.
-    'search_by' can be 'title', 'keyword', 'author', 'supervisor', 'reviewer', 'year'.
+    'search_by' can be 'title', 'keyword', 'author', 'supervisor', 'reviewer', 'year',
+    or 'text' for a ranked full-text search over title, abstract and keywords
+    (all query words must match).
     """
-    theses = data_manager.get_theses()
-    proposals = data_manager.get_proposals()
-    users = data_manager.get_users()
-    courses = data_manager.get_courses()
+    return list(iter_theses_archive(query, search_by))
 
-    # Filter for defended theses only
-    defended_theses = [t for t in theses if t.get('status') in ['graded', 'defended']]
+def iter_theses_archive(query, search_by="title", fields=None, offset=0, limit=None):
+    """
+    Yields the results of search_theses_archive one at a time, in the same order.
+    'fields' selects the result fields to include (default: all of
+    archive.RESULT_FIELDS); 'offset' and 'limit' select a page of results.
+    Matching is done lazily, so the first results come without scanning the
+    whole archive.
+    """
+    archive.check_fields(fields)
+    stop = None if limit is None else offset + limit
+    for record in islice(_archive_records(query, search_by, stop), offset, stop):
+        yield archive.result(record, fields)
 
-    results = []
-    for thesis in defended_theses:
-        proposal = next((p for p in proposals if p['proposal_id'] == thesis['proposal_id']), None)
-        if not proposal: continue
-
-        student = next((u for u in users if u['id'] == proposal['student_id']), None)
-        course = next((c for c in courses if c['id'] == proposal['course_id']), None)
-        supervisor = next((u for u in users if u['id'] == course['professor_id']), None)
-        reviewers = [next((u for u in users if u['id'] == r_id), None) for r_id in thesis['reviewers']]
-
-        # Match query against the specified field
-        match = False
-        if search_by == 'title' and query.lower() in thesis['title'].lower():
-            match = True
-        elif search_by == 'keyword' and query.lower() in thesis['keywords'].lower():
-            match = True
-        elif search_by == 'author' and query.lower() in student['name'].lower():
-            match = True
-        elif search_by == 'supervisor' and query.lower() in supervisor['name'].lower():
-            match = True
-        elif search_by == 'year' and query == str(course['year']):
-            match = True
-        elif search_by == 'reviewer' and any(query.lower() in r['name'].lower() for r in reviewers if r):
-            match = True
-
-        if match:
-            total_score = sum(thesis['grades'].values())
-            avg_score = total_score / len(thesis['grades']) if thesis['grades'] else 0
-
-            results.append({
-                "title": thesis['title'],
-                "abstract": thesis['abstract'],
-                "keywords": thesis['keywords'],
-                "author": student['name'],
-                "year": course['year'],
-                "semester": course['semester'],
-                "supervisor": supervisor['name'],
-                "reviewers": [r['name'] for r in reviewers if r],
-                "download_link": thesis['pdf_path'],
-                "final_grade_score": f"{avg_score:.2f}",
-                "final_grade_letter": get_letter_grade(avg_score)
-            })
-
-    return results
+def derived_ready():
+    """Tells whether the archive view, the counters and the text index are built and current."""
+    return archive.is_fresh() and aggregates.is_built() and fulltext.is_built()
+
+def build_derived():
+    """
+    Builds or brings up to date the archive view, the counters and the text
+    index, which reads otherwise do on first use (and save).
+    """
+    archive.fresh()
+    aggregates.ensure_built()
+    fulltext.ensure_built()
+
+def _archive_records(query, search_by, stop=None):
+    """Yields the (read-only) archive records of search_theses_archive in order."""
+    archive.fresh()
+    if search_by == 'text':
+        # Only the best 'stop' hits need to be ranked.
+        records = (archive.lookup(thesis_id) for thesis_id, _ in fulltext.search(query, limit=stop))
+    elif search_by in archive.SUBSTRING_FIELDS:
+        # Case-insensitive substring match, narrowed down by the trigram index
+        records = chain.from_iterable(trigrams.iter_search(name, archive.SUBSTRING_FIELDS[search_by], query)
+                                      for name in archive.views())
+    elif search_by == 'year':
+        # Opens only the year's cold partition of the view (and the view itself)
+        records, _ = planner.execute([('year', '=', query)])
+    else:
+        records = ()
+    for record in records:
+        if record and record['thesis_id'] != archive.META_KEY:
+            yield record
+
+def query_archive(query, fields=None, offset=0, limit=None):
+    """
+    Returns an iterator over the archive results matching a multi-field
+    query such as 'year=1404 AND supervisor=prof101 AND keyword~"شبکه"',
+    in archive order.
+    See planner.py for the supported fields and operators; raises ValueError
+    for a query it cannot parse. 'fields', 'offset' and 'limit' work as in
+    iter_theses_archive.
+    """
+    archive.check_fields(fields)
+    records, _ = planner.execute(planner.parse(query))
+    stop = None if limit is None else offset + limit
+    return (archive.result(record, fields) for record in islice(records, offset, stop))
+
+def explain_archive_query(query):
+    """
+    Returns the plan of a multi-field query: one dict per predicate, in the
+    order they are applied, with the access method, the estimated number of
+    rows the predicate selects and the number of rows left after it.
+    """
+    _, plan = planner.execute(planner.parse(query))
+    return plan
+
+def archive_facets(query="", search_by=None):
+    """
+    Returns the facet counts {facet: {value: count}} of a result set: that of
+    search_theses_archive(query, search_by) if search_by is given, else that of
+    the multi-field query. Facets are year, semester, supervisor (id),
+    reviewer (id) and letter. An empty multi-field query covers the whole
+    archive and is answered from the precomputed counters.
+    """
+    if search_by is not None:
+        return aggregates.facets(_archive_records(query, search_by))
+    predicates = planner.parse(query)
+    if not predicates:
+        archive.fresh()
+        return aggregates.facets()
+    records, _ = planner.execute(predicates)
+    return aggregates.facets(records)
@@ -0,0 +1,142 @@
+# src/partitions.py
+# Year partitions of the thesis archive.
+# An archived (graded or defended) thesis is closed for good, yet it stayed
+# in the theses and proposals collections that the term's work (pending
+# proposals, defenses, grading) loads and rewrites. move_archived() moves the
+# archived theses of the academic years before a given one, with their
+# proposals and their records of the archive view, out of those collections
+# (the hot partitions) into the cold partitions of their course's year: theses@1399,
+# proposals@1399 and archive@1399 (see data_manager.PARTITIONED). Nothing
+# else writes the cold partitions of theses and proposals; those of the
+# archive view are re-derived with the rest of the view (see archive.py).
+#
+# The 'partitions' collection is the catalog of the cold partitions:
+#   {"id": "proposals@1399", "collection": "proposals", "year": 1399,
+#    "approved": {course_id: count}, "students": [student_id, ...]}
+#   {"id": "theses@1399", "collection": "theses", "year": 1399,
+#    "reviews": {reviewer_id: count}}
+#   {"id": "archive@1399", "collection": "archive", "year": 1399}
+# Its summaries let the checks of the term's work (course capacity, the
+# supervision and review limits, one active proposal per student) count the
+# moved records without loading them. Every moved proposal is approved.
+# Lock order: proposals, theses, archive, partitions.
+from collections import Counter
+from . import data_manager
+from . import indexes
+
+CATALOG = "partitions"
+
+# (catalog records, summary of them), see _summary()
+_cache = [None, None]
+
+def _summary():
+    """Returns the catalog summed up over all cold partitions."""
+    catalog = data_manager.get_collection(CATALOG, frozen=True)
+    if _cache[0] is not catalog:
+        years = {}
+        approved = Counter()
+        reviews = Counter()
+        students = {}
+        for entry in sorted(catalog, key=lambda e: e['year']):
+            years.setdefault(entry['collection'], []).append(entry['year'])
+            approved.update(entry.get('approved') or {})
+            reviews.update(entry.get('reviews') or {})
+            students.update(dict.fromkeys(entry.get('students') or (), entry['year']))
+        _cache[:] = [catalog, {"years": years, "approved": approved, "reviews": reviews, "students": students}]
+    return _cache[1]
+
+def years(name):
+    """Returns the years of a collection's cold partitions, oldest first."""
+    return _summary()["years"].get(name, [])
+
+def names(name, only=None):
+    """
+    Returns the names of a collection's partitions: its cold partitions (of
+    the years in `only`, if given), oldest first, then the collection itself.
+    """
+    return [data_manager.partition(name, year) for year in years(name) if only is None or year in only] + [name]
+
+def approved(course_id):
+    """Returns the number of a course's proposals in cold partitions."""
+    return _summary()["approved"].get(course_id, 0)
+
+def reviews(reviewer_id):
+    """Returns the number of theses in cold partitions a professor reviewed."""
+    return _summary()["reviews"].get(reviewer_id, 0)
+
+def student_year(student_id):
+    """Returns the year of the cold partition holding a student's proposal, or None."""
+    return _summary()["students"].get(student_id)
+
+def _entry(name, year, records):
+    """Returns the catalog record of a cold partition holding records."""
+    entry = {"id": data_manager.partition(name, year), "collection": name, "year": year}
+    if name == 'proposals':
+        approved_proposals = [p for p in records if p['status'] == 'approved']
+        entry["approved"] = dict(Counter(p['course_id'] for p in approved_proposals))
+        entry["students"] = sorted({p['student_id'] for p in approved_proposals})
+    elif name == 'theses':
+        entry["reviews"] = dict(Counter(r for t in records for r in dict.fromkeys(t.get('reviewers') or ())))
+    return entry
+
+def _append(name, year, records):
+    """Adds records to a cold partition (replacing those with the same keys) and returns its catalog record."""
+    part = data_manager.partition(name, year)
+    pk = data_manager.primary_key(name)
+    keys = {record[pk] for record in records}
+    stored = [r for r in data_manager.get_collection(part) if r[pk] not in keys] + records
+    data_manager.write_data(data_manager.collection_file(part), stored)
+    return _entry(name, year, stored)
+
+def move_archived(before, statuses):
+    """
+    Moves the theses with one of the statuses (archive.ARCHIVED_STATUSES) of
+    courses of the years before `before`, with their proposals (and the
+    other theses of those) and archive records, to the cold partitions of
+    their years. Returns {year: theses moved}.
+    """
+    files = [data_manager.collection_file(name) for name in data_manager.PARTITIONED]
+    with data_manager.locked(files[0]), data_manager.locked(files[1]), data_manager.locked(files[2]):
+        collections = {name: data_manager.get_collection(name) for name in data_manager.PARTITIONED}
+        # proposal_id -> year of the proposals to move
+        moving = {}
+        for thesis in collections['theses']:
+            if thesis['status'] not in statuses:
+                continue
+            proposal = indexes.locate(collections['proposals'], 'proposals', thesis['proposal_id'])
+            course = indexes.get('courses', proposal['course_id']) if proposal else None
+            if course and isinstance(course['year'], int) and course['year'] < before:
+                moving[thesis['proposal_id']] = course['year']
+        if not moving:
+            return {}
+        thesis_years = {t['thesis_id']: moving[t['proposal_id']] for t in collections['theses'] if t['proposal_id'] in moving}
+        year_of = {
+            'proposals': lambda r: moving.get(r['proposal_id']),
+            'theses': lambda r: moving.get(r['proposal_id']),
+            'archive': lambda r: thesis_years.get(r['thesis_id']),
+        }
+        moved = {}
+        for name, records in collections.items():
+            kept = []
+            for record in records:
+                year = year_of[name](record)
+                if year is None:
+                    kept.append(record)
+                else:
+                    moved.setdefault(year, {n: [] for n in data_manager.PARTITIONED})[name].append(record)
+            records[:] = kept
+
+        # The cold partitions are written first: until the collections are,
+        # a moved record is found (and counted) twice rather than not at all.
+        entries = [_append(name, year, moved[year][name]) for year in sorted(moved) for name in data_manager.PARTITIONED]
+
+        def replace(catalog):
+            ids = {entry['id'] for entry in entries}
+            catalog[:] = [r for r in catalog if r['id'] not in ids] + entries
+            catalog.sort(key=lambda r: (r['year'], r['collection']))
+            return True, None
+
+        data_manager.update(CATALOG, replace)
+        for name, records in collections.items():
+            data_manager.write_data(data_manager.collection_file(name), records)
+    return {year: len(moved[year]['theses']) for year in sorted(moved)}
@@ -0,0 +1,187 @@
+# src/planner.py
+# Multi-field queries over the archive view.
+# A query is a conjunction of predicates, e.g.
+#   year=1404 AND supervisor=prof101 AND keyword~"شبکه"
+# '=' on year, semester, supervisor (id), reviewer (id) and letter is answered
+# by the hash indexes of the archive collection, <, <=, =, >= and > on grade by
+# a sorted range index over the final score, and '~' is the case-insensitive
+# substring match of the archive search, narrowed down by the trigram index.
+#
+# The planner estimates how many records each predicate selects, starts from
+# the most selective one and intersects the posting sets of the others. A
+# predicate whose set is much bigger than what is left is checked record by
+# record instead of being fetched from its index.
+#
+# The view's cold partitions (see archive.views()) are queried one after the
+# other in the same predicate order, and a year '=' skips those of other years.
+import bisect
+import re
+from . import archive
+from . import data_manager
+from . import indexes
+from . import trigrams
+
+# Query field -> archive field, per kind of index
+EQUALITY_FIELDS = {
+    "year": "year",
+    "semester": "semester",
+    "supervisor": "supervisor_id",
+    "reviewer": "reviewer_ids",
+    "letter": "final_grade_letter",
+}
+RANGE_FIELDS = {"grade": "final_grade_score"}
+
+# An index is intersected only while its set is at most this many times
+# bigger than the current candidates; otherwise the candidates are filtered.
+INTERSECT_RATIO = 2
+
+_PREDICATE = re.compile(r'\s*(\w+)\s*(<=|>=|=|<|>|~)\s*(?:"([^"]*)"|(\S+))\s*')
+_AND = re.compile(r'\s+AND\s+', re.IGNORECASE)
+
+# (view name, column) -> (frozen records, sorted scores, positions in score order)
+_range_built = {}
+
+def parse(text):
+    """
+    Parses 'field op value AND ...' into a list of (field, op, value).
+    Raises ValueError for anything it does not understand.
+    """
+    predicates = []
+    for part in _AND.split(text.strip()) if text.strip() else []:
+        match = _PREDICATE.fullmatch(part)
+        if not match:
+            raise ValueError(f"Cannot parse predicate: {part!r}")
+        field, op = match.group(1), match.group(2)
+        value = match.group(3) if match.group(3) is not None else match.group(4)
+        if op == "~":
+            if field not in archive.SUBSTRING_FIELDS:
+                raise ValueError(f"Field {field!r} does not support '~'")
+        elif field in RANGE_FIELDS:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Field {field!r} needs a number: {value!r}")
+        elif op != "=" or field not in EQUALITY_FIELDS:
+            raise ValueError(f"Field {field!r} does not support {op!r}")
+        predicates.append((field, op, value))
+    return predicates
+
+def describe(predicate):
+    """Formats a predicate the way parse() reads it."""
+    field, op, value = predicate
+    if op == "~":
+        return f'{field}~"{value}"'
+    if field in RANGE_FIELDS:
+        return f"{field}{op}{value:g}"
+    return f"{field}{op}{value}"
+
+def _equality_keys(value):
+    """Index keys an equality value may be stored under (years are ints)."""
+    keys = [value]
+    try:
+        if str(int(value)) == value:
+            keys.append(int(value))
+    except ValueError:
+        pass
+    return keys
+
+def _range_index(name, records, column):
+    """Returns (scores, positions) of a view partition's records sorted by a numeric column."""
+    entry = _range_built.get((name, column))
+    if entry is None or entry[0] is not records:
+        pairs = sorted((float(record[column]), position) for position, record in enumerate(records) if column in record)
+        entry = (records, [score for score, _ in pairs], [position for _, position in pairs])
+        _range_built[(name, column)] = entry
+    return entry[1], entry[2]
+
+def _range_bounds(scores, op, value):
+    """Returns the slice [low, high) of sorted scores that satisfies 'score op value'."""
+    low, high = 0, len(scores)
+    if op in ("=", ">="):
+        low = bisect.bisect_left(scores, value)
+    elif op == ">":
+        low = bisect.bisect_right(scores, value)
+    if op in ("=", "<="):
+        high = bisect.bisect_right(scores, value)
+    elif op == "<":
+        high = bisect.bisect_left(scores, value)
+    return low, max(low, high)
+
+def matches(record, predicate):
+    """Checks one archive record against a predicate."""
+    field, op, value = predicate
+    if op == "~":
+        return trigrams.matches(record, archive.SUBSTRING_FIELDS[field], value)
+    if field in RANGE_FIELDS:
+        if RANGE_FIELDS[field] not in record:
+            return False
+        score = float(record[RANGE_FIELDS[field]])
+        low, high = _range_bounds([score], op, value)
+        return low < high
+    stored = record.get(EQUALITY_FIELDS[field])
+    values = stored if isinstance(stored, (list, tuple)) else (stored,)
+    return any(str(v) == value for v in values)
+
+def _access(name, records, predicate):
+    """Returns (access method, estimated rows, function returning the matching positions)."""
+    field, op, value = predicate
+    if op == "~":
+        column = archive.SUBSTRING_FIELDS[field]
+        return ("trigram index", trigrams.estimate(name, column, value),
+                lambda: set(trigrams.matching(name, column, value)[1]))
+    if field in RANGE_FIELDS:
+        scores, positions = _range_index(name, records, RANGE_FIELDS[field])
+        low, high = _range_bounds(scores, op, value)
+        return "range index", high - low, lambda: set(positions[low:high])
+    column = EQUALITY_FIELDS[field]
+    postings = [indexes.positions(name, column, key) for key in _equality_keys(value)]
+    estimate = sum(len(p) for p in postings)
+    return ("hash index", estimate,
+            lambda: {p for posting in postings for p in posting if matches(records[p], predicate)})
+
+def _years(predicates):
+    """Returns the years the '=' predicates on year leave, or None if there are none."""
+    years = None
+    for field, op, value in predicates:
+        if field == "year" and op == "=":
+            allowed = {key for key in _equality_keys(value) if isinstance(key, int)}
+            years = allowed if years is None else years & allowed
+    return years
+
+def execute(predicates):
+    """
+    Runs a list of predicates. Returns (records, plan): the matching archive
+    records in archive order, and one step per predicate with the access
+    method, the estimated rows it selects and the rows left after it.
+    """
+    archive.fresh()
+    views = []
+    for name in archive.views(_years(predicates)):
+        records = data_manager.get_collection(name, frozen=True)
+        views.append((records, {predicate: _access(name, records, predicate) for predicate in predicates}))
+    # The same order in every partition, by the estimates over all of them
+    estimates = {predicate: sum(accesses[predicate][1] for _, accesses in views) for predicate in predicates}
+    order = sorted(predicates, key=lambda predicate: estimates[predicate])
+
+    plan = [{"predicate": describe(predicate), "access": [], "estimated": estimates[predicate], "actual": 0}
+            for predicate in order]
+    found = []
+    for records, accesses in views:
+        candidates = None
+        for predicate, step in zip(order, plan):
+            method, estimate, fetch = accesses[predicate]
+            if candidates is None:
+                candidates = fetch()
+            elif estimate <= INTERSECT_RATIO * len(candidates):
+                candidates &= fetch()
+            else:
+                method = "filter"
+                candidates = {p for p in candidates if matches(records[p], predicate)}
+            if method not in step["access"]:
+                step["access"].append(method)
+            step["actual"] += len(candidates)
+        positions = range(len(records)) if candidates is None else sorted(candidates)
+        found.extend(records[p] for p in positions if records[p]['thesis_id'] != archive.META_KEY)
+    for step in plan:
+        step["access"] = ", ".join(step["access"])
+    return found, plan
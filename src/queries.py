@@ -0,0 +1,51 @@
+# src/queries.py
+# Filtered queries used by the models. With the sqlite backend they run as
+# SQL against the database; otherwise they are answered from the in-memory
+# indexes, so callers never need to load and filter whole collections.
+# The records found there are records.py objects and are read by attribute.
+# Counts include the records moved to cold partitions, from the summaries in
+# their catalog (see partitions.py), so those are never loaded for them.
+from . import data_manager
+from . import indexes
+from . import partitions
+
+def _sqlite():
+    # A loaded snapshot takes the place of the database.
+    return data_manager.STORAGE_MODE == 'sqlite' and not data_manager.snapshot_loaded()
+
+def count_approved_for_course(course_id):
+    """Counts the approved proposals of one course."""
+    if _sqlite():
+        count = data_manager.sqlite_store.count_approved_for_course(data_manager.DB_FILE, course_id)
+    else:
+        count = sum(1 for p in indexes.find('proposals', 'course_id', course_id) if p.status == 'approved')
+    return count + partitions.approved(course_id)
+
+def proposals_for_professor(professor_id, status):
+    """Returns the proposals with the given status for the courses of a professor, in file order."""
+    if _sqlite():
+        return data_manager.freeze_records(
+            'proposals', data_manager.sqlite_store.proposals_for_professor(data_manager.DB_FILE, professor_id, status)
+        )
+    course_ids = {c.id for c in indexes.find('courses', 'professor_id', professor_id)}
+    return [p for p in indexes.find('proposals', 'status', status) if p.course_id in course_ids]
+
+def count_proposals_for_professor(professor_id, status):
+    """Counts the proposals with the given status for the courses of a professor."""
+    cold = 0
+    if status == 'approved':
+        cold = sum(partitions.approved(c.id) for c in indexes.find('courses', 'professor_id', professor_id))
+    if _sqlite():
+        return data_manager.sqlite_store.count_proposals_for_professor(data_manager.DB_FILE, professor_id, status) + cold
+    return cold + sum(
+        1 for c in indexes.find('courses', 'professor_id', professor_id)
+        for p in indexes.find('proposals', 'course_id', c.id) if p.status == status
+    )
+
+def count_reviews(reviewer_id):
+    """Counts the theses a professor has been assigned to review."""
+    if _sqlite():
+        count = data_manager.sqlite_store.count_reviews(data_manager.DB_FILE, reviewer_id)
+    else:
+        count = len(indexes.positions('theses', 'reviewers', reviewer_id))
+    return count + partitions.reviews(reviewer_id)
@@ -0,0 +1,250 @@
+# src/records.py
+# Compact, read-only record classes for the four main collections and the
+# archive view.
+# The shared cached data (see data_manager.read_data with frozen=True) holds
+# one object of these classes per record instead of a read-only view of a
+# dict: the fields live in __slots__, the values that repeat across records
+# (statuses, roles, ids referring to other records) are interned, and dates
+# are kept as datetime.date objects, shared between records of the same day.
+#
+# Records behave as read-only mappings, so code reads them just like the
+# JSON dicts: record['status'], record.get('defense_date'), dict(record).
+# Date fields read this way are the stored 'YYYY-MM-DD' strings again; the
+# parsed dates are the attributes (record.defense_date). Only that exact form
+# is parsed, since it is what a date formats back to: any other text is kept
+# as a string. A field the record lacks reads as MISSING (which is false) as
+# an attribute. Fields a class does not know are kept as they are. Like the
+# rest of the frozen data, records are never changed after they are built.
+#
+# A class's COLD_FIELDS may be kept in a side file (see cold_store.py): the
+# attribute is then a ColdRef, and reading the field decodes it each time.
+# raw_items() hands out the ColdRef instead, which data_manager.thaw() keeps
+# until the field is touched.
+import operator
+import re
+import sys
+from datetime import date, datetime
+from functools import lru_cache
+from .cold_store import ColdRef
+
+class _Missing:
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __reduce__(self):
+        # Unpickled as the module's single instance
+        return 'MISSING'
+
+    def __repr__(self):
+        return '<missing>'
+
+# Slot value of a field the record does not have
+MISSING = _Missing()
+
+# The form of the date texts stored as dates
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}', re.ASCII)
+
+@lru_cache(maxsize=8192)
+def to_date(text):
+    """Returns the date of a 'YYYY-MM-DD' string (one shared object per day)."""
+    return datetime.strptime(text, '%Y-%m-%d').date()
+
+def _text(value):
+    return value.isoformat()
+
+def _parse_date(text):
+    if not _DATE.fullmatch(text):
+        return text
+    try:
+        return to_date(text)
+    except ValueError:
+        return text
+
+class Record:
+    """Base class: a read-only mapping over the __slots__ named in FIELDS."""
+
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    # Fields stored as datetime.date, and fields whose values are interned
+    DATE_FIELDS = ()
+    INTERNED_FIELDS = ()
+    # Large, rarely read fields, which may be kept in a side file
+    COLD_FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        cls._all_values = operator.attrgetter(*cls.FIELDS)
+        cls._hot_fields = tuple(f for f in cls.FIELDS if f not in cls.COLD_FIELDS)
+        cls._hot_values = operator.attrgetter(*cls._hot_fields)
+        # (field, conversion of its string values) for from_dict
+        cls._conversions = tuple(
+            (f, _parse_date if f in cls.DATE_FIELDS else sys.intern if f in cls.INTERNED_FIELDS else None)
+            for f in cls.FIELDS)
+
+    def __init__(self, *values, _extra=None):
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+        self._extra = _extra
+
+    @classmethod
+    def from_dict(cls, data, freeze):
+        """Builds a record from a JSON dict; freeze() is applied to its lists and dicts."""
+        values = []
+        for field, convert in cls._conversions:
+            value = data.get(field, MISSING)
+            if type(value) is str:
+                if convert is not None:
+                    value = convert(value)
+            elif type(value) in (dict, list):
+                value = freeze(value)
+            values.append(value)
+        extra = None
+        if not cls._field_set.issuperset(data):
+            extra = {k: freeze(v) for k, v in data.items() if k not in cls._field_set}
+        return cls(*values, _extra=extra)
+
+    def __reduce__(self):
+        return _restore, (type(self), self._all_values(self), self._extra)
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key)
+            if type(value) is ColdRef:
+                value = value.load().get(key, MISSING)
+            if value is MISSING:
+                raise KeyError(key)
+            return _text(value) if type(value) is date else value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Not through __getitem__: indexes are built with get()
+        if key in self._field_set:
+            value = getattr(self, key)
+            if type(value) is ColdRef:
+                value = value.load().get(key, MISSING)
+            if value is MISSING:
+                return default
+            return _text(value) if type(value) is date else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __contains__(self, key):
+        if key in self._field_set:
+            return self.get(key, MISSING) is not MISSING
+        return self._extra is not None and key in self._extra
+
+    def items(self):
+        """Returns the (key, value) pairs of the fields the record has."""
+        return self._pairs(self.FIELDS, self._all_values(self))
+
+    def hot_items(self):
+        """Returns the pairs of items() except those of the COLD_FIELDS (without decoding them)."""
+        return self._pairs(self._hot_fields, self._hot_values(self))
+
+    def raw_items(self):
+        """Returns the pairs of items(), with the ColdRef of cold fields kept in a side file as their value."""
+        return self._pairs(self.FIELDS, self._all_values(self), decode=False)
+
+    def cold_ref(self):
+        """Returns the ColdRef of the record's cold fields, or None if they are not in a side file."""
+        for field in self.COLD_FIELDS:
+            value = getattr(self, field)
+            if type(value) is ColdRef:
+                return value
+        return None
+
+    def _pairs(self, fields, values, decode=True):
+        pairs = []
+        cold = None
+        for field, value in zip(fields, values):
+            if decode and type(value) is ColdRef:
+                # One side file read for all cold fields of the record
+                if cold is None:
+                    cold = value.load()
+                value = cold.get(field, MISSING)
+            if value is MISSING:
+                continue
+            pairs.append((field, _text(value) if type(value) is date else value))
+        if self._extra:
+            pairs.extend(self._extra.items())
+        return pairs
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.items())
+
+    def __bool__(self):
+        # Every record has its primary key; __len__ would decode the cold fields
+        return True
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self._all_values(self) == other._all_values(other) and self._extra == other._extra
+        if hasattr(other, 'keys'):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+def _restore(cls, values, extra):
+    return cls(*values, _extra=extra)
+
+class UserRecord(Record):
+    FIELDS = ('id', 'name', 'role', 'password_hash')
+    __slots__ = FIELDS
+    INTERNED_FIELDS = ('role',)
+
+class CourseRecord(Record):
+    FIELDS = ('id', 'title', 'professor_id', 'year', 'semester', 'capacity', 'resources', 'sessions', 'credits')
+    __slots__ = FIELDS
+    INTERNED_FIELDS = ('professor_id', 'semester', 'resources')
+
+class ProposalRecord(Record):
+    FIELDS = ('proposal_id', 'student_id', 'course_id', 'request_date', 'status', 'approval_date')
+    __slots__ = FIELDS
+    DATE_FIELDS = ('request_date', 'approval_date')
+    INTERNED_FIELDS = ('course_id', 'status')
+
+class ThesisRecord(Record):
+    FIELDS = ('thesis_id', 'proposal_id', 'title', 'abstract', 'keywords', 'pdf_path', 'cover_image_path',
+              'status', 'defense_request_date', 'grades', 'reviewers', 'defense_date')
+    __slots__ = FIELDS
+    DATE_FIELDS = ('defense_request_date', 'defense_date')
+    INTERNED_FIELDS = ('status',)
+    COLD_FIELDS = ('abstract', 'keywords')
+
+class ArchiveRecord(Record):
+    # The meta record of the view (archive.META_KEY) keeps its fields as extras
+    FIELDS = ('thesis_id', 'title', 'abstract', 'keywords', 'author', 'student_id', 'year', 'semester', 'course_id',
+              'supervisor', 'supervisor_id', 'reviewers', 'reviewer_ids', 'download_link', 'final_grade_score',
+              'final_grade_letter')
+    __slots__ = FIELDS
+    INTERNED_FIELDS = ('semester', 'course_id', 'supervisor_id', 'final_grade_letter')
+    # Keywords stay inline: keyword searches read them for every candidate
+    COLD_FIELDS = ('abstract',)
+
+# Record class of each collection that has one
+RECORD_CLASSES = {
+    "users": UserRecord,
+    "courses": CourseRecord,
+    "proposals": ProposalRecord,
+    "theses": ThesisRecord,
+    "archive": ArchiveRecord,
+}
@@ -0,0 +1,142 @@
+# src/reports.py
+# Department-wide performance reports.
+# department_report() computes, for every professor at once, the numbers of
+# Professor.generate_performance_report: supervised and reviewed archived
+# theses, the average final grade of the supervised ones, their letter grade
+# distribution and the supervised students. It makes a single pass over the
+# archive view and accumulates into arrays indexed by professor, one array per
+# column. The result is cached until the archive view (any of its partitions)
+# or the users change, so a single professor's report is a lookup into it.
+import csv
+import json
+import operator
+from array import array
+from itertools import chain
+from . import archive
+from . import data_manager
+from . import indexes
+from . import partitions
+
+LETTERS = ("الف", "ب", "ج", "د")
+
+# Columns of the CSV output
+CSV_FIELDS = (
+    "professor_id", "name", "supervised_theses_count", "reviewed_theses_count", "average_grade",
+) + tuple(f"grade_{letter}" for letter in LETTERS)
+
+# (archive view partitions, users records, report), see department_report()
+_cache = [None, None, None]
+
+def _compute(records):
+    """Builds the report from the archive records in one pass."""
+    professors = [u['id'] for u in indexes.find('users', 'role', 'professor')]
+    slots = {professor_id: i for i, professor_id in enumerate(professors)}
+
+    def slot(professor_id):
+        if professor_id not in slots:
+            # Referenced by a thesis but not (or no longer) a professor
+            slots[professor_id] = len(professors)
+            professors.append(professor_id)
+            for column in columns:
+                column.append(0)
+            students.append([])
+        return slots[professor_id]
+
+    supervised = array('l', [0]) * len(professors)
+    reviewed = array('l', [0]) * len(professors)
+    grade_sums = array('d', [0.0]) * len(professors)
+    letters = {letter: array('l', [0]) * len(professors) for letter in LETTERS}
+    columns = [supervised, reviewed, grade_sums] + list(letters.values())
+    students = [[] for _ in professors]
+
+    for record in records:
+        if record['thesis_id'] == archive.META_KEY:
+            continue
+        s = slot(record['supervisor_id'])
+        supervised[s] += 1
+        grade_sums[s] += float(record['final_grade_score'])
+        letters[record['final_grade_letter']][s] += 1
+        students[s].append({
+            "student_name": record['author'],
+            "thesis_title": record['title'],
+            "final_grade": record['final_grade_score']
+        })
+        for reviewer_id in dict.fromkeys(record['reviewer_ids']):
+            reviewed[slot(reviewer_id)] += 1
+
+    report = {}
+    for i, professor_id in enumerate(professors):
+        user = indexes.get('users', professor_id)
+        report[professor_id] = {
+            "professor_id": professor_id,
+            "name": user['name'] if user else 'N/A',
+            "supervised_theses_count": supervised[i],
+            "reviewed_theses_count": reviewed[i],
+            "average_grade": f"{grade_sums[i] / supervised[i]:.2f}" if supervised[i] else None,
+            "grade_distribution": {letter: letters[letter][i] for letter in LETTERS},
+            "supervised_students": students[i],
+        }
+    return report
+
+def department_report():
+    """Returns {professor_id: report} for every professor (read-only, shared)."""
+    archive.fresh()
+    views = [data_manager.get_collection(name, frozen=True) for name in archive.views()]
+    users = data_manager.get_collection('users', frozen=True)
+    same = _cache[0] is not None and len(_cache[0]) == len(views) and all(map(operator.is_, _cache[0], views))
+    if not same or _cache[1] is not users:
+        _cache[:] = [views, users, data_manager.freeze(_compute(chain.from_iterable(views)))]
+    return _cache[2]
+
+def professor_report(professor_id):
+    """Returns one professor's report in the format of generate_performance_report."""
+    entry = department_report().get(professor_id)
+    return {
+        "supervised_theses_count": entry['supervised_theses_count'] if entry else 0,
+        "reviewed_theses_count": entry['reviewed_theses_count'] if entry else 0,
+        "supervised_students": data_manager.thaw(entry['supervised_students']) if entry else []
+    }
+
+def course_roster(course_id):
+    """Returns a course with its students and the status of their proposals and theses."""
+    course = indexes.get('courses', course_id)
+    students = []
+    # Those moved to the cold partitions of the course's year come first
+    parts = [('proposals', 'theses')]
+    if course and course['year'] in partitions.years('proposals'):
+        year = course['year']
+        parts.insert(0, (data_manager.partition('proposals', year), data_manager.partition('theses', year)))
+    for proposals, theses_name in parts:
+        for proposal in indexes.find(proposals, 'course_id', course_id):
+            student = indexes.get('users', proposal['student_id'])
+            theses = indexes.find(theses_name, 'proposal_id', proposal['proposal_id'])
+            thesis = theses[-1] if theses else None
+            students.append({
+                "student_id": proposal['student_id'],
+                "student_name": student['name'] if student else 'N/A',
+                "proposal_status": proposal['status'],
+                "thesis_title": thesis['title'] if thesis else None,
+                "thesis_status": thesis['status'] if thesis else None
+            })
+    return {
+        "course_id": course_id,
+        "title": course['title'] if course else 'N/A',
+        "professor_id": course['professor_id'] if course else None,
+        "year": course['year'] if course else None,
+        "semester": course['semester'] if course else None,
+        "students": students
+    }
+
+def write_json(report, f):
+    """Writes a department report to a text file as JSON."""
+    json.dump(list(data_manager.thaw(report).values()), f, ensure_ascii=False, indent=4)
+
+def write_csv(report, f):
+    """Writes a department report to a text file as CSV, one row per professor."""
+    writer = csv.writer(f)
+    writer.writerow(CSV_FIELDS)
+    for entry in report.values():
+        writer.writerow(
+            [entry[field] for field in CSV_FIELDS[:5]]
+            + [entry['grade_distribution'][letter] for letter in LETTERS]
+        )
@@ -0,0 +1,281 @@
+# src/server.py
+# Local server that keeps one in-memory copy of the data for many clients.
+# Each client session talks newline-delimited JSON over a TCP or Unix socket:
+#
+#   -> {"op": "login", "args": ["stu981001", "student1"]}
+#   <- {"ok": true, "result": {"session": "...", "user": {...}}}
+#   -> {"op": "submit_thesis_request", "session": "...", "args": ["CRS01"]}
+#   <- {"ok": true, "result": [true, "..."]}
+#   <- {"ok": false, "error": "ValueError", "message": "..."}
+#
+# 'op' is a method of the session's Student or Professor (USER_READS,
+# USER_WRITES) or an archive/lookup function of models (MODULE_READS), plus
+# login, resume and logout. Sessions are signed tokens (see auth.py), so a
+# client can resume its session with the token alone, even after the server
+# was restarted. Reads run on a small thread pool against the shared,
+# cached data (see data_manager.read_data), so clients do not wait for each
+# other. Writes are put on a queue and applied one at a time by a single
+# writer thread, which persists them through data_manager as usual. That
+# includes the derived data reads would otherwise build or refresh (and
+# save) on first use: the writer builds it at startup, and a read that finds
+# it stale has the writer refresh it first.
+# Paged archive results keep a cursor per session, so paging through them
+# runs the query once; expired sessions are swept periodically. The session
+# and cursor tables are shared by the read threads and guarded by a lock.
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from . import auth
+from . import client
+from . import data_manager
+from . import models
+
+USER_READS = {
+    "get_available_courses", "view_my_thesis_status", "get_load", "get_pending_proposals",
+    "get_pending_defense_requests", "get_theses_to_review", "generate_performance_report",
+}
+USER_WRITES = {
+    "submit_thesis_request", "request_defense", "decide_on_proposal", "decide_on_defense", "submit_grade",
+}
+MODULE_READS = {
+    "search_theses_archive", "iter_theses_archive", "query_archive", "explain_archive_query",
+    "archive_facets", "get_user", "list_professors", "course_approved_count", "collection_versions",
+}
+
+# Results of iter_theses_archive and query_archive are sent one page at a time
+MAX_PAGE = 500
+
+READ_WORKERS = 4
+
+# Seconds between two sweeps of the expired sessions
+SWEEP_INTERVAL = 60
+
+class RequestError(Exception):
+    """A request the server refuses (unknown operation, bad session...)."""
+
+def _public(value):
+    """Returns a result as plain JSON data, without password hashes."""
+    if isinstance(value, models.User):
+        return {"user_id": value.user_id, "name": value.name, "role": value.role,
+                "supervision_limit": getattr(value, "supervision_limit", None),
+                "review_limit": getattr(value, "review_limit", None)}
+    if isinstance(value, (list, tuple)):
+        return [_public(v) for v in value]
+    if hasattr(value, "items"):
+        return {k: _public(v) for k, v in value.items() if k != "password_hash"}
+    return value
+
+class Server:
+    def __init__(self):
+        # token -> (user, expiry time, users version it was checked against);
+        # the user is None once logged out
+        self.sessions = {}
+        # token -> (query, iterator over the remaining results, offset of the next one), see _page()
+        self.cursors = {}
+        # Guards sessions and cursors
+        self.lock = threading.Lock()
+        self.reads = ThreadPoolExecutor(READ_WORKERS, thread_name_prefix="read")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="write")
+        self.queue = None
+
+    async def write_loop(self):
+        """Applies the queued writes one at a time, in arrival order."""
+        loop = asyncio.get_running_loop()
+        while True:
+            function, future = await self.queue.get()
+            try:
+                result = await loop.run_in_executor(self.writer, function)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+    def _operation(self, request):
+        """Returns (is a write, function running the request)."""
+        op, args = request.get("op"), request.get("args") or []
+        kwargs = request.get("kwargs") or {}
+        if op == "login":
+            return False, lambda: self._login(*args)
+        if op == "resume":
+            return False, lambda: self._resume(*args)
+        user = self._user(request.get("session"))
+        if user is None:
+            raise RequestError("Not logged in")
+        if op == "logout":
+            return False, lambda: self._logout(request["session"])
+        if op in USER_WRITES or op in USER_READS:
+            if not hasattr(user, op):
+                raise RequestError(f"Operation {op!r} is not available to a {user.role}")
+            return op in USER_WRITES, lambda: getattr(user, op)(*args, **kwargs)
+        if op in MODULE_READS:
+            function = getattr(models, op)
+            if op in ("iter_theses_archive", "query_archive"):
+                offset = kwargs.pop("offset", 0)
+                limit = min(kwargs.pop("limit", MAX_PAGE) or MAX_PAGE, MAX_PAGE)
+                return False, lambda: self._page(request["session"], op, args, kwargs, offset, limit)
+            return False, lambda: function(*args, **kwargs)
+        raise RequestError(f"Unknown operation {op!r}")
+
+    def _page(self, token, op, args, kwargs, offset, limit):
+        """
+        Materializes one page of the lazy results of an archive operation.
+        If the session's previous page of the same query ended at offset,
+        its cursor goes on from there; otherwise the query starts again.
+        """
+        query = json.dumps([op, args, kwargs], ensure_ascii=False, sort_keys=True, default=dict)
+        # Taken out while in use, so concurrent requests never share it
+        with self.lock:
+            cursor = self.cursors.pop(token, None)
+        if cursor is not None and cursor[0] == query and cursor[2] == offset:
+            results = cursor[1]
+        else:
+            results = islice(getattr(models, op)(*args, **kwargs), offset, None)
+        page = list(islice(results, limit))
+        if len(page) == limit:
+            with self.lock:
+                if self.sessions.get(token, (None,))[0] is not None:
+                    self.cursors[token] = (query, results, offset + limit)
+        return page
+
+    def _user(self, token):
+        """
+        Returns the user of a session token, or None if it is invalid or
+        expired. Sessions are checked against the credentials again once the
+        users collection was saved (see User.resume).
+        """
+        version = data_manager.collection_version('users')
+        with self.lock:
+            entry = self.sessions.get(token)
+            if entry is not None and entry[1] <= time.time():
+                del self.sessions[token]
+                self.cursors.pop(token, None)
+                entry = None
+        if entry is None or (entry[0] is not None and entry[2] != version):
+            payload = auth.verify_token(token) if token else None
+            if payload is None:
+                return None
+            # A refused token stays refused until it expires, like a logged out one
+            checked = (models.User.resume(token), payload["expires"], version)
+            with self.lock:
+                entry = self.sessions.get(token)
+                # A logout that came in meanwhile wins
+                if entry is None or entry[0] is not None:
+                    entry = self.sessions[token] = checked
+                    if entry[0] is None:
+                        self.cursors.pop(token, None)
+        return entry[0]
+
+    def _login(self, user_id, password):
+        # Taken first, so a save during the login is checked again
+        version = data_manager.collection_version('users')
+        user = models.User.login(user_id, password)
+        if user is None:
+            return None
+        session = user.session_token()
+        with self.lock:
+            self.sessions[session] = (user, auth.verify_token(session)["expires"], version)
+        return {"session": session, "user": user}
+
+    def _logout(self, token):
+        # The token stays refused until it would have expired
+        with self.lock:
+            self.sessions[token] = (None,) + self.sessions[token][1:]
+            self.cursors.pop(token, None)
+
+    def sweep(self):
+        """Drops the expired sessions and their cursors."""
+        now = time.time()
+        with self.lock:
+            for token in [t for t, entry in self.sessions.items() if entry[1] <= now]:
+                del self.sessions[token]
+                self.cursors.pop(token, None)
+
+    async def sweep_loop(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            self.sweep()
+
+    def _resume(self, token):
+        user = self._user(token)
+        return {"session": token, "user": user} if user else None
+
+    async def write(self, function):
+        """Queues a write and returns its result once the writer applied it."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((function, future))
+        return await future
+
+    async def handle(self, request):
+        """Runs one request and returns its response."""
+        loop = asyncio.get_running_loop()
+        try:
+            write, function = self._operation(request)
+            if write:
+                result = await self.write(function)
+            else:
+                if not await loop.run_in_executor(self.reads, models.derived_ready):
+                    # Refreshing the archive view saves it: the writer's job
+                    await self.write(models.build_derived)
+                result = await loop.run_in_executor(self.reads, function)
+            return {"ok": True, "result": _public(result)}
+        except Exception as e:
+            return {"ok": False, "error": type(e).__name__, "message": str(e)}
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    response = {"ok": False, "error": "ValueError", "message": f"Invalid JSON: {e}"}
+                else:
+                    response = await self.handle(request)
+                writer.write(json.dumps(response, ensure_ascii=False, default=dict).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def run(self, address):
+        """Serves clients on an address (see client.parse_address) until cancelled."""
+        self.queue = asyncio.Queue()
+        writes = asyncio.create_task(self.write_loop())
+        sweeps = asyncio.create_task(self.sweep_loop())
+        # Load every collection once up front; later reads share the cache.
+        for name in data_manager.COLLECTION_FILES:
+            data_manager.get_collection(name, frozen=True)
+        await self.write(models.build_derived)
+        kind, target = client.parse_address(address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            server = await asyncio.start_unix_server(self.serve_client, path=target)
+        else:
+            server = await asyncio.start_server(self.serve_client, *target)
+        print(f"Serving on {address}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writes.cancel()
+            sweeps.cancel()
+            self.reads.shutdown()
+            self.writer.shutdown()
+
+def serve(address=client.DEFAULT_ADDRESS):
+    """Runs the server in the foreground (Ctrl+C to stop)."""
+    try:
+        asyncio.run(Server().run(address))
+    except KeyboardInterrupt:
+        pass
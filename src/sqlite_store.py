@@ -0,0 +1,200 @@
+# src/sqlite_store.py
+# SQLite storage backend for the collections managed by data_manager.
+#
+# Each collection is a table holding the record's primary key, its position
+# in the collection (seq), a few indexed columns used for filtering, and the
+# full record as JSON (doc). theses.reviewers is additionally exploded into
+# the thesis_reviewers table. A meta table keeps a version number per
+# collection that is bumped on every save and used to validate caches.
+import json
+import os
+import sqlite3
+import threading
+
+from . import journal
+
+# Indexed columns copied out of each record, per collection
+TABLES = {
+    "users": ("role",),
+    "courses": ("professor_id", "year", "semester", "capacity"),
+    "proposals": ("student_id", "course_id", "status"),
+    "theses": ("proposal_id", "status"),
+    "counters": (),
+    "archive_docs": (),
+    "archive": ("year", "semester", "supervisor_id"),
+    "partitions": (),
+}
+
+# (pid, thread id, db_path) -> connection; connections are not shared across forks.
+_connections = {}
+
+def _create_schema(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (collection TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    for name, columns in TABLES.items():
+        column_defs = "".join(f", {column}" for column in columns)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (pk TEXT PRIMARY KEY, seq INTEGER NOT NULL{column_defs}, doc TEXT NOT NULL)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_seq ON {name} (seq)")
+        for column in columns:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_{column} ON {name} ({column})")
+        conn.execute("INSERT OR IGNORE INTO meta (collection, version) VALUES (?, 0)", (name,))
+    conn.execute("CREATE TABLE IF NOT EXISTS thesis_reviewers (thesis_id TEXT NOT NULL, reviewer_id TEXT NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS thesis_reviewers_thesis ON thesis_reviewers (thesis_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS thesis_reviewers_reviewer ON thesis_reviewers (reviewer_id)")
+    conn.commit()
+
+def connect(db_path):
+    """
+    Returns this thread's connection to the database, creating the schema if
+    needed. Threads get their own connections (sqlite3 objects may not be
+    shared between threads while in use); close_all() may close them from
+    any thread.
+    """
+    key = (os.getpid(), threading.get_ident(), db_path)
+    conn = _connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _create_schema(conn)
+        _connections[key] = conn
+    return conn
+
+def close_all():
+    """Closes every connection opened by this process."""
+    for key in [k for k in _connections if k[0] == os.getpid()]:
+        _connections.pop(key).close()
+
+def version(db_path, name):
+    """Returns the current version number of a collection."""
+    row = connect(db_path).execute("SELECT version FROM meta WHERE collection = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def load(db_path, name):
+    """Returns all records of a collection in order."""
+    rows = connect(db_path).execute(f"SELECT doc FROM {name} ORDER BY seq")
+    return [json.loads(doc) for (doc,) in rows]
+
+def size(db_path, name):
+    """Returns the total size of the stored JSON documents of a collection."""
+    row = connect(db_path).execute(f"SELECT COALESCE(SUM(LENGTH(CAST(doc AS BLOB))), 0) FROM {name}").fetchone()
+    return row[0]
+
+def _dump(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=dict)
+
+def _row(name, pk, seq, record):
+    return (str(record[pk]), seq) + tuple(record.get(column) for column in TABLES[name]) + (_dump(record),)
+
+def _upsert(conn, name, pk, seq, record):
+    columns = TABLES[name]
+    placeholders = ", ".join("?" for _ in range(len(columns) + 3))
+    conn.execute(
+        f"INSERT OR REPLACE INTO {name} (pk, seq{''.join(', ' + c for c in columns)}, doc) VALUES ({placeholders})",
+        _row(name, pk, seq, record),
+    )
+    if name == "theses":
+        conn.execute("DELETE FROM thesis_reviewers WHERE thesis_id = ?", (str(record[pk]),))
+        conn.executemany(
+            "INSERT INTO thesis_reviewers (thesis_id, reviewer_id) VALUES (?, ?)",
+            [(str(record[pk]), reviewer_id) for reviewer_id in dict.fromkeys(record.get("reviewers") or ())],
+        )
+
+def _delete(conn, name, key):
+    conn.execute(f"DELETE FROM {name} WHERE pk = ?", (str(key),))
+    if name == "theses":
+        conn.execute("DELETE FROM thesis_reviewers WHERE thesis_id = ?", (str(key),))
+
+def store(db_path, name, pk, old_records, new_records):
+    """
+    Saves new_records as the content of a collection, writing only the rows
+    that changed compared to old_records. Returns the new version number.
+    """
+    conn = connect(db_path)
+    entries = journal.diff(old_records, new_records, pk)
+    with conn:
+        if entries is None:
+            conn.execute(f"DELETE FROM {name}")
+            if name == "theses":
+                conn.execute("DELETE FROM thesis_reviewers")
+            for seq, record in enumerate(new_records):
+                _upsert(conn, name, pk, seq, record)
+        else:
+            _apply(conn, name, pk, entries)
+        conn.execute("UPDATE meta SET version = version + 1 WHERE collection = ?", (name,))
+    return version(db_path, name)
+
+def _apply(conn, name, pk, entries):
+    next_seq = conn.execute(f"SELECT COALESCE(MAX(seq), -1) + 1 FROM {name}").fetchone()[0]
+    for entry in entries:
+        if entry["op"] == "delete":
+            _delete(conn, name, entry["key"])
+            continue
+        row = conn.execute(f"SELECT seq FROM {name} WHERE pk = ?", (str(entry["key"]),)).fetchone()
+        if row:
+            seq = row[0]
+        else:
+            seq, next_seq = next_seq, next_seq + 1
+        _upsert(conn, name, pk, seq, entry["record"])
+
+def apply(db_path, name, pk, entries):
+    """
+    Applies journal entries (upserts and deletes, see journal.py) to a
+    collection's rows. Returns the new version number.
+    """
+    conn = connect(db_path)
+    with conn:
+        _apply(conn, name, pk, entries)
+        conn.execute("UPDATE meta SET version = version + 1 WHERE collection = ?", (name,))
+    return version(db_path, name)
+
+def store_all(db_path, name, pk, records):
+    """
+    Replaces the content of a collection with records from an iterable,
+    inserting them one at a time in a single transaction. Returns the number
+    of records written.
+    """
+    conn = connect(db_path)
+    count = 0
+    with conn:
+        conn.execute(f"DELETE FROM {name}")
+        if name == "theses":
+            conn.execute("DELETE FROM thesis_reviewers")
+        for seq, record in enumerate(records):
+            _upsert(conn, name, pk, seq, record)
+            count += 1
+        conn.execute("UPDATE meta SET version = version + 1 WHERE collection = ?", (name,))
+    return count
+
+# --- Queries pushed down into SQL ---
+
+def count_approved_for_course(db_path, course_id):
+    """Counts the approved proposals of one course."""
+    row = connect(db_path).execute(
+        "SELECT COUNT(*) FROM proposals WHERE course_id = ? AND status = 'approved'", (course_id,)
+    ).fetchone()
+    return row[0]
+
+def proposals_for_professor(db_path, professor_id, status):
+    """Returns the proposals with the given status for courses of one professor."""
+    rows = connect(db_path).execute(
+        "SELECT p.doc FROM proposals p JOIN courses c ON c.pk = p.course_id"
+        " WHERE c.professor_id = ? AND p.status = ? ORDER BY p.seq",
+        (professor_id, status),
+    )
+    return [json.loads(doc) for (doc,) in rows]
+
+def count_proposals_for_professor(db_path, professor_id, status):
+    """Counts the proposals with the given status for courses of one professor."""
+    row = connect(db_path).execute(
+        "SELECT COUNT(*) FROM proposals p JOIN courses c ON c.pk = p.course_id"
+        " WHERE c.professor_id = ? AND p.status = ?",
+        (professor_id, status),
+    ).fetchone()
+    return row[0]
+
+def count_reviews(db_path, reviewer_id):
+    """Counts the theses a professor is a reviewer of."""
+    row = connect(db_path).execute(
+        "SELECT COUNT(*) FROM thesis_reviewers WHERE reviewer_id = ?", (reviewer_id,)
+    ).fetchone()
+    return row[0]
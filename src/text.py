@@ -0,0 +1,40 @@
+# src/text.py
+# Persian-aware text normalization and tokenization for archive search.
+import re
+
+# Arabic code points that have a Persian counterpart
+_CHARACTER_MAP = {
+    'ي': 'ی',  # Arabic yeh
+    'ى': 'ی',  # Alef maksura
+    'ك': 'ک',  # Arabic kaf
+    'ة': 'ه',  # Teh marbuta
+    'ۀ': 'ه',  # Heh with yeh above
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+}
+# Persian and Arabic-Indic digits map to Latin digits
+_CHARACTER_MAP.update({chr(0x06F0 + i): str(i) for i in range(10)})
+_CHARACTER_MAP.update({chr(0x0660 + i): str(i) for i in range(10)})
+# Diacritics (harakat, tanwin, shadda, sukun, superscript alef) and tatweel are dropped
+_CHARACTER_MAP.update({chr(c): None for c in range(0x064B, 0x0653)})
+_CHARACTER_MAP.update({'\u0670': None, '\u0640': None})
+
+_TRANSLATION = str.maketrans(_CHARACTER_MAP)
+
+ZWNJ = '\u200c'
+
+# Word characters after normalization; ZWNJ is not one, so it splits words
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+def normalize(text):
+    """
+    Normalizes text for matching: unifies Arabic/Persian letter variants,
+    maps Persian digits to Latin, strips diacritics, replaces ZWNJ with a
+    space and lowercases.
+    """
+    return (text or '').translate(_TRANSLATION).replace(ZWNJ, ' ').lower()
+
+def tokenize(text):
+    """Splits text into normalized word tokens."""
+    return _TOKEN_PATTERN.findall(normalize(text))
@@ -0,0 +1,87 @@
+# src/trigrams.py
+# Trigram indexes for substring search.
+# A field's lowercased text is split into overlapping 3-character grams, each
+# mapped to the positions of the records that contain it. Every trigram of the
+# query must occur in a matching record, so intersecting their posting lists
+# yields a small candidate set that is then checked with the same
+# `query.lower() in value.lower()` test a full scan would use. Results are
+# therefore identical to the scan. Like the hash indexes, these are built
+# in memory and rebuilt whenever data_manager hands out a new cached object.
+from . import data_manager
+
+N = 3
+
+# (name, field) -> (frozen records, {trigram: [positions]})
+_built = {}
+
+def grams(value):
+    """Returns the set of trigrams of an already lowercased string."""
+    return {value[i:i + N] for i in range(len(value) - N + 1)}
+
+def _values(record, field):
+    """Returns the lowercased text of a field; list fields give one string per element."""
+    value = record.get(field)
+    if value is None:
+        return ['']
+    if isinstance(value, (list, tuple)):
+        return [v.lower() for v in value]
+    return [value.lower()]
+
+def _postings(name, field):
+    """Returns (records, postings) for one field of a collection, rebuilding if stale."""
+    records = data_manager.get_collection(name, frozen=True)
+    entry = _built.get((name, field))
+    if entry is None or entry[0] is not records:
+        postings = {}
+        for position, record in enumerate(records):
+            for gram in set().union(*map(grams, _values(record, field))):
+                postings.setdefault(gram, []).append(position)
+        entry = (records, postings)
+        _built[(name, field)] = entry
+    return entry
+
+def search(name, field, query):
+    """
+    Returns the (read-only) records whose field contains query, ignoring case,
+    in file order. A list field matches if any of its elements does.
+    """
+    return list(iter_search(name, field, query))
+
+def iter_search(name, field, query):
+    """Like search(), but yields the matching records one at a time."""
+    records, positions = matching(name, field, query)
+    for position in positions:
+        yield records[position]
+
+def matches(record, field, query):
+    """Checks one record the way a search does."""
+    query = query.lower()
+    return any(query in value for value in _values(record, field))
+
+def estimate(name, field, query):
+    """Returns an upper bound on the number of matches, from the shortest posting list."""
+    records, postings = _postings(name, field)
+    query_grams = grams(query.lower())
+    if not query_grams:
+        return len(records)
+    return min(len(postings.get(gram, ())) for gram in query_grams)
+
+def matching(name, field, query):
+    """
+    Returns (records, positions): the frozen records the index was built on
+    and a lazy iterator over the positions of the matching ones, in order.
+    """
+    records, postings = _postings(name, field)
+    query_grams = grams(query.lower())
+    if query_grams:
+        lists = sorted((postings.get(gram, []) for gram in query_grams), key=len)
+        candidates = set(lists[0])
+        for positions in lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(positions)
+        candidates = sorted(candidates)
+    else:
+        # Queries shorter than a trigram cannot be narrowed down.
+        candidates = range(len(records))
+    return records, (p for p in candidates if matches(records[p], field, query))
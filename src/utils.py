@@ -1,19 +1,62 @@
 # src/utils.py
 import hashlib
+import hmac
+import os
+import secrets
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 
-def hash_password(password):
+# Cost of new password hashes: PBKDF2-SHA256 iterations (THESIS_HASH_ITERATIONS)
+HASH_ITERATIONS = int(os.environ.get('THESIS_HASH_ITERATIONS', '100000'))
+
+# Successful verifications remembered, so a password's cost is paid once per
+# process: (stored hash, keyed digest of the password) in LRU order. The
+# password itself is never kept.
+VERIFIED_CACHE_SIZE = 1024
+_verified = OrderedDict()
+_verified_lock = threading.Lock()
+_verified_key = secrets.token_bytes(16)
+
+def hash_password(password, iterations=None, salt=None):
     """
-    Hashes a password using SHA-256.
+    Hashes a password with salted PBKDF2-SHA256, as
+    'pbkdf2_sha256$<iterations>$<salt>$<hash>'.
     """
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    iterations = iterations or HASH_ITERATIONS
+    salt = salt or secrets.token_hex(8)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
+    return f"pbkdf2_sha256${iterations}${salt}${digest.hex()}"
+
+def _check_password(plain_password, hashed_password):
+    if '$' not in hashed_password:
+        # Unsalted SHA-256 hashes of older data files
+        legacy = hashlib.sha256(plain_password.encode('utf-8')).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
+    try:
+        _, iterations, salt, _ = hashed_password.split('$')
+        expected = hash_password(plain_password, int(iterations), salt)
+    except ValueError:
+        return False
+    return hmac.compare_digest(expected, hashed_password)
 
 def verify_password(plain_password, hashed_password):
     """
     Verifies a plain password against its hashed version.
     """
-    return hash_password(plain_password) == hashed_password
+    key = (hashed_password, hmac.digest(_verified_key, plain_password.encode('utf-8'), 'sha256'))
+    with _verified_lock:
+        if key in _verified:
+            _verified.move_to_end(key)
+            return True
+    if not _check_password(plain_password, hashed_password):
+        return False
+    with _verified_lock:
+        _verified[key] = True
+        if len(_verified) > VERIFIED_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return True
 
 def generate_unique_id():
     """
@@ -26,3 +69,14 @@ def get_current_date_str():
     Returns the current date as a string in YYYY-MM-DD format.
     """
     return datetime.now().strftime('%Y-%m-%d')
+
+def get_letter_grade(score):
+    """Converts a numerical score (0-20) to a letter grade."""
+    if 17 <= score <= 20:
+        return "الف"
+    elif 13 <= score < 17:
+        return "ب"
+    elif 10 <= score < 13:
+        return "ج"
+    else:
+        return "د"